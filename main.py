@@ -14,6 +14,12 @@ NAPCATQQ_DESKTOP_LOGO = r"""
 if __name__ == "__main__":
     # 调整程序 log 输出
     stdout()
+    if "--headless" in sys.argv:
+        # 无界面模式, 不创建 QApplication 和任何控件, 也不导入 src.Ui
+        # (配置仍基于 qfluentwidgets 的 QConfig, 所以 qfluentwidgets 本身还是会被导入)
+        from src.Core.Headless import runHeadless
+
+        sys.exit(runHeadless(sys.argv))
     # 启动主程序
     from src.Core.Config import cfg
     from src.Ui.MainWindow import MainWindow
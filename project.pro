@@ -2,12 +2,28 @@
 SOURCES += main.py
 
 # 包含子目录中的所有 Python 文件
-SOURCES += src/Core/BeginnerGuidance.py \
+SOURCES += src/Core/Avatar.py \
+           src/Core/BeginnerGuidance.py \
+           src/Core/BotLog/LogBuffer.py \
+           src/Core/BotLog/LogFile.py \
+           src/Core/BotLog/LogIndex.py \
+           src/Core/BotLog/LogIngestor.py \
+           src/Core/BotLog/LogParser.py \
+           src/Core/BotLog/LogSearch.py \
+           src/Core/BotLog/__init__.py \
+           src/Core/BotProcess.py \
+           src/Core/BotState.py \
+           src/Core/BotSupervisor.py \
            src/Core/CreateScript.py \
            src/Core/GetVersion.py \
+           src/Core/Headless.py \
+           src/Core/ImageLoader.py \
+           src/Core/Installer.py \
            src/Core/NetworkFunc.py \
            src/Core/PathFunc.py \
+           src/Core/Scheduler.py \
            src/Core/__init__.py \
+           src/Core/Config/BotConfigRepository.py \
            src/Core/Config/ConfigModel.py \
            src/Core/Config/__init__.py \
            src/Ui/Icon.py \
@@ -25,9 +41,11 @@ SOURCES += src/Core/BeginnerGuidance.py \
            src/Ui/BotListPage/BotTopCard.py \
            src/Ui/BotListPage/__init__.py \
            src/Ui/BotListPage/BotWidget/BotInfoPage.py \
+           src/Ui/BotListPage/BotWidget/BotLogPage.py \
            src/Ui/BotListPage/BotWidget/BotSetupPage.py \
            src/Ui/BotListPage/BotWidget/__init__.py \
            src/Ui/common/CodeEditor.py \
+           src/Ui/common/LogEditor.py \
            src/Ui/common/__init__.py \
            src/Ui/common/InfoCard/BotListCard.py \
            src/Ui/common/InfoCard/SystemInfoCard.py \
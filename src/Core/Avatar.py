@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+from abc import ABC
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import shiboken6
+from PySide6.QtCore import QObject, QSize, QUrl, QUrlQuery
+from PySide6.QtGui import QGuiApplication, QImage, QPixmap
+from PySide6.QtNetwork import QNetworkReply, QNetworkRequest
+from creart import add_creator, exists_module, it
+from creart.creator import AbstractCreator, CreateTargetInfo
+from loguru import logger
+
+from src.Core import atomicWrite
+from src.Core.ImageLoader import ImageLoader
+from src.Core.NetworkFunc import NetworkFunc, Urls
+
+# 回调参数: 头像, 获取失败时为 None 和错误信息
+AvatarCallback = Callable[[Optional[QPixmap], str], None]
+
+
+class AvatarCache(QObject):
+    """
+    ## QQ 头像缓存, 所有显示头像的控件共用
+        - 内存中按 (QQID, 显示尺寸) 保存已经解码并缩放好的 QPixmap, 超过 maxPixmaps 时淘汰最久未使用的
+        - 解码和缩放通过 ImageLoader 在后台线程中进行, 不阻塞界面
+        - 原始图片保存在 config/cache/avatar, 未超过 ttl 时直接使用, 不发送请求
+        - 超过 ttl 时先显示磁盘上的旧头像, 再带上 ETag / Last-Modified 重新验证, 304 时只更新文件时间
+        - 同一个 QQID 同时只有一个请求, 按显示尺寸选择足够清晰的最小 spec, 不再总是下载 640
+    """
+
+    ttl = 24 * 3600  # 磁盘缓存的有效期(秒)
+    retryDelay = 60  # 请求失败后多久内不再请求(秒)
+    maxPixmaps = 512
+    specs = (140, 640)  # 可用的头像尺寸, 40 和 100 对常用的显示尺寸意义不大, 只会多出一次下载
+
+    def __init__(self) -> None:
+        super().__init__()
+        from src.Core.PathFunc import PathFunc
+
+        self.directory = it(PathFunc).cache_path / "avatar"
+        self._pixmaps: "OrderedDict[Tuple[str, int], QPixmap]" = OrderedDict()
+        self._waiting: Dict[str, List[Tuple[QObject, int, AvatarCallback]]] = {}  # QQID -> 等待请求结果的控件
+        self._failedAt: Dict[str, float] = {}  # QQID -> 最后一次请求失败的时间
+
+    def avatar(
+            self, QQID: str, size: int, receiver: Optional[QObject] = None, callback: Optional[AvatarCallback] = None
+    ) -> Optional[QPixmap]:
+        """
+        ## 返回内存中的头像, 需要时在后台解码磁盘缓存或发送请求
+            - size 显示的高度(逻辑像素), 返回的 QPixmap 按屏幕缩放比例缩放到这个尺寸
+            - 磁盘缓存解码完成、下载的头像有变化、或请求失败且没有旧头像时调用 callback;
+              receiver 被销毁后不再调用
+            - 内存中没有时返回 None
+        """
+        key = (QQID, size)
+        if (pixmap := self._pixmaps.get(key)) is not None:
+            self._pixmaps.move_to_end(key)
+        elif receiver is not None and callback is not None and (path := self._path(QQID, self._spec(size))):
+            self._decode(QQID, size, path, receiver, callback)
+
+        isPending = QQID in self._waiting
+        if not isPending and self._isFresh(QQID, size):
+            return pixmap
+
+        if receiver is not None and callback is not None:
+            self._waiting.setdefault(QQID, []).append((receiver, size, callback))
+        if not isPending:
+            self._request(QQID, self._spec(size))
+        return pixmap
+
+    def _isFresh(self, QQID: str, size: int) -> bool:
+        """
+        ## 是否不需要发送请求: 磁盘缓存未过期(验证成功时会刷新文件时间), 或刚刚请求失败
+        """
+        if time.time() - self._failedAt.get(QQID, 0) < self.retryDelay:
+            return True
+        path = self._path(QQID, self._spec(size))
+        try:
+            return path is not None and time.time() - path.stat().st_mtime < self.ttl
+        except OSError:
+            return False
+
+    def _spec(self, size: int) -> int:
+        """
+        ## 返回不小于显示尺寸(物理像素)的最小 spec
+        """
+        pixels = size * self._devicePixelRatio()
+        return next((spec for spec in self.specs if spec >= pixels), self.specs[-1])
+
+    @staticmethod
+    def _devicePixelRatio() -> float:
+        app = QGuiApplication.instance()
+        return app.devicePixelRatio() if isinstance(app, QGuiApplication) else 1.0
+
+    def _path(self, QQID: str, spec: int) -> Optional[Path]:
+        """
+        ## 返回可用的磁盘缓存, 更大的 spec 也可以使用
+        """
+        for candidate in self.specs:
+            path = self.directory / f"{QQID}_{candidate}.img"
+            if candidate >= spec and path.exists():
+                return path
+        return None
+
+    def _decode(self, QQID: str, size: int, path: Path, receiver: QObject, callback: AvatarCallback) -> None:
+        """
+        ## 在后台线程中解码并缩放头像, 完成后放入内存缓存并回调
+        """
+        ratio = self._devicePixelRatio()
+        pixels = round(size * ratio)
+
+        def decoded(image: QImage) -> None:
+            if image.isNull():
+                callback(None, self.tr("Failed to decode the avatar"))
+                return
+            pixmap = QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(ratio)
+            self._pixmaps[(QQID, size)] = pixmap
+            self._pixmaps.move_to_end((QQID, size))
+            if len(self._pixmaps) > self.maxPixmaps:
+                self._pixmaps.popitem(last=False)
+            callback(pixmap, "")
+
+        it(ImageLoader).load(str(path), QSize(pixels, pixels), receiver, decoded)
+
+    def _request(self, QQID: str, spec: int) -> None:
+        """
+        ## 请求头像, 已有缓存时带上验证信息
+        """
+        self._waiting.setdefault(QQID, [])
+
+        url = QUrl(Urls.QQ_AVATAR.value)
+        query = QUrlQuery()
+        query.addQueryItem("spec", str(spec))
+        query.addQueryItem("dst_uin", QQID)
+        url.setQuery(query)
+
+        request = QNetworkRequest(url)
+        path = self.directory / f"{QQID}_{spec}.img"
+        if path.exists():
+            meta = self._meta(path)
+            if meta.get("etag"):
+                request.setRawHeader(b"If-None-Match", meta["etag"].encode())
+            if meta.get("lastModified"):
+                request.setRawHeader(b"If-Modified-Since", meta["lastModified"].encode())
+
+        reply = it(NetworkFunc).manager.get(request)
+        reply.finished.connect(lambda: self._finished(QQID, path, reply))
+
+    def _finished(self, QQID: str, path: Path, reply: QNetworkReply) -> None:
+        """
+        ## 请求结束, 更新缓存并通知等待的控件
+        """
+        waiting = self._waiting.pop(QQID, [])
+        status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        error = ""
+        isChanged = False
+        if reply.error() != QNetworkReply.NetworkError.NoError:
+            error = reply.errorString()
+            self._failedAt[QQID] = time.time()
+            logger.warning(f"获取 {QQID} 的头像失败: {error}")
+        elif status == 304 and path.exists():
+            # 头像没有变化, 只刷新有效期
+            os.utime(str(path))
+        else:
+            self._failedAt.pop(QQID, None)
+            isChanged = self._store(QQID, path, reply)
+        reply.deleteLater()
+
+        for receiver, size, callback in waiting:
+            if not shiboken6.isValid(receiver):
+                continue
+            if error and self._path(QQID, self._spec(size)) is None:
+                # 已经显示了旧头像时不提示错误
+                callback(None, error)
+            elif isChanged:
+                self._decode(QQID, size, path, receiver, callback)
+
+    def _store(self, QQID: str, path: Path, reply: QNetworkReply) -> bool:
+        """
+        ## 保存下载的头像, 返回内容是否发生变化
+        """
+        data = reply.readAll().data()
+        try:
+            isChanged = not path.exists() or path.read_bytes() != data
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if isChanged:
+                atomicWrite(path, data)
+            else:
+                os.utime(str(path))
+            meta = {
+                "etag": reply.rawHeader("ETag").data().decode(),
+                "lastModified": reply.rawHeader("Last-Modified").data().decode()
+            }
+            atomicWrite(path.with_suffix(".json"), json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"写入 {QQID} 的头像缓存失败: {e}")
+            return False
+
+        if isChanged:
+            # 丢弃这个 QQID 所有尺寸的旧头像
+            for key in [key for key in self._pixmaps if key[0] == QQID]:
+                del self._pixmaps[key]
+        return isChanged
+
+    @staticmethod
+    def _meta(path: Path) -> dict:
+        try:
+            return json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+
+class AvatarCacheClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.Avatar", "AvatarCache"),)
+
+    # 静态方法available()，用于检查模块"Avatar"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.Avatar")
+
+    # 静态方法create()，用于创建AvatarCache类的实例，返回值为AvatarCache对象。
+    @staticmethod
+    def create(create_type: [AvatarCache]) -> AvatarCache:
+        return AvatarCache()
+
+
+add_creator(AvatarCacheClassCreator)
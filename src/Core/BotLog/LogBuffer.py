@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from pathlib import Path
+from typing import Deque, List, Tuple
+
+from src.Core.BotLog.LogFile import LogWriter, readFileRange
+
+
+class LogRingBuffer:
+    """
+    ## 固定容量的日志环形缓冲区
+        - 只保留最近 maxLines 行, 超出部分由 deque 自动淘汰
+        - 行号为绝对行号(从 0 开始), 即使旧行被淘汰也保持不变
+    """
+
+    def __init__(self, maxLines: int) -> None:
+        """
+        ## 初始化
+            - maxLines 最多保留的行数
+        """
+        self.maxLines = max(1, maxLines)
+        self.totalLines = 0  # 累计写入的行数
+        self._lines: Deque[str] = deque(maxlen=self.maxLines)
+
+    @property
+    def firstLineNumber(self) -> int:
+        """
+        ## 缓冲区中第一行的绝对行号
+        """
+        return self.totalLines - len(self._lines)
+
+    def append(self, lines: List[str]) -> None:
+        """
+        ## 追加多行
+        """
+        self._lines.extend(lines)
+        self.totalLines += len(lines)
+
+    def lines(self) -> List[str]:
+        """
+        ## 返回缓冲区中的所有行
+        """
+        return list(self._lines)
+
+    def setMaxLines(self, maxLines: int) -> None:
+        """
+        ## 调整容量, 缩小时丢弃最旧的行
+        """
+        self.maxLines = max(1, maxLines)
+        self._lines = deque(self._lines, maxlen=self.maxLines)
+
+    def clear(self) -> None:
+        """
+        ## 清空缓冲区并重置行号
+        """
+        self._lines.clear()
+        self.totalLines = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+
+class LogHistory:
+    """
+    ## 保存在磁盘上的完整日志历史
+        - 所有行通过 LogWriter 追加写入 log/<QQID>/ 下的轮转文件, 并用 array 记录每行的偏移量
+        - 偏移量是本次会话中的连续字节偏移, 跨越轮转时按文件段换算
+        - 通过 mmap 按需读取任意一页, 不需要把整个文件读入内存
+        - 写入器删除超出数量的历史文件后, 同时丢弃这些文件中的行, firstLineNumber 之前的行不再可读
+    """
+
+    def __init__(self, writer: LogWriter) -> None:
+        """
+        ## 初始化, 从写入器当前文件的末尾开始记录
+            - writer 日志文件写入器
+        """
+        self.writer = writer
+        self.firstLineNumber = 0  # 第一行可读的行的绝对行号
+        self._offsets = array("Q")  # 从 firstLineNumber 开始每行在会话中的起始偏移量
+        self._size = 0  # 会话中已写入的字节数
+        # 文件段 (会话偏移量, 文件路径, 文件内的起始位置), 按会话偏移量升序
+        self._segments: List[Tuple[int, Path, int]] = [(0, writer.path, writer.size)]
+        self.writer.onPruned = self._prunedSlot
+
+    @property
+    def lineCount(self) -> int:
+        """
+        ## 会话中累计写入的行数, 也是下一行的绝对行号
+        """
+        return self.firstLineNumber + len(self._offsets)
+
+    def append(self, lines: List[str]) -> None:
+        """
+        ## 追加多行到历史文件
+        """
+        if not lines:
+            return
+
+        chunks = []
+        for line in lines:
+            data = f"{line}\n".encode("utf-8")
+            self._offsets.append(self._size)
+            self._size += len(data)
+            chunks.append(data)
+        data = b"".join(chunks)
+
+        if self.writer.shouldRotate(len(data)):
+            # 轮转后上一段的路径改为轮转后的文件, 新的一段从新文件的开头开始
+            start, _, fileStart = self._segments[-1]
+            self._segments[-1] = (start, self.writer.rotate(), fileStart)
+            self._segments.append((self._size - len(data), self.writer.path, 0))
+        self.writer.write(data)
+
+    def readLines(self, start: int, count: int) -> List[str]:
+        """
+        ## 读取从 start 开始的 count 行
+            - start 绝对行号
+            - count 读取的行数
+        """
+        start = max(self.firstLineNumber, start)
+        end = min(self.lineCount, start + count)
+        if start >= end:
+            return []
+        return self._readLineRange(start, end)
+
+    def readLinesAt(self, lineNumbers: List[int]) -> List[str]:
+        """
+        ## 读取指定的若干行, 用于显示过滤后的结果
+            - lineNumbers 升序的绝对行号, 连续的行号合并为一次读取; 已不可读的行号会被跳过
+        """
+        lineNumbers = [number for number in lineNumbers if self.firstLineNumber <= number < self.lineCount]
+        lines = []
+        start = 0
+        while start < len(lineNumbers):
+            # 找到一段连续的行号
+            end = start + 1
+            while end < len(lineNumbers) and lineNumbers[end] == lineNumbers[end - 1] + 1:
+                end += 1
+            lines.extend(self._readLineRange(lineNumbers[start], lineNumbers[end - 1] + 1))
+            start = end
+        return lines
+
+    def close(self) -> None:
+        """
+        ## 关闭历史文件
+        """
+        self.writer.onPruned = None
+        self.writer.close()
+
+    def _prunedSlot(self, paths: List[Path]) -> None:
+        """
+        ## 历史文件被删除, 丢弃这些文件中的行
+        """
+        pruned = set(paths)
+        while len(self._segments) > 1 and self._segments[0][1] in pruned:
+            self._segments.pop(0)
+        count = bisect_left(self._offsets, self._segments[0][0])
+        del self._offsets[:count]
+        self.firstLineNumber += count
+
+    def _readLineRange(self, start: int, end: int) -> List[str]:
+        """
+        ## 读取 [start, end) 行
+        """
+        begin = self._offsets[start - self.firstLineNumber]
+        stop = self._offsets[end - self.firstLineNumber] if end < self.lineCount else self._size
+
+        # 先把缓冲区写入磁盘, 保证读取到的是最新内容
+        self.writer.flush()
+        chunks = []
+        index = bisect_right(self._segments, begin, key=lambda segment: segment[0]) - 1
+        while begin < stop and index < len(self._segments):
+            segmentStart, path, fileStart = self._segments[index]
+            segmentEnd = self._segments[index + 1][0] if index + 1 < len(self._segments) else self._size
+            chunkEnd = min(stop, segmentEnd)
+            chunks.append(readFileRange(path, fileStart + begin - segmentStart, fileStart + chunkEnd - segmentStart))
+            begin = chunkEnd
+            index += 1
+        return b"".join(chunks).decode("utf-8", errors="replace").split("\n")[:-1]
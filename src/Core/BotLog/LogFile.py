@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+import gzip
+import mmap
+import os
+import struct
+import time
+import weakref
+import zlib
+from bisect import bisect_right
+from collections import deque
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Callable, Deque, List, Optional, Set, Tuple
+
+from PySide6.QtCore import QThreadPool
+from loguru import logger
+
+# 压缩时每个 gzip 成员包含的原始字节数, 读取时只需要解压包含目标范围的成员
+GZIP_BLOCK_SIZE = 1024 * 1024
+# 成员头: 魔数, 压缩方式, 标志(FEXTRA), 修改时间, 额外标志, 系统, 额外字段长度, 子字段 "NC" 及其长度和成员的总字节数
+GZIP_BLOCK_HEADER = struct.Struct("<BBBBIBBH2sHI")
+# 成员尾: CRC32, 原始字节数
+GZIP_BLOCK_TRAILER = struct.Struct("<II")
+
+
+def readFileRange(path: Path, begin: int, end: int) -> bytes:
+    """
+    ## 读取文件中 [begin, end) 的字节
+        - 未压缩的文件使用 mmap 读取, 只映射不复制整个文件
+        - 文件已被后台压缩时从同名的 .gz 文件中读取, 只解压包含 [begin, end) 的成员
+    """
+    if end <= begin:
+        return b""
+    if path.exists():
+        with open(str(path), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if begin >= size:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[begin:min(end, size)]
+
+    gzipPath = path.with_name(f"{path.name}.gz")
+    try:
+        stat = gzipPath.stat()
+    except OSError:
+        return b""
+    blocks = _gzipBlocks(str(gzipPath), stat.st_mtime_ns)
+    if blocks is None:
+        # 旧版本压缩的文件只有一个成员, 只能从头解压
+        try:
+            with gzip.open(str(gzipPath), "rb") as f:
+                f.seek(begin)
+                return f.read(end - begin)
+        except (OSError, EOFError, zlib.error) as e:
+            logger.warning(f"读取日志 {gzipPath} 失败: {e}")
+            return b""
+
+    chunks = []
+    index = bisect_right(blocks, begin, key=lambda block: block[0]) - 1
+    while 0 <= index < len(blocks) and blocks[index][0] < end:
+        blockStart, offset, size = blocks[index]
+        try:
+            data = _readGzipBlock(str(gzipPath), stat.st_mtime_ns, offset, size)
+        except (OSError, zlib.error) as e:
+            logger.warning(f"读取日志 {gzipPath} 失败: {e}")
+            return b""
+        chunks.append(data[max(0, begin - blockStart):end - blockStart])
+        index += 1
+    return b"".join(chunks)
+
+
+@lru_cache(maxsize=64)
+def _gzipBlocks(path: str, mtime: int) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    ## 返回压缩文件中每个成员的 (原始数据中的起始位置, 文件中的位置, 成员字节数)
+        - 只读取每个成员的头和尾, 不解压; 不是 compressFile 生成的文件时返回 None
+        - mtime 只用于让缓存在文件变化后失效
+    """
+    blocks = []
+    blockStart = offset = 0
+    with open(path, "rb") as f:
+        fileSize = os.fstat(f.fileno()).st_size
+        while offset < fileSize:
+            f.seek(offset)
+            header = f.read(GZIP_BLOCK_HEADER.size)
+            if len(header) < GZIP_BLOCK_HEADER.size:
+                return None
+            magic1, magic2, _, flags, _, _, _, _, subfield, _, size = GZIP_BLOCK_HEADER.unpack(header)
+            if (magic1, magic2, flags, subfield) != (0x1F, 0x8B, 4, b"NC"):
+                return None
+            if size < GZIP_BLOCK_HEADER.size + GZIP_BLOCK_TRAILER.size or offset + size > fileSize:
+                # 文件已损坏或被截断
+                return None
+            f.seek(offset + size - GZIP_BLOCK_TRAILER.size)
+            _, length = GZIP_BLOCK_TRAILER.unpack(f.read(GZIP_BLOCK_TRAILER.size))
+            blocks.append((blockStart, offset, size))
+            blockStart += length
+            offset += size
+    return blocks
+
+
+@lru_cache(maxsize=8)
+def _readGzipBlock(path: str, mtime: int, offset: int, size: int) -> bytes:
+    """
+    ## 解压一个成员, 最近使用的成员保留在缓存中, 同一成员内分散的多次读取只解压一次
+    """
+    with open(path, "rb") as f:
+        f.seek(offset + GZIP_BLOCK_HEADER.size)
+        deflated = f.read(size - GZIP_BLOCK_HEADER.size - GZIP_BLOCK_TRAILER.size)
+    return zlib.decompress(deflated, -zlib.MAX_WBITS)
+
+
+def _gzipBlock(data: bytes) -> bytes:
+    """
+    ## 把一块数据压缩为一个独立的 gzip 成员, 额外字段中记录成员的总字节数
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+    size = GZIP_BLOCK_HEADER.size + len(deflated) + GZIP_BLOCK_TRAILER.size
+    header = GZIP_BLOCK_HEADER.pack(0x1F, 0x8B, 8, 4, 0, 0, 255, 8, b"NC", 4, size)
+    return header + deflated + GZIP_BLOCK_TRAILER.pack(zlib.crc32(data), len(data) & 0xFFFFFFFF)
+
+
+def compressFile(path: Path) -> None:
+    """
+    ## 把文件压缩为同名的 .gz 文件并删除原文件, 在线程池中执行
+        - 每 GZIP_BLOCK_SIZE 字节压缩为一个 gzip 成员, 仍然是标准的 gzip 文件
+        - 先写入临时文件再重命名, 不会出现写了一半的 .gz 文件
+    """
+    gzipPath = path.with_name(f"{path.name}.gz")
+    partPath = path.with_name(f"{path.name}.gz.part")
+    try:
+        with open(str(path), "rb") as src, open(str(partPath), "wb") as dst:
+            while data := src.read(GZIP_BLOCK_SIZE):
+                dst.write(_gzipBlock(data))
+        os.replace(str(partPath), str(gzipPath))
+        path.unlink()
+    except OSError as e:
+        # 例如文件正在被读取(Windows 下无法删除), 保留未压缩的文件即可
+        logger.warning(f"压缩日志 {path} 失败: {e}")
+        partPath.unlink(missing_ok=True)
+        if path.exists():
+            gzipPath.unlink(missing_ok=True)
+
+
+class LogWriter:
+    """
+    ## 按大小和日期轮转的日志文件写入器
+        - 当前文件为 directory/name.log, 以追加模式打开, 重启进程不会丢失之前的日志
+        - 写入经过缓冲, 最多每隔 flushInterval 秒落盘一次
+        - 超过 maxBytes 或跨天时轮转为 name-时间.log, 并在线程池中压缩, 只保留最近 maxArchives 个
+        - 清理旧文件只在写入线程中进行, 并且只删除已经压缩完成的文件, 删除后调用 onPruned
+    """
+
+    def __init__(
+            self, directory: Path, name: str, maxBytes: int, maxArchives: int,
+            bufferSize: int = 64 * 1024, flushInterval: float = 1.0
+    ) -> None:
+        """
+        ## 初始化并打开当前文件
+            - directory 日志目录
+            - name 文件名(不含扩展名)
+            - maxBytes 单个文件的最大字节数
+            - maxArchives 保留的历史文件数量
+        """
+        self.directory = directory
+        self.name = name
+        self.path = directory / f"{name}.log"
+        self.maxBytes = maxBytes
+        self.maxArchives = maxArchives
+        self.bufferSize = bufferSize
+        self.flushInterval = flushInterval
+        self.size = 0  # 当前文件大小(包括缓冲区中的内容)
+        self._file: Optional[IO[bytes]] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        self._openedDate = date.today()
+        self._lastFlush = time.monotonic()
+        # 历史文件以轮转时的路径(name-时间.log)标识, 压缩后实际的文件为同名的 .gz
+        self._archives: List[Path] = []  # 已压缩完成的历史文件, 从旧到新
+        self._compressing: Set[Path] = set()  # 正在线程池中压缩的历史文件
+        self._compressed: Deque[Path] = deque()  # 压缩完成、等待写入线程取出的历史文件
+        # 删除历史文件后调用, 参数为被删除的文件(轮转时的路径), 在写入线程中调用
+        self.onPruned: Optional[Callable[[List[Path]], None]] = None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._scanArchives()
+        self._open()
+
+    def shouldRotate(self, incoming: int) -> bool:
+        """
+        ## 写入 incoming 字节前是否需要轮转
+        """
+        if self.size == 0:
+            return False
+        return self.size + incoming > self.maxBytes or date.today() != self._openedDate
+
+    def write(self, data: bytes) -> None:
+        """
+        ## 写入数据, 不会自动轮转, 需要先调用 shouldRotate 判断
+        """
+        if self._file is None or not data:
+            return
+        self._file.write(data)
+        self.size += len(data)
+        if time.monotonic() - self._lastFlush >= self.flushInterval:
+            self.flush()
+        if self._compressed:
+            self._prune()
+
+    def flush(self) -> None:
+        """
+        ## 把缓冲区写入磁盘
+        """
+        if self._file is not None:
+            self._file.flush()
+        self._lastFlush = time.monotonic()
+
+    def rotate(self) -> Path:
+        """
+        ## 轮转当前文件, 返回轮转后的文件路径
+            - 旧文件在线程池中压缩, 压缩完成前仍可以直接读取
+        """
+        self.close()
+        # 文件名中的时间精确到微秒, 按文件名排序即为轮转顺序
+        archivePath = self.directory / f"{self.name}-{datetime.now():%Y%m%d-%H%M%S-%f}.log"
+        self.path.replace(archivePath)
+        self._open()
+
+        self._compressing.add(archivePath)
+        QThreadPool.globalInstance().start(lambda: self._compress(archivePath))
+        self._prune()
+        return archivePath
+
+    def archives(self) -> List[Path]:
+        """
+        ## 返回已压缩完成的历史文件(压缩失败时为未压缩的文件), 从旧到新排列
+        """
+        return [path if path.exists() else path.with_name(f"{path.name}.gz") for path in self._archives]
+
+    def close(self) -> None:
+        """
+        ## 关闭当前文件
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._file = None
+
+    def _open(self) -> None:
+        """
+        ## 以追加模式打开当前文件
+        """
+        self._file = open(str(self.path), "ab", buffering=self.bufferSize)
+        # 对象被回收或程序退出时关闭文件, 确保缓冲区中的内容落盘
+        self._finalizer = weakref.finalize(self, self._file.close)
+        self.size = self._file.tell()
+        # 已有内容的文件以最后修改日期作为打开日期, 跨天后第一次写入就会轮转
+        self._openedDate = date.fromtimestamp(self.path.stat().st_mtime) if self.size else date.today()
+        self._lastFlush = time.monotonic()
+
+    def _scanArchives(self) -> None:
+        """
+        ## 查找已有的历史文件
+            - 同时存在 .log 和 .gz 时说明上次压缩被中断, 以未压缩的文件为准
+        """
+        archives = set()
+        for path in self.directory.glob(f"{self.name}-*.log*"):
+            if path.name.endswith(".part"):
+                path.unlink(missing_ok=True)
+            elif path.suffix == ".gz":
+                if path.with_suffix("").exists():
+                    path.unlink(missing_ok=True)
+                else:
+                    archives.add(path.with_suffix(""))
+            else:
+                archives.add(path)
+        self._archives = sorted(archives)
+
+    def _compress(self, archivePath: Path) -> None:
+        """
+        ## 压缩历史文件, 在线程池中执行, 完成后交给写入线程清理旧文件
+        """
+        compressFile(archivePath)
+        self._compressed.append(archivePath)
+
+    def _prune(self) -> None:
+        """
+        ## 清理超出 maxArchives 的旧文件, 在写入线程中执行
+            - 只删除压缩完成并且比所有正在压缩的文件都旧的文件
+        """
+        while self._compressed:
+            path = self._compressed.popleft()
+            self._compressing.discard(path)
+            self._archives.append(path)
+        self._archives.sort()
+
+        overflow = len(self._archives) + len(self._compressing) - self.maxArchives
+        oldestCompressing = min(self._compressing, default=None)
+        pruned = [
+            path for path in self._archives[:max(0, overflow)]
+            if oldestCompressing is None or path < oldestCompressing
+        ]
+        if not pruned:
+            return
+        del self._archives[:len(pruned)]
+        for path in pruned:
+            path.unlink(missing_ok=True)
+            path.with_name(f"{path.name}.gz").unlink(missing_ok=True)
+        if self.onPruned:
+            self.onPruned(pruned)
+
+
+class LogTail:
+    """
+    ## 跟踪文件末尾新写入的内容
+        - 只读取上次位置之后的字节, 不会重复读取整个文件
+        - 文件变小(被轮转或清空)时从头开始
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.offset = 0
+        self.rewound = False  # 最近一次读取时文件是否变小并从头开始
+
+    def read(self) -> str:
+        """
+        ## 返回新写入的完整行, 不完整的最后一行留到下次读取
+        """
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return ""
+        self.rewound = size < self.offset
+        if self.rewound:
+            self.offset = 0
+        if size == self.offset:
+            return ""
+
+        data = readFileRange(self.path, self.offset, size)
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        return data[:end].decode("utf-8", errors="replace")
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from enum import IntEnum
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Sequence
+
+
+class LogLevel(IntEnum):
+    """
+    ## NapCat 日志等级
+    """
+    NONE = 0
+    DEBUG = 1
+    INFO = 2
+    WARN = 3
+    ERROR = 4
+
+
+class LogRecord(NamedTuple):
+    """
+    ## 一行日志解析后的结构化记录, 由 LogParser 在工作线程中生成
+        - timestamp 时间戳(秒), 没有时间的行沿用上一行的时间, 保证整列单调不减
+        - level 日志等级, 无法识别的行(例如堆栈)为 LogLevel.NONE
+        - QQID 日志中的 QQ 号, 没有则为 0
+        - messageOffset 消息正文在行中的起始位置
+        - tokens 消息正文的词元, 用于全文索引, 不保存在 LogIndex 中
+    """
+    timestamp: float
+    level: LogLevel
+    QQID: int
+    messageOffset: int
+    tokens: FrozenSet[str] = frozenset()
+
+
+class LogIndex:
+    """
+    ## 按列存储的日志索引
+        - 每一列都是 array, 一行只占用二十余字节, 百万行也不会有明显的内存压力
+        - 时间戳列单调不减, 可以二分查找时间范围
+        - 每个等级单独记录行号列表, 按等级过滤和跳转到下一条错误都是 O(log n)
+        - 行号为绝对行号, trim 丢弃旧行后保持不变
+    """
+
+    def __init__(self) -> None:
+        # 创建属性
+        self.firstLineNumber = 0  # 第一条记录的绝对行号
+        self.timestamps = array("d")
+        self.levels = array("B")
+        self.QQIDs = array("Q")
+        self.messageOffsets = array("I")
+        self.levelLines: Dict[LogLevel, array] = {level: array("Q") for level in LogLevel}
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    @property
+    def lineCount(self) -> int:
+        """
+        ## 累计记录的行数, 也是下一条记录的绝对行号
+        """
+        return self.firstLineNumber + len(self.levels)
+
+    def append(self, records: Iterable[LogRecord]) -> None:
+        """
+        ## 追加一批记录, 行号紧接在已有记录之后
+        """
+        lineNumber = self.lineCount
+        for record in records:
+            self.timestamps.append(record.timestamp)
+            self.levels.append(record.level)
+            self.QQIDs.append(record.QQID)
+            self.messageOffsets.append(record.messageOffset)
+            self.levelLines[record.level].append(lineNumber)
+            lineNumber += 1
+
+    def trim(self, lineNumber: int) -> None:
+        """
+        ## 丢弃 lineNumber 之前的记录
+        """
+        count = min(lineNumber, self.lineCount) - self.firstLineNumber
+        if count <= 0:
+            return
+        for column in (self.timestamps, self.levels, self.QQIDs, self.messageOffsets):
+            del column[:count]
+        for column in self.levelLines.values():
+            del column[:bisect_left(column, lineNumber)]
+        self.firstLineNumber += count
+
+    def clear(self) -> None:
+        """
+        ## 清空索引
+        """
+        self.__init__()
+
+    def level(self, lineNumber: int) -> LogLevel:
+        """
+        ## 返回指定行的日志等级, 超出范围返回 LogLevel.NONE
+        """
+        index = lineNumber - self.firstLineNumber
+        return LogLevel(self.levels[index]) if 0 <= index < len(self.levels) else LogLevel.NONE
+
+    def lineRange(self, startTime: Optional[float] = None, endTime: Optional[float] = None) -> range:
+        """
+        ## 返回时间在 [startTime, endTime) 内的行号范围
+            - startTime / endTime 为 None 时不限制
+        """
+        start = bisect_left(self.timestamps, startTime) if startTime is not None else 0
+        end = bisect_left(self.timestamps, endTime) if endTime is not None else len(self.timestamps)
+        return range(self.firstLineNumber + start, self.firstLineNumber + max(start, end))
+
+    def filter(
+            self, minLevel: LogLevel = LogLevel.NONE, startTime: Optional[float] = None, endTime: Optional[float] = None
+    ) -> Sequence[int]:
+        """
+        ## 返回等级不低于 minLevel 且在时间范围内的行号, 按行号升序
+            - 不按等级过滤时直接返回 range, 不逐行生成行号, 由调用方按需切片
+        """
+        lines = self.lineRange(startTime, endTime)
+        if minLevel == LogLevel.NONE:
+            return lines
+
+        # 每个等级的行号列表都是有序的, 先二分截取时间范围再归并
+        slices = []
+        for level in LogLevel:
+            if level < minLevel:
+                continue
+            column = self.levelLines[level]
+            slices.append(column[bisect_left(column, lines.start):bisect_left(column, lines.stop)])
+        return list(heapq.merge(*slices))
+
+    def nextLine(self, level: LogLevel, after: int) -> Optional[int]:
+        """
+        ## 返回 after 之后第一条指定等级的行号, 没有则返回 None
+        """
+        column = self.levelLines[level]
+        index = bisect_right(column, after)
+        return column[index] if index < len(column) else None
+
+    def previousLine(self, level: LogLevel, before: int) -> Optional[int]:
+        """
+        ## 返回 before 之前最后一条指定等级的行号, 没有则返回 None
+        """
+        column = self.levelLines[level]
+        index = bisect_left(column, before)
+        return column[index - 1] if index > 0 else None
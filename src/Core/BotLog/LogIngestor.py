@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import List, Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+
+from src.Core.BotLog.LogIndex import LogRecord
+
+
+class LogIngestor(QObject):
+    """
+    ## 日志写入缓冲
+        - 进程输出先进入缓冲区, 每隔 interval 毫秒最多刷新一次, 刷新时合并为一次插入
+        - 统计每秒写入的行数以及刷新延迟(从第一段输出进入缓冲区到刷新完成)
+    """
+
+    flushed = Signal(list, list)  # 合并后的完整行, 每行对应的 LogRecord
+    statsChanged = Signal(float, float)  # 每秒行数, 刷新延迟(毫秒)
+
+    def __init__(self, interval: int = 33, parent: Optional[QObject] = None) -> None:
+        """
+        ## 初始化
+            - interval 刷新间隔(毫秒), 默认约为一帧
+        """
+        super().__init__(parent)
+        # 创建属性
+        self._lines: List[str] = []  # 等待刷新的行
+        self._records: List[LogRecord] = []  # 等待刷新的行对应的记录
+        self._firstQueuedTime: Optional[float] = None  # 缓冲区中最早的输出进入的时间
+
+        # 统计数据
+        self.totalLines = 0
+        self.linesPerSecond = 0.0
+        self.flushLatency = 0.0  # 最近一秒内的平均刷新延迟(毫秒)
+        self.maxFlushLatency = 0.0
+        self._windowStart = time.perf_counter()
+        self._windowLines = 0
+        self._windowLatency = 0.0
+        self._windowFlushes = 0
+
+        # 创建刷新计时器
+        self.flushTimer = QTimer(self)
+        self.flushTimer.setSingleShot(True)
+        self.flushTimer.setInterval(interval)
+        self.flushTimer.timeout.connect(self.flush)
+
+        # 一段时间没有输出时把每秒行数归零, 避免一直显示过时的数据
+        self.idleTimer = QTimer(self)
+        self.idleTimer.setSingleShot(True)
+        self.idleTimer.setInterval(1500)
+        self.idleTimer.timeout.connect(self._idleSlot)
+
+    def feedLines(self, lines: List[str], records: List[LogRecord]) -> None:
+        """
+        ## 写入多行完整的输出
+            - records 与 lines 一一对应的结构化记录
+        """
+        if not lines:
+            return
+
+        if self._firstQueuedTime is None:
+            self._firstQueuedTime = time.perf_counter()
+        self._lines.extend(lines)
+        self._records.extend(records)
+
+        if not self.flushTimer.isActive():
+            # 本帧内的第一段输出, 启动计时器, 后续的输出都会合并到这次刷新
+            self.flushTimer.start()
+
+    @Slot()
+    def flush(self) -> None:
+        """
+        ## 把缓冲区中的行一次性发送出去
+        """
+        self.flushTimer.stop()
+        if not self._lines:
+            return
+
+        lines, self._lines = self._lines, []
+        records, self._records = self._records, []
+        self.flushed.emit(lines, records)
+
+        latency = (time.perf_counter() - self._firstQueuedTime) * 1000
+        self._firstQueuedTime = None
+        self._updateStats(len(lines), latency)
+
+    def reset(self) -> None:
+        """
+        ## 丢弃缓冲区中的内容并重置统计
+        """
+        self.flushTimer.stop()
+        self.idleTimer.stop()
+        self._lines.clear()
+        self._records.clear()
+        self._firstQueuedTime = None
+        self.totalLines = 0
+        self.linesPerSecond = self.flushLatency = self.maxFlushLatency = 0.0
+        self._windowStart = time.perf_counter()
+        self._windowLines = self._windowFlushes = 0
+        self._windowLatency = 0.0
+        self.statsChanged.emit(self.linesPerSecond, self.flushLatency)
+
+    def _updateStats(self, lineCount: int, latency: float) -> None:
+        """
+        ## 更新统计数据, 每秒汇总一次并发送 statsChanged
+        """
+        self.totalLines += lineCount
+        self.maxFlushLatency = max(self.maxFlushLatency, latency)
+        self._windowLines += lineCount
+        self._windowLatency += latency
+        self._windowFlushes += 1
+        self.idleTimer.start()
+
+        elapsed = time.perf_counter() - self._windowStart
+        if elapsed < 1:
+            return
+
+        self.linesPerSecond = self._windowLines / elapsed
+        self.flushLatency = self._windowLatency / self._windowFlushes
+        self._windowStart = time.perf_counter()
+        self._windowLines = self._windowFlushes = 0
+        self._windowLatency = 0.0
+        self.statsChanged.emit(self.linesPerSecond, self.flushLatency)
+
+    @Slot()
+    def _idleSlot(self) -> None:
+        """
+        ## 没有新的输出, 重置统计窗口
+        """
+        self.linesPerSecond = 0.0
+        self._windowStart = time.perf_counter()
+        self._windowLines = self._windowFlushes = 0
+        self._windowLatency = 0.0
+        self.statsChanged.emit(self.linesPerSecond, self.flushLatency)
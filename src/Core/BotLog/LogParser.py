@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import codecs
+import re
+from abc import ABC
+from datetime import datetime
+from typing import List
+
+from PySide6.QtCore import QObject, QThread, QCoreApplication, Signal, Slot
+from creart import it, add_creator, exists_module
+from creart.creator import AbstractCreator, CreateTargetInfo
+
+from src.Core.BotLog.LogIndex import LogLevel, LogRecord
+from src.Core.BotLog.LogSearch import tokenize
+
+# 只编译一次, 所有解析器共用
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+QRCODE_PATTERN = re.compile(r"二维码已保存到\s(.+)")
+# 时间, 等级, QQ 号(可能为空), 匹配结束的位置即为消息正文的起始位置
+RECORD_PATTERN = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \[(DEBUG|INFO|WARN|ERROR)\](?: \((\d*)\))?(?: \| )?"
+)
+FAST_LOGIN_ERROR = "[ERROR] () | 快速登录错误"
+
+
+class LogParserThread(QThread):
+    """
+    ## 所有 LogParser 共用的工作线程
+        - 无论运行多少个机器人都只占用一个线程
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setObjectName("LogParserThread")
+        self.start()
+        if (app := QCoreApplication.instance()) is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    @Slot()
+    def stop(self) -> None:
+        """
+        ## 退出事件循环并等待线程结束
+        """
+        self.quit()
+        self.wait()
+
+
+class LogParserThreadClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.BotLog.LogParser", "LogParserThread"),)
+
+    # 静态方法available()，用于检查模块"LogParser"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.BotLog.LogParser")
+
+    # 静态方法create()，用于创建LogParserThread类的实例，返回值为LogParserThread对象。
+    @staticmethod
+    def create(create_type: [LogParserThread]) -> LogParserThread:
+        return LogParserThread()
+
+
+add_creator(LogParserThreadClassCreator)
+
+
+class LogParser(QObject):
+    """
+    ## 在工作线程中解析 NapCat 的输出
+        - UTF-8 增量解码, 被拆分在两次读取之间的多字节字符也能正确还原
+        - 移除 ANSI 转义码并按行拆分, 不完整的最后一行暂存到下次解析
+        - 每行只解析一次, 生成 LogRecord(时间, 等级, QQ 号, 正文偏移, 词元), GUI 线程不再需要正则
+        - 匹配登录相关的信息并以信号的形式发送回 GUI 线程
+    """
+
+    # 解析结果, 均在工作线程中发送, 连接到 GUI 线程的槽函数时会自动排队
+    linesParsed = Signal(list, list)  # 完整的日志行, 每行对应的 LogRecord
+    qrcodeFound = Signal(str)  # 登录二维码的路径
+    loginSuccess = Signal()  # 登录成功
+    fastLoginError = Signal()  # 快速登录错误
+
+    # 内部信号, 用于把数据从调用方线程传递到工作线程
+    _feedSignal = Signal(bytes)
+    _finishSignal = Signal(str)
+    _resetSignal = Signal(bool)
+
+    def __init__(self, QQID: str) -> None:
+        """
+        ## 初始化并移动到共用的工作线程
+            - QQID 机器人的 QQ 号, 用于匹配登录成功的信息
+        """
+        super().__init__()
+        self.QQID = QQID
+        self.isLogin = False  # 登录成功后不再匹配登录相关的信息
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pendingLine = ""
+        self._lastTimestamp = 0.0  # 没有时间的行沿用上一行的时间
+        self._lastTimeText = ""  # 同一秒内的多行不重复解析时间
+
+        self.moveToThread(it(LogParserThread))
+        self._feedSignal.connect(self._parse)
+        self._finishSignal.connect(self._finish)
+        self._resetSignal.connect(self._reset)
+
+    def feed(self, data: bytes) -> None:
+        """
+        ## 提交一段原始输出, 可以在任意线程中调用
+        """
+        self._feedSignal.emit(data)
+
+    def finish(self, trailer: str = "") -> None:
+        """
+        ## 进程结束时调用, 输出暂存的内容
+            - trailer 追加在最后的一行, 为空则不追加
+        """
+        self._finishSignal.emit(trailer)
+
+    def reset(self, clearTimestamp: bool = False) -> None:
+        """
+        ## 重置解码器和登录状态, 用于重新启动进程
+            - clearTimestamp 是否同时清除上一行的时间, 只在日志会话和索引重新开始时清除,
+              否则重启后开头没有时间的行会被记为 0, 破坏时间列的单调性
+        """
+        self._resetSignal.emit(clearTimestamp)
+
+    @Slot(bytes)
+    def _parse(self, data: bytes) -> None:
+        """
+        ## 解码并解析一段输出
+        """
+        buffer = self._pendingLine + self._decoder.decode(data)
+        complete, separator, self._pendingLine = buffer.rpartition("\n")
+        if not separator:
+            # 还没有完整的一行
+            return
+        # 转义码可能被拆分在两次读取之间, 所以只处理完整的行
+        lines = ANSI_ESCAPE.sub("", complete).split("\n")
+        self._emitLines([line.rstrip("\r") for line in lines])
+
+    @Slot(str)
+    def _finish(self, trailer: str) -> None:
+        """
+        ## 输出解码器和暂存区中剩余的内容
+        """
+        self._pendingLine = ANSI_ESCAPE.sub("", self._pendingLine + self._decoder.decode(b"", final=True))
+        lines = [self._pendingLine.rstrip("\r")] if self._pendingLine else []
+        lines += [trailer] if trailer else []
+        self._pendingLine = ""
+        self._emitLines(lines)
+
+    @Slot(bool)
+    def _reset(self, clearTimestamp: bool) -> None:
+        """
+        ## 重置解析状态
+        """
+        self._decoder.reset()
+        self._pendingLine = ""
+        if clearTimestamp:
+            self._lastTimestamp = 0.0
+            self._lastTimeText = ""
+        self.isLogin = False
+
+    def _emitLines(self, lines: List[str]) -> None:
+        """
+        ## 生成结构化记录, 匹配登录信息并发送信号
+        """
+        if not lines:
+            return
+
+        records = []
+        for line in lines:
+            records.append(self._parseRecord(line))
+            if not self.isLogin:
+                self._matchLogin(line)
+
+        self.linesParsed.emit(lines, records)
+
+    def _parseRecord(self, line: str) -> LogRecord:
+        """
+        ## 把一行日志解析为 LogRecord
+        """
+        if not (match := RECORD_PATTERN.match(line)):
+            return LogRecord(self._lastTimestamp, LogLevel.NONE, 0, 0, tokenize(line))
+
+        timeText, level, QQID = match.groups()
+        if timeText != self._lastTimeText:
+            self._lastTimeText = timeText
+            # 日志时间可能因为系统时间调整而倒退, 取最大值保证时间列单调不减
+            self._lastTimestamp = max(self._lastTimestamp, datetime.fromisoformat(timeText).timestamp())
+        return LogRecord(
+            self._lastTimestamp, LogLevel[level], int(QQID) if QQID else 0, match.end(), tokenize(line[match.end():])
+        )
+
+    def _matchLogin(self, line: str) -> None:
+        """
+        ## 匹配登录相关的信息
+        """
+        if FAST_LOGIN_ERROR in line:
+            self.fastLoginError.emit()
+        elif match := QRCODE_PATTERN.search(line):
+            self.qrcodeFound.emit(match.group(1).strip())
+        elif f"[INFO] ({self.QQID}) | 登录成功!" in line:
+            self.isLogin = True
+            self.loginSuccess.emit()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import mmap
+import re
+import shutil
+import struct
+import tempfile
+import weakref
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+# 英文/数字按连续的词切分, 其他字符(例如中文)逐字切分
+TOKEN_PATTERN = re.compile(r"[0-9a-z_]+|[^\x00-\x7f\s]")
+
+# 磁盘块的文件头: 词元数量, 词元区的起始位置, 倒排表区的起始位置
+BLOCK_HEADER = struct.Struct("<QQQ")
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """
+    ## 把文本切分为去重后的小写词元
+    """
+    return frozenset(TOKEN_PATTERN.findall(text.lower()))
+
+
+class IndexBlock:
+    """
+    ## 写入磁盘的一块倒排表, 查询时通过 mmap 二分查找词元, 不把整块读入内存
+        - 文件结构: 文件头, 词元偏移表 array("Q"), 倒排表偏移表 array("Q"), 词元区(按 UTF-8 字节排序), 倒排表区
+    """
+
+    def __init__(self, path: Path, start: int, end: int) -> None:
+        """
+        ## 初始化
+            - path 块文件路径
+            - start / end 块内的行号范围 [start, end)
+        """
+        self.path = path
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def write(cls, path: Path, start: int, end: int, postings: Dict[str, array]) -> "IndexBlock":
+        """
+        ## 把倒排表写入 path 并返回对应的块
+        """
+        keys = sorted(token.encode("utf-8") for token in postings)
+        keyOffsets, postingOffsets = array("Q", [0]), array("Q", [0])
+        data = array("I")
+        for key in keys:
+            keyOffsets.append(keyOffsets[-1] + len(key))
+            data.extend(postings[key.decode("utf-8")])
+            postingOffsets.append(len(data) * data.itemsize)
+
+        keysStart = BLOCK_HEADER.size + (len(keys) + 1) * 16
+        with open(str(path), "wb") as f:
+            f.write(BLOCK_HEADER.pack(len(keys), keysStart, keysStart + keyOffsets[-1]))
+            f.write(keyOffsets.tobytes())
+            f.write(postingOffsets.tobytes())
+            f.write(b"".join(keys))
+            f.write(data.tobytes())
+        return cls(path, start, end)
+
+    def postings(self, tokens: Iterable[str]) -> List[Optional[array]]:
+        """
+        ## 返回每个词元的倒排表, 不存在的词元为 None
+        """
+        with open(str(self.path), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            count, keysStart, postingsStart = BLOCK_HEADER.unpack_from(mapped)
+
+            def offset(table: int, index: int) -> int:
+                return struct.unpack_from("<Q", mapped, BLOCK_HEADER.size + (table * (count + 1) + index) * 8)[0]
+
+            def key(index: int) -> bytes:
+                return mapped[keysStart + offset(0, index):keysStart + offset(0, index + 1)]
+
+            result = []
+            for token in tokens:
+                target = token.encode("utf-8")
+                low, high = 0, count
+                while low < high:
+                    middle = (low + high) // 2
+                    if key(middle) < target:
+                        low = middle + 1
+                    else:
+                        high = middle
+                if low == count or key(low) != target:
+                    result.append(None)
+                    continue
+                posting = array("I")
+                posting.frombytes(mapped[postingsStart + offset(1, low):postingsStart + offset(1, low + 1)])
+                result.append(posting)
+            return result
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class LogSearchIndex:
+    """
+    ## 日志全文索引
+        - 每个词元对应一个升序的行号列表(倒排表), 新的行到达时只需要追加
+        - 倒排表按 blockLines 行分块, 写满的块保存到临时目录, 内存中只保留当前块,
+          占用的内存与日志总行数无关(每块约十几 MB, 取决于日志中不重复的 ID 数量)
+        - 查询时逐块从最短的倒排表开始, 在其余倒排表中二分求交集, 磁盘上的块只读取查询中的词元
+        - trim 丢弃已经无法读取的旧行所在的块
+    """
+
+    blockLines = 32768
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, array] = {}  # 当前块的倒排表
+        self.blocks: List[IndexBlock] = []  # 已写入磁盘的块, 按行号升序
+        self.blockStart = 0  # 当前块的第一行
+        self.firstLineNumber = 0  # 可以查询到的第一行, 之前的行已被 trim
+        self.lineCount = 0
+        self._directory: Optional[Path] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def append(self, tokenLists: Iterable[FrozenSet[str]]) -> None:
+        """
+        ## 追加一批行的词元, 行号紧接在已有的行之后
+            - tokenLists 每行的词元, 由 tokenize 生成
+        """
+        lineNumber = self.lineCount
+        postings = self.postings
+        for tokens in tokenLists:
+            for token in tokens:
+                if (posting := postings.get(token)) is None:
+                    posting = postings[token] = array("I")
+                posting.append(lineNumber)
+            lineNumber += 1
+            if lineNumber - self.blockStart >= self.blockLines:
+                self.lineCount = lineNumber
+                self._sealBlock()
+                postings = self.postings
+        self.lineCount = lineNumber
+
+    def trim(self, lineNumber: int) -> None:
+        """
+        ## 丢弃 lineNumber 之前的行, 完全位于其之前的块从磁盘删除
+        """
+        self.firstLineNumber = max(self.firstLineNumber, lineNumber)
+        while self.blocks and self.blocks[0].end <= self.firstLineNumber:
+            self.blocks.pop(0).remove()
+
+    def clear(self) -> None:
+        """
+        ## 清空索引并删除磁盘上的块
+        """
+        self.postings = {}
+        self.blockStart = self.firstLineNumber = self.lineCount = 0
+        self.blocks.clear()
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._directory = None
+
+    def search(self, query: str) -> List[int]:
+        """
+        ## 返回包含查询中全部词元的行号, 按行号升序
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        result = []
+        for block in self.blocks:
+            result.extend(self._intersect(block.postings(tokens)))
+        result.extend(self._intersect([self.postings.get(token) for token in tokens]))
+        return result[bisect_left(result, self.firstLineNumber):]
+
+    @staticmethod
+    def matches(tokens: FrozenSet[str], queryTokens: FrozenSet[str]) -> bool:
+        """
+        ## 判断一行的词元是否包含查询中的全部词元, 用于新到达的行
+        """
+        return queryTokens <= tokens
+
+    def _sealBlock(self) -> None:
+        """
+        ## 把当前块写入临时目录, 之后的行写入新的块
+        """
+        if self._directory is None:
+            self._directory = Path(tempfile.mkdtemp(prefix="NapCatDesktop-LogIndex-"))
+            # 对象被回收或程序退出时删除临时目录
+            self._finalizer = weakref.finalize(self, shutil.rmtree, str(self._directory), True)
+        path = self._directory / f"{self.blockStart}.idx"
+        self.blocks.append(IndexBlock.write(path, self.blockStart, self.lineCount, self.postings))
+        self.postings = {}
+        self.blockStart = self.lineCount
+
+    @classmethod
+    def _intersect(cls, postings: List[Optional[array]]) -> List[int]:
+        """
+        ## 求多个倒排表的交集
+        """
+        if not all(postings):
+            return []
+        postings = sorted(postings, key=len)
+        result = list(postings[0])
+        for posting in postings[1:]:
+            result = [lineNumber for lineNumber in result if cls._contains(posting, lineNumber)]
+            if not result:
+                break
+        return result
+
+    @staticmethod
+    def _contains(posting: array, lineNumber: int) -> bool:
+        index = bisect_left(posting, lineNumber)
+        return index < len(posting) and posting[index] == lineNumber
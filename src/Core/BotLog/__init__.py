@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+from src.Core.BotLog.LogBuffer import LogRingBuffer, LogHistory
+from src.Core.BotLog.LogFile import LogWriter, LogTail, readFileRange, compressFile
+from src.Core.BotLog.LogIndex import LogIndex, LogLevel, LogRecord
+from src.Core.BotLog.LogIngestor import LogIngestor
+from src.Core.BotLog.LogParser import LogParser, LogParserThread
+from src.Core.BotLog.LogSearch import LogSearchIndex, tokenize
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+from pathlib import Path
+from typing import Optional
+
+from PySide6.QtCore import QObject, QProcess, QTimer, Signal, Slot
+from creart import it
+from loguru import logger
+
+from src.Core.BotState import BotStateRegistry
+from src.Core.Config import cfg
+from src.Core.Config.ConfigModel import Config
+
+
+class BotProcess(QObject):
+    """
+    ## 机器人的 QQ/NapCat 进程, 启动和停止都不会阻塞事件循环
+        - 启动后在 QProcess.started 时才标记为运行中, 启动失败时发送 failedToStart
+        - stop 先请求进程正常退出(terminate), 超过 cfg.BotStopTimeout 秒仍未退出时再 kill
+        - 状态变化通过 BotStateRegistry 广播, 停止请求发出后为 STOPPING, 进程结束后才是 STOPPED
+    """
+
+    starting = Signal()  # 即将启动新的进程(包括 BotSupervisor 自动重启), 订阅者可以在这里重置日志等状态
+    output = Signal(bytes)  # 进程的输出(已合并 stdout 和 stderr)
+    finished = Signal(int, int)  # 进程结束, 参数为退出码和 QProcess.ExitStatus
+    failedToStart = Signal(str)  # 启动失败, 参数为错误信息
+
+    def __init__(self, config: Config, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.config = config
+        self.process: Optional[QProcess] = None
+        self.isStopping = False  # 已请求停止, 进程尚未结束
+
+        self._killTimer = QTimer(self)
+        self._killTimer.setSingleShot(True)
+        self._killTimer.timeout.connect(self._killSlot)
+
+    @property
+    def QQID(self) -> str:
+        return self.config.bot.QQID
+
+    @property
+    def isRunning(self) -> bool:
+        """
+        ## 进程是否存在(包括正在启动和正在停止)
+        """
+        return self.process is not None and self.process.state() != QProcess.ProcessState.NotRunning
+
+    def start(self) -> None:
+        """
+        ## 启动进程, 已在运行时忽略
+            - 使用 QProcess.systemEnvironment() 复制一份系统环境变量, 添加 NapCat 所需的 ELECTRON_RUN_AS_NODE=1
+            - QQ 作为程序, NapCat 以参数形式启动, 输出合并为一个通道
+        """
+        if self.isRunning:
+            return
+        self.starting.emit()
+
+        env = QProcess.systemEnvironment()
+        env.append("ELECTRON_RUN_AS_NODE=1")
+
+        self.process = QProcess(self)
+        self.process.setEnvironment(env)
+        self.process.setProgram(str(Path(self.config.advanced.QQPath) / "QQ.exe"))
+        self.process.setArguments([str(Path(cfg.NapCatPath.value) / "napcat.mjs"), "-q", self.QQID])
+        self.process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+        self.process.readyReadStandardOutput.connect(self._readyReadSlot)
+        self.process.started.connect(self._startedSlot)
+        self.process.finished.connect(self._finishedSlot)
+        self.process.errorOccurred.connect(self._errorOccurredSlot)
+        self.process.start()
+
+    def stop(self) -> None:
+        """
+        ## 请求停止进程, 立即返回, 进程结束时发送 finished
+        """
+        if not self.isRunning or self.isStopping:
+            return
+
+        self.isStopping = True
+        it(BotStateRegistry).markStopped(self.QQID)
+        timeout = cfg.get(cfg.BotStopTimeout)
+        if timeout <= 0:
+            self.process.kill()
+            return
+        self.process.terminate()
+        self._killTimer.start(timeout * 1000)
+
+    @Slot()
+    def _killSlot(self) -> None:
+        """
+        ## 等待超时, 强制结束进程
+        """
+        if self.isRunning:
+            logger.warning(f"机器人 {self.QQID} 在 {cfg.get(cfg.BotStopTimeout)} 秒内没有退出, 强制结束")
+            self.process.kill()
+
+    @Slot()
+    def _readyReadSlot(self) -> None:
+        """
+        ## 只读取原始字节, 解码和解析交给订阅者
+        """
+        if self.sender() is self.process:
+            self.output.emit(self.process.readAllStandardOutput().data())
+
+    @Slot()
+    def _startedSlot(self) -> None:
+        if self.sender() is self.process and not self.isStopping:
+            it(BotStateRegistry).markStarted(self.QQID)
+
+    @Slot(int, QProcess.ExitStatus)
+    def _finishedSlot(self, exitCode: int, exitStatus: QProcess.ExitStatus) -> None:
+        process = self.sender()
+        if process is not self.process:
+            return
+        self._killTimer.stop()
+        self.isStopping = False
+        # 读取结束前最后的输出
+        if data := process.readAllStandardOutput().data():
+            self.output.emit(data)
+        self.process = None
+        process.deleteLater()
+
+        it(BotStateRegistry).markExited(self.QQID, exitCode)
+        self.finished.emit(exitCode, exitStatus.value)
+
+    @Slot(QProcess.ProcessError)
+    def _errorOccurredSlot(self, error: QProcess.ProcessError) -> None:
+        """
+        ## 启动失败时不会发送 finished, 在这里结束
+        """
+        process = self.sender()
+        if error != QProcess.ProcessError.FailedToStart or process is not self.process:
+            return
+        errorString = process.errorString()
+        logger.error(f"机器人 {self.QQID} 启动失败: {errorString}")
+        self.process = None
+        process.deleteLater()
+
+        it(BotStateRegistry).markExited(self.QQID, -1)
+        self.failedToStart.emit(errorString)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import time
+from abc import ABC
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from PySide6.QtCore import QObject, Signal
+from creart import add_creator, exists_module
+from creart.creator import AbstractCreator, CreateTargetInfo
+
+from src.Core.Config.ConfigModel import Config
+
+
+class BotState(IntEnum):
+    """
+    ## 机器人的运行状态
+    """
+    STOPPED = 0
+    RUNNING = 1
+    LOGGED_IN = 2
+    STOPPING = 3  # 已请求停止, 进程尚未结束
+
+
+class BotStatus(QObject):
+    """
+    ## 单个机器人的状态, 控件只连接自己关心的机器人的信号, 不需要遍历列表
+    """
+
+    started = Signal()  # 进程已启动
+    stopped = Signal()  # 用户请求停止, 进程结束时还会发送 exited
+    loggedIn = Signal()  # 登录成功
+    exited = Signal(int)  # 进程结束, 参数为退出码
+    stateChanged = Signal(int)  # 状态变化, 参数为 BotState
+
+    def __init__(self, QQID: str, config: Optional[Config] = None, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.QQID = QQID
+        self.config = config
+        self.state = BotState.STOPPED
+        self.startedAt: Optional[float] = None  # 当前进程启动的时间(单调时钟), 未运行时为 None
+        self.loggedInAt: Optional[float] = None  # 当前进程登录成功的时间(单调时钟), 未登录时为 None
+        self.restartCount = 0  # 本次运行期间被 BotSupervisor 自动重启的次数
+        self.lastExitCode: Optional[int] = None
+
+    @property
+    def isRun(self) -> bool:
+        return self.state != BotState.STOPPED
+
+    @property
+    def isLogin(self) -> bool:
+        return self.state == BotState.LOGGED_IN
+
+    @property
+    def uptime(self) -> float:
+        """
+        ## 当前进程已运行的秒数, 未运行时为 0
+        """
+        return time.monotonic() - self.startedAt if self.startedAt is not None else 0.0
+
+    def setState(self, state: BotState) -> None:
+        """
+        ## 设置状态, 只在发生变化时发送 stateChanged
+        """
+        if state == self.state:
+            return
+        self.state = state
+        self.stateChanged.emit(state)
+
+
+class BotStateRegistry(QObject):
+    """
+    ## 以 QQID 为键的机器人状态表
+        - 机器人的启动、停止、登录、退出都通过这里广播
+        - 机器人的增删通过 botAdded / botRemoved 通知, 首页不再定时刷新列表
+    """
+
+    botAdded = Signal(str)
+    botRemoved = Signal(str)
+    stateChanged = Signal(str, int)  # QQID, BotState
+    allStopped = Signal()  # 最后一个运行中的机器人的进程已结束
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.bots: Dict[str, BotStatus] = {}
+
+    def __contains__(self, QQID: str) -> bool:
+        return QQID in self.bots
+
+    def __len__(self) -> int:
+        return len(self.bots)
+
+    def add(self, QQID: str, config: Optional[Config] = None) -> BotStatus:
+        """
+        ## 登记机器人, 已登记的只更新配置并返回原有的状态
+        """
+        if (status := self.bots.get(QQID)) is not None:
+            status.config = config or status.config
+            return status
+        status = BotStatus(QQID, config, self)
+        status.stateChanged.connect(lambda state: self.stateChanged.emit(QQID, state))
+        self.bots[QQID] = status
+        self.botAdded.emit(QQID)
+        return status
+
+    def remove(self, QQID: str) -> None:
+        """
+        ## 移除机器人
+        """
+        if (status := self.bots.pop(QQID, None)) is None:
+            return
+        self.botRemoved.emit(QQID)
+        status.deleteLater()
+
+    def get(self, QQID: str) -> BotStatus:
+        """
+        ## 返回机器人的状态, 未登记时自动登记
+        """
+        return self.bots.get(QQID) or self.add(QQID)
+
+    def isRun(self, QQID: str) -> bool:
+        return QQID in self.bots and self.bots[QQID].isRun
+
+    def runningBots(self) -> List[str]:
+        """
+        ## 返回所有正在运行的机器人的 QQID
+        """
+        return [QQID for QQID, status in self.bots.items() if status.isRun]
+
+    def markStarted(self, QQID: str) -> None:
+        """
+        ## 进程已启动
+        """
+        status = self.get(QQID)
+        status.startedAt = time.monotonic()
+        status.loggedInAt = None
+        status.setState(BotState.RUNNING)
+        status.started.emit()
+
+    def markStopped(self, QQID: str) -> None:
+        """
+        ## 用户请求停止, 进程结束前状态为 STOPPING
+        """
+        status = self.get(QQID)
+        status.setState(BotState.STOPPING)
+        status.stopped.emit()
+
+    def markLoggedIn(self, QQID: str) -> None:
+        """
+        ## 登录成功
+        """
+        status = self.get(QQID)
+        status.loggedInAt = time.monotonic()
+        status.setState(BotState.LOGGED_IN)
+        status.loggedIn.emit()
+
+    def markRestarting(self, QQID: str) -> None:
+        """
+        ## BotSupervisor 自动重启了机器人
+        """
+        self.get(QQID).restartCount += 1
+
+    def markExited(self, QQID: str, exitCode: int) -> None:
+        """
+        ## 进程结束(包括崩溃和启动失败)
+        """
+        status = self.get(QQID)
+        wasRunning = status.isRun
+        status.startedAt = status.loggedInAt = None
+        status.lastExitCode = exitCode
+        status.setState(BotState.STOPPED)
+        status.exited.emit(exitCode)
+        if wasRunning and not self.runningBots():
+            self.allStopped.emit()
+
+
+class BotStateRegistryClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.BotState", "BotStateRegistry"),)
+
+    # 静态方法available()，用于检查模块"BotState"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.BotState")
+
+    # 静态方法create()，用于创建BotStateRegistry类的实例，返回值为BotStateRegistry对象。
+    @staticmethod
+    def create(create_type: [BotStateRegistry]) -> BotStateRegistry:
+        return BotStateRegistry()
+
+
+add_creator(BotStateRegistryClassCreator)
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+import time
+from abc import ABC
+from typing import Dict, List, Set, Tuple
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtNetwork import QTcpSocket
+from creart import add_creator, exists_module, it
+from creart.creator import AbstractCreator, CreateTargetInfo
+from loguru import logger
+
+from src.Core import timer
+from src.Core.BotProcess import BotProcess
+from src.Core.BotState import BotStateRegistry
+from src.Core.Config import cfg
+from src.Core.Config.ConfigModel import Config
+
+
+class BotSupervisor(QObject):
+    """
+    ## 管理所有机器人的进程, 意外退出或失去响应时自动重启
+        - 界面和无界面模式都通过这里启动、停止机器人, 它知道哪些机器人应该在运行
+        - 应该在运行的机器人退出后按指数退避重启, crashWindow 秒内重启达到 crashLimit 次时放弃
+        - 登录后定期连接配置中启用的 HTTP / WS 端口, 连续 healthFailures 次连接失败时重启
+        - 快速登录错误也通过这里重启, 计入同一个重启次数限制
+        - 自动重启的次数和进程的运行时间记录在 BotStateRegistry 中
+    """
+
+    # 即将自动重启, 参数为 QQID, 等待的毫秒数, 原因
+    restartScheduled = Signal(str, int, str)
+    # 重启次数过多, 不再自动重启, 参数为 QQID, 原因
+    gaveUp = Signal(str, str)
+
+    backoffBase = 2  # 第一次重启前等待的秒数, 之后每次翻倍
+    backoffMax = 300  # 最长等待的秒数
+    crashLimit = 5
+    crashWindow = 600  # 统计重启次数的时间窗口(秒)
+    healthTimeout = 5000  # 连接端口的超时时间(毫秒)
+    healthFailures = 3  # 连续失败多少次后重启
+    healthGrace = 60  # 登录后多久开始检查端口(秒), NapCat 需要一些时间启动服务
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.processes: Dict[str, BotProcess] = {}
+        self._desired: Dict[str, bool] = {}  # QQID -> 是否应该在运行
+        self._restarts: Dict[str, List[float]] = {}  # QQID -> 时间窗口内自动重启的时间
+        self._restartTimers: Dict[str, QTimer] = {}  # QQID -> 等待退避的计时器
+        self._restartNow: Dict[str, str] = {}  # QQID -> 旧进程结束后立即启动的原因
+        self._probeFailures: Dict[Tuple[str, int], int] = {}  # (QQID, 端口) -> 连续连接失败次数
+        self._removing: Set[str] = set()  # 已移除、进程尚未结束的机器人
+
+        # 启动健康检查的定时器
+        self.checkHealth()
+
+    def process(self, config: Config) -> BotProcess:
+        """
+        ## 返回机器人的进程对象, 不存在时创建, 已存在时更新配置(下次启动时生效)
+        """
+        QQID = config.bot.QQID
+        if (process := self.processes.get(QQID)) is not None:
+            process.config = config
+            return process
+
+        process = BotProcess(config, self)
+        process.finished.connect(lambda exitCode, exitStatus: self._finishedSlot(QQID, exitCode))
+        # 启动失败通常是路径配置错误, 重启也无济于事
+        process.failedToStart.connect(lambda error: self.stop(QQID))
+        self.processes[QQID] = process
+        return process
+
+    def remove(self, QQID: str) -> None:
+        """
+        ## 停止并移除机器人
+            - 进程结束后才从 BotStateRegistry 中移除, 停止过程中的状态变化不会重新登记已删除的机器人
+        """
+        if QQID in self._removing:
+            return
+        self.stop(QQID)
+        self._desired.pop(QQID, None)
+        self._restarts.pop(QQID, None)
+        process = self.processes.pop(QQID, None)
+        if process is None or not process.isRunning:
+            if process is not None:
+                process.deleteLater()
+            it(BotStateRegistry).remove(QQID)
+            return
+
+        def exited() -> None:
+            self._removing.discard(QQID)
+            process.deleteLater()
+            if QQID not in self.processes:
+                # 期间没有重新添加同一个机器人
+                it(BotStateRegistry).remove(QQID)
+
+        self._removing.add(QQID)
+        process.finished.connect(lambda exitCode, exitStatus: exited())
+
+    def start(self, QQID: str) -> None:
+        """
+        ## 手动启动, 清空之前的重启记录
+        """
+        if (process := self.processes.get(QQID)) is None:
+            logger.error(f"机器人 {QQID} 没有对应的进程, 无法启动")
+            return
+        self._desired[QQID] = True
+        self._restarts.pop(QQID, None)
+        self._cancelRestart(QQID)
+        process.start()
+
+    def stop(self, QQID: str) -> None:
+        """
+        ## 手动停止, 不再自动重启
+        """
+        self._desired[QQID] = False
+        self._restartNow.pop(QQID, None)
+        self._cancelRestart(QQID)
+        if (process := self.processes.get(QQID)) is not None:
+            process.stop()
+
+    def stopAll(self) -> None:
+        """
+        ## 同时停止所有机器人, 全部退出后 BotStateRegistry 发送 allStopped
+        """
+        for QQID in list(self.processes):
+            self.stop(QQID)
+
+    def restart(self, QQID: str, reason: str = "") -> None:
+        """
+        ## 立即重启, 旧进程结束后再启动新进程
+        """
+        if (process := self.processes.get(QQID)) is None:
+            logger.error(f"机器人 {QQID} 没有对应的进程, 无法重启")
+            return
+        self._desired[QQID] = True
+        self._cancelRestart(QQID)
+        if not process.isRunning:
+            process.start()
+            return
+        self._restartNow[QQID] = reason
+        process.stop()
+
+    def reportFastLoginError(self, QQID: str) -> bool:
+        """
+        ## 快速登录错误, 立即重启, 返回是否重启
+            - 已经登录成功或达到重启次数限制时不重启
+        """
+        if it(BotStateRegistry).get(QQID).isLogin or not self._recordRestart(QQID, "快速登录错误"):
+            return False
+        self.restart(QQID, "快速登录错误")
+        return True
+
+    @timer(10_000)
+    def checkHealth(self) -> None:
+        """
+        ## 检查已登录的机器人的 HTTP / WS 端口是否可以连接
+            - 只检查登录超过 healthGrace 秒、没有在停止中的机器人
+        """
+        if not cfg.get(cfg.BotAutoRestart):
+            return
+        registry = it(BotStateRegistry)
+        for QQID, process in self.processes.items():
+            status = registry.get(QQID)
+            if not self._desired.get(QQID) or not status.isLogin or process.isStopping:
+                continue
+            if status.loggedInAt is None or time.monotonic() - status.loggedInAt < self.healthGrace:
+                continue
+            for host, port in self._endpoints(process.config):
+                self._probe(QQID, host, port)
+
+    @staticmethod
+    def _endpoints(config: Config) -> List[Tuple[str, int]]:
+        """
+        ## 返回配置中启用的 HTTP / WS 服务的地址, 监听所有地址时连接本机
+        """
+        endpoints = []
+        for server in (config.connect.http, config.connect.ws):
+            if server.enable and str(server.port).isdigit():
+                host = server.host if server.host not in ("", "0.0.0.0", "::") else "127.0.0.1"
+                endpoints.append((host, int(server.port)))
+        return endpoints
+
+    def _probe(self, QQID: str, host: str, port: int) -> None:
+        """
+        ## 尝试连接端口, 连接成功后立即断开
+        """
+        socket = QTcpSocket(self)
+        timeout = QTimer(socket)
+        timeout.setSingleShot(True)
+
+        isDone = False
+
+        def done(isAlive: bool) -> None:
+            nonlocal isDone
+            if isDone:
+                return
+            isDone = True
+            timeout.stop()
+            socket.abort()
+            socket.deleteLater()
+            self._probeFinished(QQID, port, isAlive)
+
+        socket.connected.connect(lambda: done(True))
+        socket.errorOccurred.connect(lambda error: done(False))
+        timeout.timeout.connect(lambda: done(False))
+        timeout.start(self.healthTimeout)
+        socket.connectToHost(host, port)
+
+    def _probeFinished(self, QQID: str, port: int, isAlive: bool) -> None:
+        key = (QQID, port)
+        if isAlive:
+            self._probeFailures.pop(key, None)
+            return
+
+        failures = self._probeFailures[key] = self._probeFailures.get(key, 0) + 1
+        logger.warning(f"机器人 {QQID} 的端口 {port} 无法连接({failures}/{self.healthFailures})")
+        process = self.processes.get(QQID)
+        if failures < self.healthFailures or process is None or not process.isRunning or process.isStopping:
+            return
+        self._probeFailures.pop(key, None)
+        reason = f"端口 {port} 无法连接"
+        if self._recordRestart(QQID, reason):
+            self.restart(QQID, reason)
+
+    def _finishedSlot(self, QQID: str, exitCode: int) -> None:
+        """
+        ## 进程结束, 按情况重新启动
+        """
+        for key in [key for key in self._probeFailures if key[0] == QQID]:
+            del self._probeFailures[key]
+        if QQID not in self.processes:
+            # 已经 remove, 不再记录状态
+            return
+
+        if QQID in self._restartNow:
+            # 手动重启或健康检查要求的重启
+            reason = self._restartNow.pop(QQID)
+            if reason:
+                logger.info(f"机器人 {QQID} 已重启: {reason}")
+            # 等其他订阅者处理完旧进程的结束后再启动
+            QTimer.singleShot(0, lambda: self._restartTimeoutSlot(QQID))
+            return
+
+        if not self._desired.get(QQID) or not cfg.get(cfg.BotAutoRestart):
+            self._desired[QQID] = False
+            return
+
+        reason = f"进程意外退出, 退出码为 {exitCode}"
+        if not self._recordRestart(QQID, reason):
+            return
+        delay = int(min(self.backoffBase * 2 ** (len(self._restarts[QQID]) - 1), self.backoffMax) * 1000)
+        logger.warning(f"机器人 {QQID} {reason}, {delay // 1000} 秒后重启")
+        self.restartScheduled.emit(QQID, delay, reason)
+
+        restartTimer = self._restartTimers[QQID] = QTimer(self)
+        restartTimer.setSingleShot(True)
+        restartTimer.timeout.connect(lambda: self._restartTimeoutSlot(QQID))
+        restartTimer.start(delay)
+
+    def _restartTimeoutSlot(self, QQID: str) -> None:
+        self._cancelRestart(QQID)
+        if self._desired.get(QQID) and QQID in self.processes:
+            self.processes[QQID].start()
+
+    def _recordRestart(self, QQID: str, reason: str) -> bool:
+        """
+        ## 记录一次自动重启, 时间窗口内的次数达到上限时放弃并返回 False
+        """
+        now = time.monotonic()
+        restarts = [at for at in self._restarts.get(QQID, []) if now - at < self.crashWindow]
+        if len(restarts) >= self.crashLimit:
+            self._desired[QQID] = False
+            self._restarts.pop(QQID, None)
+            logger.error(f"机器人 {QQID} 在 {self.crashWindow} 秒内重启了 {len(restarts)} 次, 不再自动重启: {reason}")
+            self.gaveUp.emit(QQID, reason)
+            return False
+
+        restarts.append(now)
+        self._restarts[QQID] = restarts
+        it(BotStateRegistry).markRestarting(QQID)
+        return True
+
+    def _cancelRestart(self, QQID: str) -> None:
+        if (restartTimer := self._restartTimers.pop(QQID, None)) is not None:
+            restartTimer.stop()
+            restartTimer.deleteLater()
+
+
+class BotSupervisorClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.BotSupervisor", "BotSupervisor"),)
+
+    # 静态方法available()，用于检查模块"BotSupervisor"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.BotSupervisor")
+
+    # 静态方法create()，用于创建BotSupervisor类的实例，返回值为BotSupervisor对象。
+    @staticmethod
+    def create(create_type: [BotSupervisor]) -> BotSupervisor:
+        return BotSupervisor()
+
+
+add_creator(BotSupervisorClassCreator)
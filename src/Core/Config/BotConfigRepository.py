@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from abc import ABC
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal, Slot
+from creart import add_creator, exists_module, it
+from creart.creator import AbstractCreator, CreateTargetInfo
+from loguru import logger
+
+from src.Core import atomicWrite
+from src.Core.Config.ConfigModel import Config
+from src.Core.PathFunc import PathFunc
+
+
+class BotConfigRepository(QObject):
+    """
+    ## 机器人配置仓库
+        - 每个机器人保存为 config/bots/<QQID>.json, 增删改只读写一个小文件, 并且是原子写入
+        - 验证后的 Config 以 QQID 为键保存在内存中, 文件没有变化时不会重新解析
+        - 通过 QFileSystemWatcher 监听目录和文件, 外部修改后只重新解析发生变化的文件
+        - 首次运行时从旧的 config/bot.json 迁移, 原文件保留为 bot.json.bak
+    """
+
+    # 配置列表发生变化(包括首次加载)
+    changed = Signal()
+    # 配置文件解析失败, 参数为错误信息
+    loadFailed = Signal(str)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.directory = it(PathFunc).bot_config_dir_path
+        self.legacyPath = it(PathFunc).bot_config_path
+        self.configs: Dict[str, Config] = {}
+        self.generation = 0  # 每次配置列表变化时加一, 订阅者据此判断是否需要刷新
+        self._raw: Dict[str, dict] = {}  # 每个文件的原始数据, 用于跳过未变化文件的验证
+        self._stats: Dict[str, Tuple[int, int]] = {}  # 每个文件的 (mtime_ns, size)
+        self._directoryStat: Optional[int] = None  # 目录的 mtime_ns, 增删文件时才会变化
+        self._isDirty = True  # 有文件被原地修改(目录的修改时间不会变化)
+        self._watched = set()  # 已加入监听的文件, 避免每次都查询 watcher.files()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # 外部程序写入时可能触发多次变化, 合并为一次重新加载
+        self._reloadTimer = QTimer(self)
+        self._reloadTimer.setSingleShot(True)
+        self._reloadTimer.setInterval(200)
+        self._reloadTimer.timeout.connect(self._reloadSlot)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._fileChangedSlot)
+        self.watcher.directoryChanged.connect(self._reloadTimer.start)
+        self.watcher.addPath(str(self.directory))
+
+    def __contains__(self, QQID: str) -> bool:
+        return QQID in self.configs
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    def list(self) -> List[Config]:
+        """
+        ## 返回所有配置
+        """
+        return list(self.configs.values())
+
+    def get(self, QQID: str) -> Optional[Config]:
+        return self.configs.get(QQID)
+
+    def pathOf(self, QQID: str) -> Path:
+        """
+        ## 返回机器人配置文件的路径
+        """
+        return self.directory / f"{QQID}.json"
+
+    def load(self, force: bool = False) -> bool:
+        """
+        ## 加载配置, 返回配置列表是否发生变化
+            - force 为 False 时, 目录和文件都没有变化直接返回 False, 不读取任何文件
+            - 单个文件解析失败时发送 loadFailed, 该机器人保留内存中的配置
+        """
+        if self.legacyPath.exists():
+            self._migrate()
+
+        directoryStat = self.directory.stat().st_mtime_ns
+        if not force and not self._isDirty and directoryStat == self._directoryStat:
+            return False
+        self._directoryStat = directoryStat
+        self._isDirty = False
+
+        configs: Dict[str, Config] = {}
+        raws: Dict[str, dict] = {}
+        stats: Dict[str, Tuple[int, int]] = {}
+        for entry in sorted(os.scandir(str(self.directory)), key=lambda e: e.name):
+            if not entry.name.endswith(".json") or entry.name.startswith(".") or not entry.is_file():
+                continue
+            QQID = entry.name[:-len(".json")]
+            stat = entry.stat()
+            stats[QQID] = (stat.st_mtime_ns, stat.st_size)
+            if not force and self._stats.get(QQID) == stats[QQID]:
+                if QQID in self.configs:
+                    # 文件没有变化, 直接复用已验证的 Config
+                    configs[QQID], raws[QQID] = self.configs[QQID], self._raw[QQID]
+                # 否则是上次解析失败且没有再修改过的文件, 不重复报错
+                continue
+
+            try:
+                raw = json.loads(Path(entry.path).read_text(encoding="utf-8"))
+                if QQID in self._raw and raw == self._raw[QQID]:
+                    config = self.configs[QQID]
+                else:
+                    config = Config(**raw)
+                    if config.bot.QQID != QQID:
+                        raise ValueError(f"QQID {config.bot.QQID} does not match the file name")
+            except (OSError, ValueError, TypeError) as e:
+                logger.error(f"解析机器人配置 {entry.name} 失败: {e}")
+                self.loadFailed.emit(f"{entry.name}: {e}")
+                if QQID not in self.configs:
+                    continue
+                # 保留内存中的配置, 文件再次变化时重新解析
+                config, raw = self.configs[QQID], self._raw[QQID]
+            configs[QQID], raws[QQID] = config, raw
+
+        for QQID in configs:
+            self._watch(QQID)
+
+        isChanged = list(configs) != list(self.configs) or any(
+            config is not self.configs[QQID] for QQID, config in configs.items()
+        )
+        self.configs, self._raw, self._stats = configs, raws, stats
+        if isChanged or self.generation == 0:
+            self._notify()
+            return True
+        return False
+
+    def add(self, config: Config) -> bool:
+        """
+        ## 添加配置, 已存在相同的 QQID 时返回 False
+        """
+        if config.bot.QQID in self.configs:
+            return False
+        self._write(config)
+        return True
+
+    def update(self, config: Config) -> bool:
+        """
+        ## 替换 QQID 相同的配置, 不存在时返回 False
+        """
+        if config.bot.QQID not in self.configs:
+            return False
+        self._write(config)
+        return True
+
+    def remove(self, QQID: str) -> bool:
+        """
+        ## 删除配置, 不存在时返回 False
+        """
+        if self.configs.pop(QQID, None) is None:
+            return False
+        path = self.pathOf(QQID)
+        self._unwatch(QQID)
+        path.unlink(missing_ok=True)
+        self._raw.pop(QQID, None)
+        self._stats.pop(QQID, None)
+        self._directoryStat = self.directory.stat().st_mtime_ns
+        self._notify()
+        return True
+
+    def _write(self, config: Config) -> None:
+        """
+        ## 原子写入单个机器人的配置并记录文件状态, 自己写入引起的文件变化不会触发重新解析
+        """
+        QQID = config.bot.QQID
+        # 不可以直接使用 dict方法 转为 dict对象, 内部 WebsocketUrl 和 HttpUrl 不会自动转为 str
+        raw = json.loads(config.json())
+        path = self.pathOf(QQID)
+        if self._raw.get(QQID) != raw or not path.exists():
+            atomicWrite(path, json.dumps(raw, indent=4).encode("utf-8"))
+            stat = path.stat()
+            self._stats[QQID] = (stat.st_mtime_ns, stat.st_size)
+            self._directoryStat = self.directory.stat().st_mtime_ns
+            # 替换文件后原来的监听失效, 需要重新加入
+            self._unwatch(QQID)
+            self._watch(QQID)
+
+        self.configs[QQID] = config
+        self._raw[QQID] = raw
+        self._notify()
+
+    def _migrate(self) -> None:
+        """
+        ## 把旧的 bot.json 拆分为每个机器人一个文件
+            - 已存在的单个文件不会被覆盖
+            - 迁移完成后 bot.json 重命名为 bot.json.bak
+        """
+        try:
+            rawConfigs = json.loads(self.legacyPath.read_text(encoding="utf-8") or "[]")
+            if not isinstance(rawConfigs, list):
+                raise ValueError("bot.json must be a list of bot configurations")
+            for raw in rawConfigs:
+                QQID = Config(**raw).bot.QQID
+                if not self.pathOf(QQID).exists():
+                    atomicWrite(self.pathOf(QQID), json.dumps(raw, indent=4).encode("utf-8"))
+        except (OSError, ValueError, TypeError) as e:
+            # 旧文件无法解析时保留原文件, 避免丢失数据
+            logger.error(f"迁移机器人配置失败: {e}")
+            self.loadFailed.emit(str(e))
+            return
+
+        os.replace(str(self.legacyPath), str(self.legacyPath.with_name(f"{self.legacyPath.name}.bak")))
+        logger.info(f"已将 {len(rawConfigs)} 个机器人配置迁移到 {self.directory}")
+
+    def _notify(self) -> None:
+        """
+        ## 配置列表发生变化
+        """
+        self.generation += 1
+        self.changed.emit()
+
+    def _watch(self, QQID: str) -> None:
+        """
+        ## 确保配置文件在监听列表中
+        """
+        path = str(self.pathOf(QQID))
+        if path not in self._watched:
+            self.watcher.addPath(path)
+            self._watched.add(path)
+
+    def _unwatch(self, QQID: str) -> None:
+        """
+        ## 移除配置文件的监听
+        """
+        path = str(self.pathOf(QQID))
+        if path in self._watched:
+            self.watcher.removePath(path)
+            self._watched.discard(path)
+
+    @Slot(str)
+    def _fileChangedSlot(self, path: str) -> None:
+        """
+        ## 文件被原地修改时目录的修改时间不会变化, 需要标记后重新加载
+            - 文件被替换或删除后监听会失效, 重新加载时再加入
+        """
+        if not Path(path).exists():
+            self._watched.discard(path)
+        else:
+            self.watcher.removePath(path)
+            self.watcher.addPath(path)
+        self._isDirty = True
+        self._reloadTimer.start()
+
+    @Slot()
+    def _reloadSlot(self) -> None:
+        """
+        ## 文件或目录发生变化时重新加载
+        """
+        if self.generation:
+            # 还没有被加载过时不需要处理, 第一次 load 时会读取最新的内容
+            self.load()
+
+
+class BotConfigRepositoryClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.Config.BotConfigRepository", "BotConfigRepository"),)
+
+    # 静态方法available()，用于检查模块"BotConfigRepository"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.Config.BotConfigRepository")
+
+    # 静态方法create()，用于创建BotConfigRepository类的实例，返回值为BotConfigRepository对象。
+    @staticmethod
+    def create(create_type: [BotConfigRepository]) -> BotConfigRepository:
+        return BotConfigRepository()
+
+
+add_creator(BotConfigRepositoryClassCreator)
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
+import atexit
 import platform
 import time
 from enum import Enum
+from pathlib import Path
+from typing import Any, Optional
 
-from PySide6.QtCore import QLocale
+from PySide6.QtCore import QCoreApplication, QLocale, QTimer
 from creart import it
 from qfluentwidgets.common import (
     qconfig, QConfig, ConfigItem, BoolValidator, FolderValidator,
-    OptionsConfigItem, OptionsValidator, EnumSerializer, ConfigSerializer
+    OptionsConfigItem, OptionsValidator, EnumSerializer, ConfigSerializer,
+    RangeConfigItem, RangeValidator
 )
 
 from src.Core.PathFunc import PathFunc
@@ -49,6 +53,9 @@ class LanguageSerializer(ConfigSerializer):
 class Config(QConfig):
     """程序配置"""
 
+    # 合并写入的间隔(毫秒), 这段时间内的多次修改只写入一次 config.json
+    saveInterval = 1000
+
     # 信息项
     NCDVersion = ConfigItem(
         group="Info",
@@ -126,6 +133,40 @@ class Config(QConfig):
         restart=True
     )
 
+    # 机器人日志项
+    BotLogMaxLines = RangeConfigItem(
+        group="BotLog",
+        name="MaxLines",
+        default=5000,
+        validator=RangeValidator(500, 100000)
+    )
+    BotLogRotateSize = RangeConfigItem(
+        group="BotLog",
+        name="RotateSize",
+        default=10,
+        validator=RangeValidator(1, 1024)
+    )
+    BotLogArchiveCount = RangeConfigItem(
+        group="BotLog",
+        name="ArchiveCount",
+        default=20,
+        validator=RangeValidator(1, 1000)
+    )
+
+    # 机器人进程项
+    BotAutoRestart = ConfigItem(
+        group="BotProcess",
+        name="AutoRestart",
+        default=True,
+        validator=BoolValidator()
+    )
+    BotStopTimeout = RangeConfigItem(
+        group="BotProcess",
+        name="StopTimeout",
+        default=5,
+        validator=RangeValidator(0, 60)
+    )
+
     # 隐藏提示项
     HideUsGoBtnTips = ConfigItem(
         group="HideTips",
@@ -134,10 +175,70 @@ class Config(QConfig):
         validator=BoolValidator()
     )
 
+    def __init__(self) -> None:
+        super().__init__()
+        self.isDirty = False  # 是否有尚未写入文件的修改
+        self._saveTimer: Optional[QTimer] = None
+        # 程序退出时写入尚未保存的修改
+        atexit.register(self.flush)
+
+    def set(self, item: ConfigItem, value: Any, save: bool = True, copy: bool = True) -> None:
+        """
+        ## 设置配置项
+            - 经过验证器修正后与当前值相同时直接返回, 不会标记为待保存
+            - save 为 True 时只标记为待保存, 由 save 合并写入
+        """
+        if self._corrected(item, value) == item.value:
+            return
+        super().set(item, value, save, copy)
+
+    def save(self) -> None:
+        """
+        ## 标记为待保存, 最多每隔 saveInterval 写入一次
+            - QApplication 创建之前没有事件循环, 直接写入
+        """
+        self.isDirty = True
+        if (app := QCoreApplication.instance()) is None:
+            self.flush()
+            return
+
+        if self._saveTimer is None:
+            self._saveTimer = QTimer()
+            self._saveTimer.setSingleShot(True)
+            self._saveTimer.setInterval(self.saveInterval)
+            self._saveTimer.timeout.connect(self.flush)
+            app.aboutToQuit.connect(self.flush)
+        if not self._saveTimer.isActive():
+            # 不重新计时, 持续修改时也能按间隔写入
+            self._saveTimer.start()
+
+    def flush(self) -> None:
+        """
+        ## 立即写入尚未保存的修改
+        """
+        if not self.isDirty:
+            return
+        self.isDirty = False
+        super().save()
+
+    @staticmethod
+    def _corrected(item: ConfigItem, value: Any) -> Any:
+        """
+        ## 返回经过验证器修正后的值
+            - FolderValidator.correct 会创建目录, 这里只计算修正后的路径
+        """
+        if isinstance(item.validator, FolderValidator):
+            return str(Path(value).absolute()).replace("\\", "/")
+        return item.validator.correct(value)
+
 
 cfg = Config()
 qconfig.load(it(PathFunc).config_path, cfg)
-cfg.set(cfg.StartTime, time.time(), True)
-cfg.set(cfg.NCDVersion, "bate_v0.0.1", True)
-cfg.set(cfg.SystemType, platform.system(), True)
-cfg.set(cfg.PlatformType, platform.machine(), True)
+# 设置卡片通过 qconfig.set 修改配置, 同样交给 cfg 合并写入
+qconfig.save = cfg.save
+# 启动时的信息项一起写入一次
+cfg.set(cfg.StartTime, time.time(), False)
+cfg.set(cfg.NCDVersion, "bate_v0.0.1", False)
+cfg.set(cfg.SystemType, platform.system(), False)
+cfg.set(cfg.PlatformType, platform.machine(), False)
+cfg.save()
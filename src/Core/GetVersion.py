@@ -2,21 +2,28 @@
 import json
 from abc import ABC
 from json import JSONDecodeError
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
 from loguru import logger
 
-from PySide6.QtCore import QObject, QEventLoop, QRegularExpression, QUrl
+from PySide6.QtCore import QObject, QEventLoop, QRegularExpression, QUrl, QFileSystemWatcher, QTimer, Signal
 from creart import it, AbstractCreator, CreateTargetInfo, exists_module, add_creator
 
 from src.Core import timer
-from src.Core.NetworkFunc import NetworkFunc, Urls, async_request
+from src.Core.NetworkFunc import MetadataFetcher, Urls, async_request
 from src.Core.PathFunc import PathFunc
 
 
 class GetVersion(QObject):
     """
-    ## 提供两个方法, 分别获取本地的 NapCat 和 QQ 的版本
+    ## 获取本地和远程的 NapCat 和 QQ 的版本
+        - 本地版本通过 QFileSystemWatcher 监听 package.json, 只在文件变化时重新解析
+        - 另外定时比较 package.json 的修改时间和大小, 作为监听不可靠时(例如网络文件系统)的兜底
+        - 任何版本发生变化时发送 versionChanged, 控件不需要再轮询
     """
 
+    versionChanged = Signal()
+
     def __init__(self) -> None:
         super().__init__()
         # 创建属性
@@ -26,14 +33,29 @@ class GetVersion(QObject):
         self.QQRemoteVersion: None | str = None
         self.QQRemoteDownloadUrls: None | dict = None
         self.napcatUpdateLog: None | str = None
+        self.napcatAssetDigests: Dict[str, str] = {}  # release 中每个文件的 SHA-256, 用于校验下载
+
+        # 本地版本文件的状态, 键为 "NapCat" / "QQ", 值为 (路径, mtime_ns, size)
+        self._packageStamps: Dict[str, Optional[Tuple[str, int, int]]] = {}
+
+        # 文件写入时可能触发多次变化, 合并为一次检查
+        self._checkTimer = QTimer(self)
+        self._checkTimer.setSingleShot(True)
+        self._checkTimer.setInterval(500)
+        self._checkTimer.timeout.connect(self.checkLocalVersions)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._checkTimer.start)
+        self.watcher.directoryChanged.connect(self._checkTimer.start)
+
+        # 先使用上次缓存的远程信息, 启动时立即得到版本, 随后再发送请求更新
+        self._parseNapCatRelease(it(MetadataFetcher).cached(Urls.NAPCATQQ_REPO_API.value))
+        self._parseQQDownloadInfo(it(MetadataFetcher).cached(Urls.QQ_WIN_DOWNLOAD.value))
 
         # 调用方法
         self.getRemoteNapCatUpdate()
-        self.getQQDownloadUrl()
-        self.getRemoteQQVersion()
+        self.getRemoteQQInfo()
 
-        self.getLocalNapCatVersion()
-        self.getLocalQQVersion()
+        self.checkLocalVersions()
 
     def checkUpdate(self) -> dict | None:
         """
@@ -45,7 +67,7 @@ class GetVersion(QObject):
 
         return {
             "result": self.napcatRemoteVersion != self.napcatLocalVersion,
-            "localVersion": self.getLocalNapCatVersion,
+            "localVersion": self.napcatLocalVersion,
             "remoteVersion": self.napcatRemoteVersion
         }
 
@@ -54,46 +76,54 @@ class GetVersion(QObject):
     def getRemoteNapCatUpdate(self, reply) -> None:
         """
         ## 获取远程 NapCat 的版本信息和更新日志
-            - 每 3 分钟读取一次并保存到变量中
+            - 每 3 分钟请求一次, 没有变化时服务器返回 304, 不消耗 GitHub 的速率限制
         """
-        if reply is None:
-            # 如果请求失败则放弃覆盖变量
-            return
-        try:
-            reply_dict = json.loads(reply)
-            self.napcatRemoteVersion = reply_dict.get("tag_name", None)
-            self.napcatUpdateLog = reply_dict.get("body", None)
-        except JSONDecodeError:
-            logger.error(f"Parsing Json errors, Sending the wrong string:[{reply}]")
-            return
+        self._parseNapCatRelease(reply)
 
     @timer(180_000)
     @async_request(Urls.QQ_WIN_DOWNLOAD.value)
-    def getRemoteQQVersion(self, reply) -> None:
+    def getRemoteQQInfo(self, reply) -> None:
+        """
+        ## 获取远程 QQ 的版本号和下载连接
+            - 每 3 分钟请求一次, 版本号和下载连接来自同一个文件, 只请求一次
+        """
+        self._parseQQDownloadInfo(reply)
+
+    def _parseNapCatRelease(self, reply: Optional[str]) -> None:
         """
-        ## 获取远程 QQ 版本版本号
-            - 每 3 分钟读取一次并保存到变量中
+        ## 解析 NapCat 的 release 信息并保存到变量中
         """
         if reply is None:
             # 如果请求失败则放弃覆盖变量
             return
+        try:
+            reply_dict = json.loads(reply)
+        except JSONDecodeError:
+            logger.error(f"Parsing Json errors, Sending the wrong string:[{reply}]")
+            return
 
-        # 定义正则表达式并匹配
-        version = QRegularExpression(r'"version":\s*"([^"]+)"').match(reply).captured(1)
-        self.QQRemoteVersion = version if version else None
+        old = (self.napcatRemoteVersion, self.napcatUpdateLog)
+        self.napcatRemoteVersion = reply_dict.get("tag_name", None)
+        self.napcatUpdateLog = reply_dict.get("body", None)
+        # GitHub 为每个 asset 提供 "sha256:<十六进制>" 格式的 digest
+        self.napcatAssetDigests = {
+            asset["name"]: asset["digest"].removeprefix("sha256:")
+            for asset in reply_dict.get("assets", [])
+            if str(asset.get("digest") or "").startswith("sha256:")
+        }
+        if old != (self.napcatRemoteVersion, self.napcatUpdateLog):
+            self.versionChanged.emit()
 
-    @timer(180_000)
-    @async_request(Urls.QQ_WIN_DOWNLOAD.value)
-    def getQQDownloadUrl(self, reply) -> None:
+    def _parseQQDownloadInfo(self, reply: Optional[str]) -> None:
         """
-        ## 获取最新QQ版本下载连接
-            - 每 3 分钟读取一次并保存到变量中
+        ## 从 windowsDownloadUrl.js 中解析 QQ 的版本号和下载连接并保存到变量中
         """
         if reply is None:
             # 如果请求失败则放弃覆盖变量
             return
 
         # 定义正则表达式并匹配
+        version = QRegularExpression(r'"version":\s*"([^"]+)"').match(reply).captured(1)
         match_x64 = QRegularExpression(r'"ntDownloadX64Url":\s*"([^"]+)"').match(reply).captured(1)
         match_arm = QRegularExpression(r'"ntDownloadARMUrl":\s*"([^"]+)"').match(reply).captured(1)
 
@@ -104,46 +134,88 @@ class GetVersion(QObject):
             "ARM64": QUrl(match_arm),
             "aarch64": QUrl(match_arm)
         }
+        if self.QQRemoteVersion != (version if version else None):
+            self.QQRemoteVersion = version if version else None
+            self.versionChanged.emit()
 
-    @timer(3000)
-    def getLocalNapCatVersion(self) -> None:
+    @timer(30_000)
+    def checkLocalVersions(self) -> None:
         """
-        ## 获取本地 NapCat 的版本信息
-            - 每 3 秒读取一次并保存到变量中
+        ## 检查本地版本, package.json 没有变化时不会重新解析
+            - 正常情况下由 QFileSystemWatcher 触发, 每 30 秒的定时检查只比较修改时间和大小
         """
-        try:
-            # 获取 package.json 路径并读取
-            package_file_path = it(PathFunc).getNapCatPath() / "package.json"
-            with open(str(package_file_path), "r", encoding="utf-8") as f:
-                # 读取到参数返回版本信息
-                self.napcatLocalVersion = f"v{json.loads(f.read())['version']}"
+        napcatPackage = it(PathFunc).getNapCatPath() / "package.json"
+        qqPath = it(PathFunc).getQQPath()
+        qqPackage = qqPath / "resources/app/package.json" if qqPath is not None else None
 
-        except FileNotFoundError:
-            # 文件不存在则返回 None
-            self.napcatLocalVersion = None
+        changed = self._checkPackage("NapCat", napcatPackage, self._parseNapCatVersion)
+        changed = self._checkPackage("QQ", qqPackage, self._parseQQVersion) or changed
+        if changed:
+            self.versionChanged.emit()
 
-    @timer(3000)
-    def getLocalQQVersion(self) -> None:
+    def _checkPackage(self, key: str, path: Optional[Path], parser: Callable[[Path], Optional[str]]) -> bool:
         """
-        ## 获取本地 QQ 的版本信息
-            - 每 3 秒读取一次并保存到变量中
+        ## 比较 package.json 的路径、修改时间和大小, 发生变化时重新解析, 返回版本是否变化
         """
         try:
-            # 检查 QQPath
-            if (qqPath := it(PathFunc).getQQPath()) is None:
-                return None
-            # 获取 package.json 路径并读取
-            package_file_path = qqPath / "resources/app/package.json"
-            with open(str(package_file_path), "r", encoding="utf-8") as f:
-                # 读取参数并返回版本信息
-                package = json.loads(f.read())
-            # 拼接字符串返回版本信息
-            platform = "Windows" if package["platform"] == "win32" else "Linux"
-            self.QQLocalVersion = f"{platform} {package['version']}"
-
-        except FileNotFoundError:
-            # 文件不存在则返回 None
-            self.QQLocalVersion = None
+            stat = path.stat() if path is not None else None
+            stamp = (str(path), stat.st_mtime_ns, stat.st_size) if stat is not None else None
+        except OSError:
+            stamp = None
+        if key in self._packageStamps and stamp == self._packageStamps[key]:
+            return False
+
+        self._packageStamps[key] = stamp
+        self._watch(path)
+        attribute = "napcatLocalVersion" if key == "NapCat" else "QQLocalVersion"
+        try:
+            version = parser(path) if stamp is not None else None
+        except (JSONDecodeError, KeyError, OSError) as e:
+            # 文件可能正在被写入, 保留原来的版本, 下次变化时重新解析
+            logger.warning(f"解析 {path} 失败: {e}")
+            self._packageStamps.pop(key, None)
+            return False
+
+        if getattr(self, attribute) == version:
+            return False
+        setattr(self, attribute, version)
+        return True
+
+    def _watch(self, path: Optional[Path]) -> None:
+        """
+        ## 监听 package.json, 文件不存在时监听最近的已存在的上级目录, 以便得知安装完成
+        """
+        if path is None:
+            return
+        target = path
+        while not target.exists() and target.parent != target:
+            target = target.parent
+        if str(target) not in self.watcher.files() + self.watcher.directories():
+            self.watcher.addPath(str(target))
+        if target == path and str(path.parent) not in self.watcher.directories():
+            # 文件被替换(例如更新 NapCat)后对文件的监听会失效, 同时监听所在目录
+            self.watcher.addPath(str(path.parent))
+
+    @staticmethod
+    def _parseNapCatVersion(path: Path) -> str:
+        """
+        ## 解析本地 NapCat 的版本信息
+        """
+        with open(str(path), "r", encoding="utf-8") as f:
+            # 读取到参数返回版本信息
+            return f"v{json.loads(f.read())['version']}"
+
+    @staticmethod
+    def _parseQQVersion(path: Path) -> str:
+        """
+        ## 解析本地 QQ 的版本信息
+        """
+        with open(str(path), "r", encoding="utf-8") as f:
+            # 读取参数并返回版本信息
+            package = json.loads(f.read())
+        # 拼接字符串返回版本信息
+        platform = "Windows" if package["platform"] == "win32" else "Linux"
+        return f"{platform} {package['version']}"
 
 
 class GetVersionClassCreator(AbstractCreator, ABC):
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+无界面模式
+    - 使用 QCoreApplication, 不创建任何控件, 不导入 src.Ui, 适合在服务器上长期运行
+    - 读取 config/bots 中的所有机器人并通过 BotSupervisor 启动和守护
+    - 每个机器人的输出写入 log/<QQID>/, 程序自身的日志同时输出到终端和 log/ALL.log
+    - 图形界面使用的是同一套 BotConfigRepository / BotStateRegistry / BotSupervisor
+"""
+import signal
+import sys
+from typing import Dict, List
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer, Slot
+from creart import it
+from loguru import logger
+
+from src.Core import timer
+from src.Core.BotLog import LogParser, LogWriter
+from src.Core.BotState import BotStateRegistry
+from src.Core.BotSupervisor import BotSupervisor
+from src.Core.Config import cfg
+from src.Core.Config.BotConfigRepository import BotConfigRepository
+from src.Core.Config.ConfigModel import Config
+from src.Core.PathFunc import PathFunc
+
+
+class HeadlessBot(QObject):
+    """
+    ## 无界面模式下的一个机器人, 把进程输出解析后写入日志文件
+        - 登录成功、快速登录错误的处理与 BotWidget 相同, 需要扫码时把二维码路径写入日志
+    """
+
+    def __init__(self, config: Config, parent: QObject) -> None:
+        super().__init__(parent)
+        self.QQID = config.bot.QQID
+        self.writer = LogWriter(
+            directory=it(PathFunc).log_path / self.QQID,
+            name=self.QQID,
+            maxBytes=cfg.get(cfg.BotLogRotateSize) * 1024 * 1024,
+            maxArchives=cfg.get(cfg.BotLogArchiveCount)
+        )
+
+        self.logParser = LogParser(self.QQID)
+        self.logParser.linesParsed.connect(self._linesParsedSlot)
+        self.logParser.qrcodeFound.connect(self._qrcodeFoundSlot)
+        self.logParser.loginSuccess.connect(self._loginSuccessSlot)
+        self.logParser.fastLoginError.connect(self._fastLoginErrorSlot)
+        self.destroyed.connect(self.logParser.deleteLater)
+
+        self.process = it(BotSupervisor).process(config)
+        self.process.starting.connect(self.logParser.reset)
+        self.process.output.connect(self.logParser.feed)
+        self.process.finished.connect(self._processFinishedSlot)
+
+    def close(self) -> None:
+        """
+        ## 断开与进程的连接并关闭日志文件
+        """
+        self.process.starting.disconnect(self.logParser.reset)
+        self.process.output.disconnect(self.logParser.feed)
+        self.process.finished.disconnect(self._processFinishedSlot)
+        self.writer.close()
+        self.deleteLater()
+
+    @Slot(list, list)
+    def _linesParsedSlot(self, lines: List[str], records: list) -> None:
+        data = "".join(f"{line}\n" for line in lines).encode("utf-8")
+        if self.writer.shouldRotate(len(data)):
+            self.writer.rotate()
+        self.writer.write(data)
+
+    @Slot(int, int)
+    def _processFinishedSlot(self, exitCode: int, exitStatus: int) -> None:
+        self.logParser.finish(f"进程结束，退出码为 {exitCode}，状态为 {exitStatus}")
+        logger.info(f"机器人 {self.QQID} 的进程结束, 退出码为 {exitCode}")
+
+    @Slot(str)
+    def _qrcodeFoundSlot(self, qrcodePath: str) -> None:
+        logger.warning(f"机器人 {self.QQID} 需要扫码登录, 二维码: {qrcodePath}")
+
+    @Slot()
+    def _loginSuccessSlot(self) -> None:
+        if it(BotStateRegistry).get(self.QQID).isLogin:
+            return
+        it(BotStateRegistry).markLoggedIn(self.QQID)
+        logger.info(f"机器人 {self.QQID} 登录成功")
+
+    @Slot()
+    def _fastLoginErrorSlot(self) -> None:
+        if it(BotSupervisor).reportFastLoginError(self.QQID):
+            logger.warning(f"机器人 {self.QQID} 快速登录错误, 已自动重启")
+
+
+class HeadlessDaemon(QObject):
+    """
+    ## 无界面模式的主体
+        - 配置仓库发生变化时启动新增的机器人、停止删除的机器人, 修改的配置在下次启动时生效
+        - 收到 SIGINT / SIGTERM 时停止所有机器人, 全部退出后再结束程序
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.bots: Dict[str, HeadlessBot] = {}
+        self.isQuitting = False
+        # 自动重启和放弃重启由 BotSupervisor 写入日志
+        it(BotConfigRepository).changed.connect(self._syncSlot)
+
+    def start(self) -> None:
+        """
+        ## 加载配置并启动所有机器人
+        """
+        it(BotConfigRepository).load()
+        if not self.bots:
+            logger.warning(f"没有找到机器人配置, 请先在图形界面中添加, 或把配置放入 {it(BotConfigRepository).directory}")
+        self.flush()
+
+    def quit(self) -> None:
+        """
+        ## 停止所有机器人, 全部退出后结束程序
+        """
+        if self.isQuitting:
+            return
+        self.isQuitting = True
+        logger.info("正在停止所有机器人")
+        it(BotStateRegistry).allStopped.connect(QCoreApplication.quit)
+        # 无论是否有机器人在运行都要调用, 以取消等待中的自动重启
+        it(BotSupervisor).stopAll()
+        if not it(BotStateRegistry).runningBots():
+            QCoreApplication.quit()
+            return
+        # 进程在超时后会被强制结束, 这里再留出一些余量, 避免因意外情况无法退出
+        QTimer.singleShot((cfg.get(cfg.BotStopTimeout) + 5) * 1000, QCoreApplication.quit)
+
+    @timer(1000)
+    def flush(self) -> None:
+        """
+        ## 定期把日志写入磁盘, 没有新输出时缓冲区中的内容也不会等太久
+        """
+        for bot in self.bots.values():
+            bot.writer.flush()
+
+    @Slot()
+    def _syncSlot(self) -> None:
+        """
+        ## 根据配置仓库增删机器人
+        """
+        if self.isQuitting:
+            return
+        repository = it(BotConfigRepository)
+        for QQID in [QQID for QQID in self.bots if QQID not in repository]:
+            logger.info(f"机器人 {QQID} 的配置已删除, 停止运行")
+            it(BotSupervisor).remove(QQID)
+            self.bots.pop(QQID).close()
+
+        for config in repository.list():
+            QQID = config.bot.QQID
+            it(BotStateRegistry).add(QQID, config)
+            if QQID in self.bots:
+                # 更新配置, 下次启动时生效
+                it(BotSupervisor).process(config)
+                continue
+            self.bots[QQID] = HeadlessBot(config, self)
+            logger.info(f"启动机器人 {QQID}")
+            it(BotSupervisor).start(QQID)
+
+
+def runHeadless(argv: List[str]) -> int:
+    """
+    ## 以无界面模式运行, 返回退出码
+    """
+    # 无界面模式下 print 和未捕获异常直接输出到终端, 不经过 loguru
+    # 否则终端的 sink 出错时 loguru 的报错会写入 sys.stderr 再回到 loguru, 不断循环
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    # 程序自身的日志同时输出到终端
+    logger.add(sys.__stderr__, format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | {message}", level="INFO")
+
+    app = QCoreApplication(argv)
+    daemon = HeadlessDaemon()
+
+    # Python 的信号处理函数只在解释器执行时运行, 定期回到 Python 以便及时响应
+    signal.signal(signal.SIGINT, lambda *_: daemon.quit())
+    signal.signal(signal.SIGTERM, lambda *_: daemon.quit())
+    signalTimer = QTimer()
+    signalTimer.timeout.connect(lambda: None)
+    signalTimer.start(500)
+
+    daemon.start()
+    logger.info(f"无界面模式已启动, 共 {len(daemon.bots)} 个机器人, 按 Ctrl+C 停止")
+    exitCode = app.exec()
+    for bot in daemon.bots.values():
+        bot.writer.close()
+    return exitCode
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from abc import ABC
+from typing import Callable, Dict, List, Tuple
+
+import shiboken6
+from PySide6.QtCore import QObject, QRunnable, QSize, QThreadPool, Qt, Signal, Slot
+from PySide6.QtGui import QImage, QImageReader
+from creart import add_creator, exists_module
+from creart.creator import AbstractCreator, CreateTargetInfo
+from loguru import logger
+
+# 任务的键: (图片路径, 目标尺寸, 缩放方式)
+TaskKey = Tuple[str, Tuple[int, int], Qt.AspectRatioMode]
+
+
+class ImageTask(QRunnable):
+    """
+    ## 在线程池中解码并缩放一张图片
+        - 只使用 QImage, QPixmap 只能在 GUI 线程中创建
+    """
+
+    def __init__(self, key: TaskKey, signal: Signal) -> None:
+        super().__init__()
+        self.key = key
+        self.signal = signal
+
+    def run(self) -> None:
+        path, (width, height), aspectMode = self.key
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        image = reader.read()
+        if image.isNull():
+            logger.warning(f"解码图片 {path} 失败: {reader.errorString()}")
+        elif width > 0 and height > 0 and image.size() != QSize(width, height):
+            image = image.scaled(width, height, aspectMode, Qt.TransformationMode.SmoothTransformation)
+        self.signal.emit(self.key, image)
+
+
+class ImageLoader(QObject):
+    """
+    ## 在后台线程解码并缩放图片, 完成后在 GUI 线程中回调
+        - 相同的 (路径, 尺寸, 缩放方式) 同时只解码一次, 所有等待者共享结果
+        - receiver 被销毁后不再回调
+    """
+
+    # 任务完成, 从线程池发送, 通过队列连接回到 GUI 线程
+    _finished = Signal(object, QImage)
+
+    maxThreads = 2
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(self.maxThreads)
+        self._waiting: Dict[TaskKey, List[Tuple[QObject, Callable[[QImage], None]]]] = {}
+        self._finished.connect(self._finishedSlot, Qt.ConnectionType.QueuedConnection)
+
+    def load(
+            self, path: str, size: QSize, receiver: QObject, callback: Callable[[QImage], None],
+            aspectMode: Qt.AspectRatioMode = Qt.AspectRatioMode.KeepAspectRatio
+    ) -> None:
+        """
+        ## 加载图片
+            - path 文件路径或 Qt 资源路径(以 : 开头)
+            - size 缩放后的尺寸(物理像素), 为空时保持原始尺寸
+            - callback 以 QImage 调用, 解码失败时 QImage 为空
+        """
+        key = (path, (size.width(), size.height()), aspectMode)
+        if key in self._waiting:
+            self._waiting[key].append((receiver, callback))
+            return
+        self._waiting[key] = [(receiver, callback)]
+        self.pool.start(ImageTask(key, self._finished))
+
+    @Slot(object, QImage)
+    def _finishedSlot(self, key: TaskKey, image: QImage) -> None:
+        for receiver, callback in self._waiting.pop(key, []):
+            if not shiboken6.isValid(receiver):
+                continue
+            try:
+                callback(image)
+            except Exception as e:
+                logger.exception(f"处理图片 {key[0]} 失败: {e}")
+
+
+class ImageLoaderClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.ImageLoader", "ImageLoader"),)
+
+    # 静态方法available()，用于检查模块"ImageLoader"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.ImageLoader")
+
+    # 静态方法create()，用于创建ImageLoader类的实例，返回值为ImageLoader对象。
+    @staticmethod
+    def create(create_type: [ImageLoader]) -> ImageLoader:
+        return ImageLoader()
+
+
+add_creator(ImageLoaderClassCreator)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from src.Core import atomicWrite
+
+
+class ZipInstaller:
+    """
+    ## 把 zip 直接流式解压到安装目录
+        - 每个文件按 bufferSize 分块解压到同目录的临时文件, 完成后用 os.replace 替换, 内存占用固定
+        - 压缩包中只有一个顶层目录时去掉这一层
+        - keep 中的顶层项目(例如 config)在安装目录中已存在时保留, 既不覆盖也不删除
+        - 全部解压完成后才删除压缩包中没有的旧文件, 安装期间旧版本尽量保持可用
+        - 解压后的总大小超过 poolThreshold 时在线程池中并行解压(zlib 解压时会释放 GIL)
+        - 增量安装: 安装目录中的清单记录每个文件的 CRC32、大小和修改时间, 与压缩包的中央目录比较,
+          只写入新增或变化的文件; 没有清单或文件在安装后被修改过时读取文件计算 CRC32 比较
+    """
+
+    bufferSize = 1024 * 1024
+    poolThreshold = 32 * 1024 * 1024
+    maxWorkers = 4
+    manifestName = ".ncd-manifest.json"
+
+    def __init__(
+            self, zipPath: Path, installPath: Path, keep: Iterable[str] = ("config",),
+            progress: Optional[Callable[[int, int], None]] = None
+    ) -> None:
+        """
+        ## 初始化
+            - zipPath 压缩包路径
+            - installPath 安装目录
+            - keep 已存在时需要保留的顶层目录或文件
+            - progress 每处理完一个文件调用一次, 参数为 (已完成数量, 总数量), 可能在线程池中调用
+        """
+        self.zipPath = zipPath
+        self.installPath = installPath
+        self.keep = set(keep) | {self.manifestName}
+        self.progress = progress
+        self.manifestPath = installPath / self.manifestName
+        self.manifest: Dict[str, dict] = {}  # 相对路径 -> {"crc", "size", "mtime"}
+        self.written = 0  # 本次写入的文件数量
+        self.removed = 0  # 本次删除的文件数量
+        self._done = 0
+        self._total = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._opened: List[zipfile.ZipFile] = []
+
+    def install(self) -> None:
+        """
+        ## 安装, 失败时抛出 OSError / zipfile.BadZipFile / ValueError
+        """
+        self.installPath.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._loadManifest()
+        self.written = self.removed = 0
+        try:
+            entries = self.entries(self._zipFile())
+            self.extract(entries)
+            self.removeStale(entries)
+            self._saveManifest(entries)
+            logger.info(
+                f"{self.zipPath.name} 安装完成, 共 {len(entries)} 个文件, "
+                f"写入 {self.written} 个, 删除 {self.removed} 个"
+            )
+        finally:
+            for zipFile in self._opened:
+                zipFile.close()
+            self._opened.clear()
+
+    def entries(self, zipFile: zipfile.ZipFile) -> Dict[str, zipfile.ZipInfo]:
+        """
+        ## 返回需要安装的文件, 键为安装目录中的相对路径(以 / 分隔)
+        """
+        infos = [info for info in zipFile.infolist() if not info.is_dir()]
+        names = [PurePosixPath(info.filename.replace("\\", "/")) for info in infos]
+        for info, name in zip(infos, names):
+            if name.is_absolute() or ".." in name.parts or ":" in name.parts[0]:
+                raise ValueError(f"压缩包中包含不安全的路径: {info.filename}")
+        # 所有文件都在同一个顶层目录中时去掉这一层
+        isNested = len({name.parts[0] for name in names}) == 1 and all(len(name.parts) > 1 for name in names)
+
+        entries = {}
+        for info, name in zip(infos, names):
+            parts = name.parts[1:] if isNested else name.parts
+            if parts[0] in self.keep and (self.installPath / parts[0]).exists():
+                continue
+            entries["/".join(parts)] = info
+        return entries
+
+    def extract(self, entries: Dict[str, zipfile.ZipInfo]) -> None:
+        """
+        ## 解压文件到安装目录
+        """
+        self._done, self._total = 0, len(entries)
+        # 先在当前线程中创建所有目录, 线程池中只写文件
+        for directory in {(self.installPath / relative).parent for relative in entries}:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        size = sum(info.file_size for info in entries.values())
+        workers = min(self.maxWorkers, os.cpu_count() or 1)
+        if size < self.poolThreshold or len(entries) < 2 or workers < 2:
+            for relative, info in entries.items():
+                self._extract(relative, info)
+            return
+
+        logger.info(f"在 {workers} 个线程中解压 {self.zipPath.name}, 共 {len(entries)} 个文件, {size} 字节")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # 遍历结果以抛出线程中的异常
+            for _ in pool.map(lambda item: self._extract(*item), entries.items()):
+                pass
+
+    def removeStale(self, entries: Dict[str, zipfile.ZipInfo]) -> None:
+        """
+        ## 删除压缩包中没有的文件和空目录, keep 中的项目除外
+        """
+        for root, dirs, files in os.walk(str(self.installPath), topdown=False):
+            relativeRoot = Path(root).relative_to(self.installPath)
+            if relativeRoot.parts and relativeRoot.parts[0] in self.keep:
+                continue
+            for name in files:
+                if not relativeRoot.parts and name in self.keep:
+                    continue
+                if (relativeRoot / name).as_posix() not in entries:
+                    (Path(root) / name).unlink()
+                    self.removed += 1
+            if relativeRoot.parts and not os.listdir(root):
+                os.rmdir(root)
+
+    def _zipFile(self) -> zipfile.ZipFile:
+        """
+        ## 返回当前线程的 ZipFile, ZipFile 不能在多个线程中同时读取
+        """
+        if (zipFile := getattr(self._local, "zipFile", None)) is None:
+            zipFile = self._local.zipFile = zipfile.ZipFile(str(self.zipPath))
+            with self._lock:
+                self._opened.append(zipFile)
+        return zipFile
+
+    def _extract(self, relative: str, info: zipfile.ZipInfo) -> None:
+        """
+        ## 解压单个文件, 内容没有变化时跳过; 写完后再替换, 不会留下只写了一半的文件
+        """
+        target = self.installPath / relative
+        isWritten = not self._isUpToDate(relative, target, info)
+        if isWritten:
+            tmpPath = target.with_name(f".{target.name}.tmp")
+            with self._zipFile().open(info) as src, open(str(tmpPath), "wb") as dst:
+                shutil.copyfileobj(src, dst, self.bufferSize)
+            os.replace(str(tmpPath), str(target))
+
+        with self._lock:
+            self.written += isWritten
+            self._done += 1
+            done = self._done
+        if self.progress is not None:
+            self.progress(done, self._total)
+
+    def _isUpToDate(self, relative: str, target: Path, info: zipfile.ZipInfo) -> bool:
+        """
+        ## 已安装的文件是否与压缩包中的相同
+            - 大小和修改时间与清单一致时直接比较清单中的 CRC32, 不读取文件
+            - 否则读取文件计算 CRC32, 读取比写入便宜, 也不会消耗 SSD 的写入寿命
+        """
+        try:
+            stat = target.stat()
+        except OSError:
+            return False
+        if stat.st_size != info.file_size:
+            return False
+        record = self.manifest.get(relative)
+        if record is not None and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime_ns:
+            return record["crc"] == info.CRC
+
+        crc = 0
+        with open(str(target), "rb") as f:
+            while chunk := f.read(self.bufferSize):
+                crc = zlib.crc32(chunk, crc)
+        return crc == info.CRC
+
+    def _loadManifest(self) -> Dict[str, dict]:
+        """
+        ## 读取清单, 不存在或损坏时返回空字典
+        """
+        try:
+            return json.loads(self.manifestPath.read_text(encoding="utf-8"))["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _saveManifest(self, entries: Dict[str, zipfile.ZipInfo]) -> None:
+        """
+        ## 保存本次安装的清单, 记录安装后的修改时间, 下次安装时据此判断文件是否被改动过
+        """
+        files = {}
+        for relative, info in entries.items():
+            stat = (self.installPath / relative).stat()
+            files[relative] = {"crc": info.CRC, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+        self.manifest = files
+        atomicWrite(self.manifestPath, json.dumps({"files": files}).encode("utf-8"))
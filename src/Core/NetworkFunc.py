@@ -1,16 +1,24 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import json
+import os
+import queue
+import re
+import time
 from abc import ABC
+from email.utils import parsedate_to_datetime
 from enum import Enum
 from functools import wraps
 from pathlib import Path
-from typing import Optional, IO, Callable, Any
+from typing import Optional, IO, Callable, Any, Dict, List, Tuple
 from loguru import logger
 
-from PySide6.QtCore import QUrl, QEventLoop, QRegularExpression, Signal, Slot, QObject
+from PySide6.QtCore import QUrl, QEventLoop, QRegularExpression, Signal, Slot, QObject, QTimer, QThread
 from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
 from creart import exists_module, AbstractCreator, CreateTargetInfo, add_creator, it
 
+from src.Core import atomicWrite
+
 
 class Urls(Enum):
     """
@@ -70,10 +78,166 @@ class NetworkFuncClassCreator(AbstractCreator, ABC):
 add_creator(NetworkFuncClassCreator)
 
 
+class MetadataFetcher(QObject):
+    """
+    ## 获取远程的版本信息等小文件
+        - 同一个 Url 同时只有一个请求, 请求期间的其他调用等待同一个结果
+        - 带上 If-None-Match / If-Modified-Since, 服务器返回 304 时直接使用缓存的内容
+        - 响应内容和 ETag / Last-Modified 保存在磁盘上, 启动时可以立即读取到上次的结果
+        - 请求失败后按指数退避, 退避期间不再发送请求; GitHub 的速率限制按其返回的重置时间等待
+    """
+
+    backoffBase = 60  # 第一次失败后等待的秒数, 之后每次翻倍
+    backoffMax = 3600  # 最长等待的秒数
+
+    def __init__(self) -> None:
+        super().__init__()
+        from src.Core.PathFunc import PathFunc
+
+        self.directory = it(PathFunc).cache_path / "http"
+        self._entries: Dict[str, Optional[dict]] = {}  # Url -> 缓存的内容, 读取过磁盘但不存在时为 None
+        self._pending: Dict[str, List[Callable[[Optional[str]], None]]] = {}  # Url -> 等待结果的回调
+        self._failures: Dict[str, int] = {}  # Url -> 连续失败次数
+        self._retryAt: Dict[str, float] = {}  # Url -> 允许再次请求的时间
+
+    def cached(self, url: QUrl) -> Optional[str]:
+        """
+        ## 返回磁盘缓存中的内容, 没有缓存时返回 None
+        """
+        entry = self._entry(url.toString())
+        return entry["body"] if entry is not None else None
+
+    def fetch(self, url: QUrl, callback: Callable[[Optional[str]], None]) -> None:
+        """
+        ## 请求 Url, 完成后以响应内容调用 callback, 失败或处于退避期间时以 None 调用
+            - callback 总是在事件循环中异步调用
+        """
+        key = url.toString()
+        if key in self._pending:
+            # 已有相同的请求, 等待它的结果即可
+            self._pending[key].append(callback)
+            return
+
+        if time.time() < self._retryAt.get(key, 0):
+            QTimer.singleShot(0, lambda: callback(None))
+            return
+
+        request = QNetworkRequest(url)
+        if (entry := self._entry(key)) is not None:
+            if entry.get("etag"):
+                request.setRawHeader(b"If-None-Match", entry["etag"].encode())
+            if entry.get("lastModified"):
+                request.setRawHeader(b"If-Modified-Since", entry["lastModified"].encode())
+
+        self._pending[key] = [callback]
+        reply = it(NetworkFunc).manager.get(request)
+        reply.finished.connect(lambda: self._finished(key, reply))
+
+    def _finished(self, key: str, reply: QNetworkReply) -> None:
+        """
+        ## 请求结束, 更新缓存和退避状态并调用所有等待的回调
+        """
+        status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        body = None
+        if reply.error() == QNetworkReply.NetworkError.NoError and status == 304:
+            # 内容没有变化, 使用缓存
+            body = self.cached(QUrl(key))
+        elif reply.error() == QNetworkReply.NetworkError.NoError:
+            body = reply.readAll().data().decode().strip()
+            self._store(key, {
+                "url": key,
+                "etag": reply.rawHeader("ETag").data().decode(),
+                "lastModified": reply.rawHeader("Last-Modified").data().decode(),
+                "body": body
+            })
+
+        if body is not None:
+            self._failures.pop(key, None)
+            self._retryAt.pop(key, None)
+        else:
+            self._backoff(key, reply)
+        reply.deleteLater()
+
+        for callback in self._pending.pop(key, []):
+            try:
+                callback(body)
+            except Exception as e:
+                logger.exception(f"处理 {key} 的响应失败: {e}")
+
+    def _backoff(self, key: str, reply: QNetworkReply) -> None:
+        """
+        ## 记录一次失败并计算下次允许请求的时间
+        """
+        failures = self._failures[key] = self._failures.get(key, 0) + 1
+        delay = min(self.backoffBase * 2 ** (failures - 1), self.backoffMax)
+
+        # 速率限制时按服务器给出的时间等待
+        if reply.hasRawHeader("Retry-After"):
+            value = reply.rawHeader("Retry-After").data().decode()
+            try:
+                retryAfter = int(value) if value.isdigit() else parsedate_to_datetime(value).timestamp() - time.time()
+                delay = max(delay, retryAfter)
+            except (TypeError, ValueError):
+                pass
+        if reply.rawHeader("X-RateLimit-Remaining").data() == b"0":
+            delay = max(delay, int(reply.rawHeader("X-RateLimit-Reset").data() or 0) - time.time())
+
+        self._retryAt[key] = time.time() + delay
+        logger.error(f"请求 {key} 失败({reply.errorString()}), {delay:.0f} 秒内不再请求")
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+    def _entry(self, key: str) -> Optional[dict]:
+        """
+        ## 读取缓存, 每个 Url 只读取一次磁盘
+        """
+        if key not in self._entries:
+            try:
+                entry = json.loads(self._path(key).read_text(encoding="utf-8"))
+                self._entries[key] = entry if entry.get("url") == key else None
+            except (OSError, ValueError):
+                self._entries[key] = None
+        return self._entries[key]
+
+    def _store(self, key: str, entry: dict) -> None:
+        """
+        ## 更新缓存, 内容没有变化时不写入磁盘
+        """
+        if self._entries.get(key) == entry:
+            return
+        self._entries[key] = entry
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atomicWrite(self._path(key), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"写入 {key} 的缓存失败: {e}")
+
+
+class MetadataFetcherClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.NetworkFunc", "MetadataFetcher"),)
+
+    # 静态方法available()，用于检查模块"NetworkFunc"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.NetworkFunc")
+
+    # 静态方法create()，用于创建MetadataFetcher类的实例，返回值为MetadataFetcher对象。
+    @staticmethod
+    def create(create_type: [MetadataFetcher]) -> MetadataFetcher:
+        return MetadataFetcher()
+
+
+add_creator(MetadataFetcherClassCreator)
+
+
 def async_request(url: QUrl) -> Callable[[Callable[..., None]], Callable[..., None]]:
     """
     装饰器函数，用于装饰其他函数，使其在QUrl请求完成后执行
         - url (QUrl): 用于进行网络请求的QUrl对象。
+    请求通过 MetadataFetcher 发送, 相同 Url 的并发请求只会发送一次
     """
     def decorator(func: Callable[..., None]) -> Callable[..., None]:
         """
@@ -86,43 +250,165 @@ def async_request(url: QUrl) -> Callable[[Callable[..., None]], Callable[..., No
                 - *args: 传递给被装饰函数的位置参数
                 - **kwargs: 传递给被装饰函数的关键字参数
             """
-            def on_finished(_reply: QNetworkReply) -> None:
-                """
-                请求完成后的回调函数，读取响应并调用被装饰的函数。
-                    - reply (QNetworkReply): 网络响应对象
-                """
-                if _reply.error() == QNetworkReply.NetworkError.NoError:
-                    # 调用被装饰的函数并传递响应数据
-                    func(*args, reply=_reply.readAll().data().decode().strip(), *kwargs)
-                else:
-                    func(*args, reply=None, *kwargs)
-                    logger.error(f"Error: {_reply.errorString()}")
-                # 清理回复对象
-                _reply.deleteLater()
-
-            # 创建并发送网络请求
-            request = QNetworkRequest(url)
-            reply = it(NetworkFunc).manager.get(request)
-            # 连接请求完成信号到回调函数
-            reply.finished.connect(lambda: on_finished(reply))
+            it(MetadataFetcher).fetch(url, lambda reply: func(*args, reply=reply, **kwargs))
 
         return wrapper
     return decorator
 
 
+class DownloadSegment:
+    """
+    ## 分段下载中的一段, 负责 [start, end] 范围内的字节
+    """
+
+    def __init__(self, start: int, end: int, done: int = 0) -> None:
+        self.start = start
+        self.end = end
+        self.done = done  # 已收到的字节数
+        self.retries = 0
+        self.reply: Optional[QNetworkReply] = None
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.start + 1 - self.done
+
+    @property
+    def isComplete(self) -> bool:
+        return self.remaining <= 0
+
+
+class DownloadWriter(QThread):
+    """
+    ## 在后台线程中写入下载的数据并计算 SHA-256
+        - 主线程只把收到的数据放入队列, 写入经过 bufferSize 的缓冲, 不会阻塞界面
+        - 按文件顺序到达的数据直接计算哈希, 不需要下载完成后再读一遍文件
+        - 分段下载中乱序到达的数据只记录区间, 前面的空缺补上后再从文件读回计算, 这时通常还在系统缓存中
+    """
+
+    closed = Signal(str)  # 写入结束, 参数为十六进制的 SHA-256, 文件不完整或写入失败时为空字符串
+    errorOccurred = Signal(str)
+
+    bufferSize = 1024 * 1024
+    _RESET = object()
+
+    def __init__(self, path: Path, existing: List[Tuple[int, int]] = ()) -> None:
+        """
+        ## 初始化
+            - path 要写入的文件, 必须已经存在
+            - existing 文件中已有内容的区间 [start, end), 例如续传前已下载的部分
+        """
+        super().__init__()
+        self.path = path
+        self.hashed = 0  # 已计算哈希的字节数, 即从文件开头起连续的部分
+        self._sha256 = hashlib.sha256()
+        self._pending: Dict[int, int] = {start: end for start, end in existing if end > start}  # 未计算哈希的区间
+        self._queue: queue.Queue = queue.Queue()
+
+    def write(self, offset: int, data: bytes) -> None:
+        """
+        ## 把数据写入文件的 offset 处
+        """
+        self._queue.put((offset, data))
+
+    def reset(self) -> None:
+        """
+        ## 清空文件和哈希, 从头开始写入
+        """
+        self._queue.put(self._RESET)
+
+    def close(self) -> None:
+        """
+        ## 写完队列中的数据后结束线程, 结束时发送 closed
+        """
+        self._queue.put(None)
+
+    def run(self) -> None:
+        try:
+            with open(str(self.path), "r+b", buffering=self.bufferSize) as f:
+                self._catchUp(f)
+                while (item := self._queue.get()) is not None:
+                    if item is self._RESET:
+                        f.seek(0)
+                        f.truncate()
+                        self.hashed, self._sha256, self._pending = 0, hashlib.sha256(), {}
+                        continue
+
+                    offset, data = item
+                    if f.tell() != offset:
+                        f.seek(offset)
+                    f.write(data)
+                    if offset == self.hashed:
+                        self._sha256.update(data)
+                        self.hashed += len(data)
+                        self._catchUp(f)
+                    elif offset > self.hashed:
+                        self._pending[offset] = offset + len(data)
+        except OSError as e:
+            logger.error(f"写入 {self.path} 失败: {e}")
+            self.errorOccurred.emit(str(e))
+            self.closed.emit("")
+            return
+
+        self.closed.emit("" if self._pending else self._sha256.hexdigest())
+
+    def _catchUp(self, f: IO[bytes]) -> None:
+        """
+        ## 前面的空缺补上后, 从文件中读回紧接着的已写入部分并计算哈希
+        """
+        if self.hashed not in self._pending:
+            return
+        position = f.tell()
+        while self.hashed in self._pending:
+            end = self._pending.pop(self.hashed)
+            f.seek(self.hashed)
+            while self.hashed < end and (chunk := f.read(min(self.bufferSize, end - self.hashed))):
+                self._sha256.update(chunk)
+                self.hashed += len(chunk)
+        f.seek(position)
+
+
 class Downloader(QObject):
     """
     ## 执行下载任务
+        - 内容先写入 <文件名>.part, 同目录的 <文件名>.part.json 记录 Url、ETag / Last-Modified 和总大小
+        - 再次 start 时通过 Range + If-Range 从上次的位置继续, 服务器不支持或文件已变化时从头下载
+        - 网络中断或传输停滞时自动续传重试, 每次有进展后重置重试次数; stop 取消时保留已下载的部分
+        - 下载完成并校验大小后重命名为目标文件
+        - segments 大于 1 时先发送 HEAD 请求, 服务器支持 Range 且文件足够大时预分配文件,
+          分成多段同时下载, 每段写入自己的位置; 否则退回单个连接
+        - 写入和 SHA-256 的计算在 DownloadWriter 线程中进行, 发送 finished(True) 前把哈希保存到 sha256;
+          设置了 expectedSha256 时哈希不一致视为下载失败并删除已下载的内容
     """
     downloadProgress = Signal(int)
     finished = Signal(bool)
     errorOccurred = Signal(str, str)
 
-    def __init__(self, url: QUrl = None, path: Path = None):
+    maxRetries = 5  # 连续没有进展的最大重试次数
+    retryDelay = 1000  # 第一次重试前等待的毫秒数, 之后每次翻倍
+    transferTimeout = 30_000  # 超过这个时间(毫秒)没有收到数据视为停滞, 中断后续传
+
+    # 可以通过续传恢复的错误
+    RETRY_ERRORS = (
+        QNetworkReply.NetworkError.RemoteHostClosedError,
+        QNetworkReply.NetworkError.TimeoutError,
+        QNetworkReply.NetworkError.OperationCanceledError,
+        QNetworkReply.NetworkError.TemporaryNetworkFailureError,
+        QNetworkReply.NetworkError.NetworkSessionFailedError,
+        QNetworkReply.NetworkError.ProxyTimeoutError,
+        QNetworkReply.NetworkError.UnknownNetworkError,
+        QNetworkReply.NetworkError.InternalServerError,
+        QNetworkReply.NetworkError.ServiceUnavailableError,
+        QNetworkReply.NetworkError.UnknownServerError,
+    )
+
+    minSegmentSize = 4 * 1024 * 1024  # 每段的最小字节数, 小文件不分段
+
+    def __init__(self, url: QUrl = None, path: Path = None, segments: int = 1):
         """
         ## 初始化下载器
             - url 下载连接
             - path 下载路径
+            - segments 同时使用的连接数, Qt 对同一主机最多同时建立 6 个 HTTP/1.1 连接
         """
         super().__init__()
         self.url: QUrl = url if url else None
@@ -130,7 +416,43 @@ class Downloader(QObject):
 
         self.request = QNetworkRequest(self.url) if self.url else QNetworkRequest()
         self.reply: Optional[QNetworkReply] = None
-        self.file: Optional[IO[bytes]] = None
+        self.writer: Optional[DownloadWriter] = None
+        self.sha256: Optional[str] = None  # 下载完成的文件的 SHA-256
+        self.expectedSha256: Optional[str] = None  # 发布方公布的 SHA-256, 为 None 时不校验
+        self.offset = 0  # 本次请求开始时 .part 文件中已有的字节数
+        self.position = 0  # 单个连接下载时下一个字节在文件中的位置
+        self.total = -1  # 文件的总大小, 未知时为 -1
+        self._retries = 0
+        self._isStopped = False
+        self._isRestart = False  # 服务器返回的范围与请求的不一致, 需要从头下载
+        self._error: Optional[tuple] = None  # 失败时通过 errorOccurred 发送的错误信息
+        self._afterClose: Optional[Callable[[str], None]] = None  # 写入线程结束后要执行的操作
+
+        self._retryTimer = QTimer(self)
+        self._retryTimer.setSingleShot(True)
+        self._retryTimer.timeout.connect(self._request)
+
+        # 分段下载
+        self.segments = max(1, segments)
+        self.segmentList: List[DownloadSegment] = []
+        self._meta: Optional[dict] = None
+        self._headReply: Optional[QNetworkReply] = None
+        self._progress = -1  # 上次发送的进度, 只在变化时发送
+
+    @property
+    def filePath(self) -> Path:
+        """
+        ## 下载完成后的文件路径
+        """
+        return self.path / self.url.fileName()
+
+    @property
+    def partPath(self) -> Path:
+        return self.filePath.with_name(f"{self.filePath.name}.part")
+
+    @property
+    def metaPath(self) -> Path:
+        return self.filePath.with_name(f"{self.filePath.name}.part.json")
 
     def setUrl(self, url: QUrl):
         self.url = url
@@ -141,22 +463,387 @@ class Downloader(QObject):
 
     def start(self):
         """
-        ## 启动下载
+        ## 启动下载, 存在同一个 Url 未完成的下载时继续下载
+        """
+        self._isStopped = False
+        self._retries = 0
+        self._error = None
+        self.sha256 = None
+        if self.segments > 1:
+            meta = self._readMeta()
+            if meta is not None and meta.get("segments") and self.partPath.exists():
+                # 继续未完成的分段下载
+                self._startSegments(meta)
+                return
+            if meta is None:
+                self._head()
+                return
+        self._request()
+
+    def stop(self):
+        """
+        ## 停止下载, 已下载的部分保留, 下次 start 时继续
         """
-        # 打开文件以写入下载数据
-        self.file = open(str(self.path / self.url.fileName()), 'wb')
+        self._isStopped = True
+        if self._headReply:
+            self._headReply.abort()
+        elif self.segmentList:
+            if not any(segment.reply for segment in self.segmentList):
+                # 所有分段都在等待重试
+                self._segmentsStopped()
+            for segment in self.segmentList:
+                if segment.reply:
+                    segment.reply.abort()
+        elif self.reply:
+            self.reply.abort()
+        elif self._retryTimer.isActive():
+            # 正在等待重试, 没有进行中的请求
+            self._retryTimer.stop()
+            self._closeWriter(lambda _: self._emitFailure())
+
+    def _request(self) -> None:
+        """
+        ## 发送请求, 有未完成的下载时只请求剩余的部分
+        """
+        meta = self._readMeta()
+        if meta is not None and meta.get("segments"):
+            # 分段下载的文件是预分配的, 大小不代表进度, 无法用单个连接续传
+            meta = None
+        if self.writer is None:
+            self.offset = self.partPath.stat().st_size if meta is not None and self.partPath.exists() else 0
+            # 创建或清空文件, 由写入线程以读写模式打开; 已有的部分在写入线程中补算哈希
+            with open(str(self.partPath), "ab" if self.offset else "wb"):
+                pass
+            self._openWriter([(0, self.offset)])
+        else:
+            # 重试时写入线程仍在运行, 可能还没有写完, 以已收到的位置为准
+            self.offset = self.position if meta is not None else 0
+        self.position = self.offset
+        self.total = meta.get("length", -1) if meta is not None else -1
+        self._isRestart = False
+
+        request = self._newRequest()
+        if self.offset:
+            request.setRawHeader(b"Range", f"bytes={self.offset}-".encode())
+            if validator := meta.get("etag") or meta.get("lastModified"):
+                # 文件在服务器上发生变化时服务器会返回完整的内容, 而不是范围
+                request.setRawHeader(b"If-Range", validator.encode())
+
         # 执行下载任务并连接信号
-        self.reply = it(NetworkFunc).manager.get(self.request)
+        self.reply = it(NetworkFunc).manager.get(request)
+        self.reply.metaDataChanged.connect(self._metaDataChangedSlot)
         self.reply.downloadProgress.connect(self._downloadProgressSlot)
         self.reply.readyRead.connect(self._read2File)
         self.reply.finished.connect(self._finished)
-        self.reply.errorOccurred.connect(self._error)
 
-    def stop(self):
+    def _readMeta(self) -> Optional[dict]:
+        """
+        ## 读取未完成下载的信息, 不是同一个 Url 时返回 None
+        """
+        try:
+            meta = json.loads(self.metaPath.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == self.url.toString() else None
+
+    @Slot()
+    def _metaDataChangedSlot(self):
+        """
+        ## 收到响应头, 判断服务器是否按请求的范围返回并记录下载信息
+        """
+        status = self.reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        if status == 206:
+            match = re.match(r"bytes (\d+)-\d+/(\d+|\*)", self.reply.rawHeader("Content-Range").data().decode())
+            if match is None or int(match.group(1)) != self.offset:
+                self._isRestart = True
+                self.reply.abort()
+                return
+            self.total = int(match.group(2)) if match.group(2) != "*" else -1
+        elif status == 200:
+            if self.offset:
+                # 服务器不支持 Range 或文件已变化, 返回的是完整内容, 从头开始写入
+                logger.info(f"{self.url.fileName()} 无法续传, 从头开始下载")
+                self.writer.reset()
+                self.offset = self.position = 0
+            length = self.reply.header(QNetworkRequest.KnownHeaders.ContentLengthHeader)
+            self.total = int(length) if length is not None else -1
+        else:
+            # 重定向或错误, 等待最终的响应
+            return
+
+        self._writeMeta(self._newMeta(self.reply, self.total))
+
+    def _newMeta(self, reply: QNetworkReply, length: int) -> dict:
+        """
+        ## 根据响应头生成未完成下载的信息
+        """
+        return {
+            "url": self.url.toString(),
+            "etag": reply.rawHeader("ETag").data().decode(),
+            "lastModified": reply.rawHeader("Last-Modified").data().decode(),
+            "length": length
+        }
+
+    def _writeMeta(self, meta: dict) -> None:
+        self.metaPath.write_text(json.dumps(meta), encoding="utf-8")
+
+    def _newRequest(self) -> QNetworkRequest:
+        """
+        ## 创建下载请求
+        """
+        request = QNetworkRequest(self.request)
+        request.setTransferTimeout(self.transferTimeout)
+        # 续传的范围针对的是未压缩的内容
+        request.setRawHeader(b"Accept-Encoding", b"identity")
+        if self.segments > 1:
+            # HTTP/2 会把所有分段复用到同一个连接上, 分段就没有意义了
+            request.setAttribute(QNetworkRequest.Attribute.Http2AllowedAttribute, False)
+        return request
+
+    def _openWriter(self, existing: List[Tuple[int, int]]) -> None:
+        """
+        ## 启动写入线程
+        """
+        self.writer = DownloadWriter(self.partPath, existing)
+        self.writer.closed.connect(self._writerClosedSlot)
+        self.writer.errorOccurred.connect(self._writerErrorSlot)
+        self.writer.start()
+
+    def _closeWriter(self, then: Callable[[str], None]) -> None:
+        """
+        ## 等待写入线程写完所有数据后以 SHA-256 调用 then, 不会阻塞界面
+        """
+        if self.writer is None:
+            then("")
+            return
+        self._afterClose = then
+        self.writer.close()
+
+    @Slot(str)
+    def _writerClosedSlot(self, digest: str) -> None:
+        """
+        ## 写入线程已结束
+        """
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.wait()
+            writer.deleteLater()
+        then, self._afterClose = self._afterClose, None
+        if then is not None:
+            then(digest)
+
+    @Slot(str)
+    def _writerErrorSlot(self, message: str) -> None:
+        """
+        ## 写入失败(例如磁盘已满), 停止下载
+        """
+        self._error = (message, "WriteError")
+        self._isStopped = True
+        if self._retryTimer.isActive():
+            self._retryTimer.stop()
+            self._closeWriter(lambda _: self._emitFailure())
+        elif self.segmentList and not any(segment.reply for segment in self.segmentList):
+            self._segmentsStopped()
+        for reply in [self.reply] + [segment.reply for segment in self.segmentList]:
+            if reply:
+                reply.abort()
+
+    def _emitFailure(self) -> None:
+        """
+        ## 发送下载失败
+        """
+        self.finished.emit(False)
+        if self._error is not None:
+            self.errorOccurred.emit(*self._error)
+            self._error = None
+
+    def _complete(self, digest: str) -> None:
+        """
+        ## 所有数据都已写入, 校验 SHA-256 后重命名为目标文件
+        """
+        if self._error is not None:
+            self._emitFailure()
+            return
+        if self.expectedSha256 and digest.lower() != self.expectedSha256.lower():
+            logger.error(f"{self.url.fileName()} 的 SHA-256 不一致, 期望 {self.expectedSha256}, 实际 {digest}")
+            # 内容已损坏, 删除后下次从头下载
+            self.partPath.unlink(missing_ok=True)
+            self.metaPath.unlink(missing_ok=True)
+            self._error = (self.tr("The downloaded file is corrupted, please try again"), "ChecksumMismatch")
+            self._emitFailure()
+            return
+
+        os.replace(str(self.partPath), str(self.filePath))
+        self.metaPath.unlink(missing_ok=True)
+        self.sha256 = digest or None
+        self.downloadProgress.emit(100)
+        self.finished.emit(True)
+
+    def _head(self) -> None:
+        """
+        ## 发送 HEAD 请求, 判断是否可以分段下载
         """
-        ## 停止下载
+        self._headReply = it(NetworkFunc).manager.head(self._newRequest())
+        self._headReply.finished.connect(self._headFinished)
+
+    @Slot()
+    def _headFinished(self) -> None:
+        """
+        ## HEAD 请求结束, 支持 Range 时预分配文件并开始分段下载, 否则使用单个连接
+        """
+        reply, self._headReply = self._headReply, None
+        reply.deleteLater()
+        if self._isStopped:
+            self._emitFailure()
+            return
+
+        length = reply.header(QNetworkRequest.KnownHeaders.ContentLengthHeader)
+        total = int(length) if length is not None else -1
+        if (
+                reply.error() != QNetworkReply.NetworkError.NoError
+                or reply.rawHeader("Accept-Ranges").data().lower() != b"bytes"
+                or total < self.minSegmentSize * 2
+        ):
+            self._request()
+            return
+
+        # 按连接数平均分段, 但每段不小于 minSegmentSize
+        size = max(-(-total // self.segments), self.minSegmentSize)
+        meta = self._newMeta(reply, total)
+        meta["segments"] = [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+        with open(str(self.partPath), "wb") as f:
+            # 预分配文件, 各段直接写入自己的位置
+            f.truncate(total)
+        self._writeMeta(meta)
+        logger.info(f"{self.url.fileName()} 共 {total} 字节, 分为 {len(meta['segments'])} 段下载")
+        self._startSegments(meta)
+
+    def _startSegments(self, meta: dict) -> None:
+        """
+        ## 开始(或继续)分段下载
+        """
+        self._meta = meta
+        self.total = meta["length"]
+        self._progress = -1
+        self.segmentList = [DownloadSegment(*segment) for segment in meta["segments"]]
+        self._openWriter([(segment.start, segment.start + segment.done) for segment in self.segmentList])
+        for segment in self.segmentList:
+            if not segment.isComplete:
+                self._requestSegment(segment)
+        if all(segment.isComplete for segment in self.segmentList):
+            self._finishSegments()
+
+    def _requestSegment(self, segment: DownloadSegment) -> None:
+        """
+        ## 请求一段中剩余的部分
+        """
+        if self._isStopped or segment not in self.segmentList:
+            # 等待重试期间下载被停止或重新开始
+            return
+        request = self._newRequest()
+        request.setRawHeader(b"Range", f"bytes={segment.start + segment.done}-{segment.end}".encode())
+        if validator := self._meta.get("etag") or self._meta.get("lastModified"):
+            request.setRawHeader(b"If-Range", validator.encode())
+
+        segment.reply = it(NetworkFunc).manager.get(request)
+        segment.reply.readyRead.connect(lambda: self._segmentReadyRead(segment))
+        segment.reply.finished.connect(lambda: self._segmentFinished(segment))
+
+    def _segmentReadyRead(self, segment: DownloadSegment) -> None:
+        """
+        ## 把一段收到的数据交给写入线程
+        """
+        reply = segment.reply
+        if reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute) != 206:
+            # 服务器忽略了 Range 或文件已变化, 放弃分段下载
+            self._isRestart = True
+            for other in self.segmentList:
+                if other.reply:
+                    other.reply.abort()
+            return
+
+        data = reply.readAll().data()[:max(0, segment.remaining)]
+        self.writer.write(segment.start + segment.done, data)
+        segment.done += len(data)
+        segment.retries = 0
+
+        progress = int(sum(segment.done for segment in self.segmentList) / self.total * 100)
+        if progress != self._progress:
+            self._progress = progress
+            self.downloadProgress.emit(progress)
+
+    def _segmentFinished(self, segment: DownloadSegment) -> None:
         """
-        self.reply.abort() if self.reply else None
+        ## 一段的请求结束, 可恢复的错误单独重试这一段
+        """
+        reply, segment.reply = segment.reply, None
+        error = reply.error()
+        reply.deleteLater()
+        isActive = any(other.reply for other in self.segmentList)
+
+        if self._isRestart:
+            if not isActive:
+                # 所有分段都已停止, 丢弃预分配的文件, 使用单个连接从头下载
+                logger.info(f"{self.url.fileName()} 无法分段下载, 从头开始下载")
+                self._isRestart = False
+                self.segmentList = []
+                self.metaPath.unlink(missing_ok=True)
+                self._closeWriter(lambda _: self._request())
+            return
+        if segment.isComplete:
+            if all(other.isComplete for other in self.segmentList):
+                self._finishSegments()
+            return
+        if self._isStopped:
+            if not isActive:
+                self._segmentsStopped()
+            return
+
+        isRetryable = error == QNetworkReply.NetworkError.NoError or error in self.RETRY_ERRORS
+        if isRetryable and segment.retries < self.maxRetries:
+            delay = self.retryDelay * 2 ** segment.retries
+            segment.retries += 1
+            logger.warning(
+                f"下载 {self.url.fileName()} 的第 {self.segmentList.index(segment) + 1} 段中断"
+                f"({reply.errorString()}), {delay} 毫秒后续传"
+            )
+            QTimer.singleShot(delay, self, lambda: self._requestSegment(segment))
+            return
+
+        # 无法恢复, 停止其他分段
+        logger.error(f"下载 {self.url.fileName()} 失败: {reply.errorString()}")
+        self._error = (reply.errorString(), str(error))
+        self._isStopped = True
+        for other in self.segmentList:
+            if other.reply:
+                other.reply.abort()
+        if not any(other.reply for other in self.segmentList):
+            self._segmentsStopped()
+
+    def _segmentsStopped(self) -> None:
+        """
+        ## 分段下载已停止, 数据写入磁盘后再保存各段的进度, 以便继续
+        """
+        self._meta["segments"] = [[segment.start, segment.end, segment.done] for segment in self.segmentList]
+        self.segmentList = []
+
+        def then(_: str) -> None:
+            if self._error is not None and self._error[1] == "WriteError":
+                # 写入失败时已收到的字节数不代表磁盘上的内容, 下次从头下载
+                self.partPath.unlink(missing_ok=True)
+                self.metaPath.unlink(missing_ok=True)
+            else:
+                self._writeMeta(self._meta)
+            self._emitFailure()
+
+        self._closeWriter(then)
+
+    def _finishSegments(self) -> None:
+        """
+        ## 所有分段下载完成
+        """
+        self.segmentList = []
+        self._closeWriter(self._complete)
 
     @Slot()
     def _downloadProgressSlot(self, bytes_received: int, bytes_total: int):
@@ -165,37 +852,60 @@ class Downloader(QObject):
             - bytes_received 接收的字节数
             - bytes_total 总字节数
         """
-        if bytes_total > 0:
-            # 防止发生零除以零的情况
-            self.downloadProgress.emit(int((bytes_received / bytes_total) * 100))
+        total = self.total if self.total > 0 else self.offset + bytes_total
+        if total > 0 and bytes_total >= 0:
+            # 防止发生零除以零的情况, 进度包括之前已下载的部分
+            self.downloadProgress.emit(int(((self.offset + bytes_received) / total) * 100))
 
     @Slot()
     def _read2File(self):
         """
-        ## 读取数据并写入文件
+        ## 读取数据并交给写入线程
         """
-        if self.file:
-            self.file.write(self.reply.readAll())
+        if self.writer is not None and not self._isRestart:
+            data = self.reply.readAll().data()
+            self.writer.write(self.position, data)
+            self.position += len(data)
+            # 有进展, 重置重试次数
+            self._retries = 0
 
     @Slot()
     def _finished(self):
         """
-        ## 下载结束并发送信号
+        ## 下载结束, 完成时校验并重命名为目标文件, 可恢复的错误自动续传
         """
-        if self.file:
-            # 防止文件中途丢失导致关闭一个没有打开的文件引发报错
-            self.file.close()
-            self.file = None
-        if self.reply.error() != QNetworkReply.NetworkError.NoError:
-            self.finished.emit(False)
+        reply, self.reply = self.reply, None
+        error = reply.error()
+        status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        reply.deleteLater()
+
+        if self._isRestart:
+            # 服务器返回的范围不正确, 丢弃已下载的部分立即重新请求
+            self.metaPath.unlink(missing_ok=True)
+            self._closeWriter(lambda _: self._request())
+            return
+        isComplete = self.total < 0 or self.position == self.total
+        if (error == QNetworkReply.NetworkError.NoError or status == 416) and isComplete:
+            # 416 表示请求的范围超出了文件大小, 上次已经下载完整
+            self._closeWriter(self._complete)
             return
 
-        self.finished.emit(True)
+        if self._isStopped:
+            self._closeWriter(lambda _: self._emitFailure())
+            return
 
-    @Slot()
-    def _error(self, error_code):
-        if self.file:
-            self.file.close()
-            self.file = None
-        self.finished.emit(False)
-        self.errorOccurred.emit(self.reply.errorString(), str(error_code))
+        isIncomplete = error == QNetworkReply.NetworkError.NoError  # 连接正常结束但内容不完整
+        if (isIncomplete or error in self.RETRY_ERRORS) and self._retries < self.maxRetries:
+            delay = self.retryDelay * 2 ** self._retries
+            self._retries += 1
+            logger.warning(
+                f"下载 {self.url.fileName()} 中断({reply.errorString()}), "
+                f"已下载 {self.position} 字节, {delay} 毫秒后续传"
+            )
+            # 写入线程保持运行, 续传的数据接着写入
+            self._retryTimer.start(delay)
+            return
+
+        logger.error(f"下载 {self.url.fileName()} 失败: {reply.errorString()}")
+        self._error = (reply.errorString(), str(error))
+        self._closeWriter(lambda _: self._emitFailure())
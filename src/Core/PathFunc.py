@@ -1,26 +1,47 @@
 # -*- coding: utf-8 -*-
-import winreg
+import time
 from abc import ABC
 from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
 
-from PySide6.QtCore import QOperatingSystemVersion
+from PySide6.QtCore import QCoreApplication, QFileSystemWatcher, QOperatingSystemVersion
 from creart import add_creator, exists_module
 from creart.creator import AbstractCreator, CreateTargetInfo
 from loguru import logger
 
+try:
+    import winreg
+except ImportError:
+    # 只有 Windows 有注册表, 只在 Windows 下查找 QQ 路径时使用
+    winreg = None
+
 
 class PathFunc:
+    """
+    ## 路径相关的功能
+        - getQQPath / getNapCatPath / getStartScriptPath 的结果会被缓存, 热路径上只是一次字典查询
+        - 设置页修改路径(配置项 valueChanged)或安装目录发生变化(QFileSystemWatcher)时清除对应的缓存
+        - 没有找到的路径只缓存 missingTTL 秒, 之后重新查找
+    """
+
+    missingTTL = 30.0
 
     def __init__(self):
         """
         ## 初始化
         """
+        self._cache: Dict[str, Tuple[Optional[Path], float]] = {}  # 键 -> (路径, 过期时间)
+        self._watcher: Optional[QFileSystemWatcher] = None
+        self._isConnected = False
         self.qq_path = None
         self.base_path = Path.cwd()
         self.config_dir_path = self.base_path / "config"
         self.config_path = self.config_dir_path / "config.json"
-        self.bot_config_path = self.config_dir_path / "bot.json"
+        self.bot_config_path = self.config_dir_path / "bot.json"  # 旧版本的机器人配置, 仅用于迁移
+        self.bot_config_dir_path = self.config_dir_path / "bots"
+        self.cache_path = self.config_dir_path / "cache"  # 网络请求等的磁盘缓存
         self.tmp_path = self.base_path / "tmp"
+        self.log_path = self.base_path / "log"
         self.napcat_path = self.base_path / "NapCat"
         self.start_script = self.base_path / "StartScript"
 
@@ -58,10 +79,90 @@ class PathFunc:
 
         logger.info(f"{'-' * 10}路径验证完成{'-' * 10}")
 
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        ## 清除路径缓存
+            - key 为 "QQPath" / "NapCatPath" / "StartScriptPath", 为 None 时清除全部
+        """
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
     def getQQPath(self) -> Path | None:
         """
         获取QQ路径
         """
+        return self._cached("QQPath", self._resolveQQPath)
+
+    def getNapCatPath(self) -> Path:
+        """
+        ## 获取 NapCat 路径
+        会验证路径是否为 default
+        """
+        return self._cached("NapCatPath", self._resolveNapCatPath)
+
+    def getStartScriptPath(self) -> Path:
+        """
+        ## 获取启动脚本路径
+        会验证路径是否为 default
+        """
+        return self._cached("StartScriptPath", self._resolveStartScriptPath)
+
+    def _cached(self, key: str, resolver: Callable[[], Optional[Path]]) -> Optional[Path]:
+        """
+        ## 返回缓存的路径, 没有缓存或已过期时调用 resolver 重新获取
+        """
+        if (entry := self._cache.get(key)) is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        self._connectConfig()
+        path = resolver()
+        expires = float("inf") if path is not None else time.monotonic() + self.missingTTL
+        self._cache[key] = (path, expires)
+        self._watch(path)
+        return path
+
+    def _connectConfig(self) -> None:
+        """
+        ## 配置项被修改时清除对应的缓存, 只连接一次
+        """
+        if self._isConnected:
+            return
+        from src.Core.Config import cfg
+
+        self._isConnected = True
+        cfg.QQPath.valueChanged.connect(lambda _: self.invalidate("QQPath"))
+        cfg.NapCatPath.valueChanged.connect(lambda _: self.invalidate("NapCatPath"))
+        cfg.StartScriptPath.valueChanged.connect(lambda _: self.invalidate("StartScriptPath"))
+
+    def _watch(self, path: Optional[Path]) -> None:
+        """
+        ## 监听路径和它的上级目录, 目录被创建、删除或修改时清除缓存
+            - QApplication 创建之前无法监听, 只依赖配置项的 valueChanged
+        """
+        if path is None or QCoreApplication.instance() is None:
+            return
+        if self._watcher is None:
+            self._watcher = QFileSystemWatcher()
+            self._watcher.directoryChanged.connect(self._directoryChanged)
+        paths = [str(p) for p in (path, path.parent) if p.is_dir()]
+        if paths:
+            self._watcher.addPaths([p for p in paths if p not in self._watcher.directories()])
+
+    def _directoryChanged(self, directory: str) -> None:
+        """
+        ## 清除位于该目录或以该目录为上级目录的路径缓存
+        """
+        directory = Path(directory)
+        for key, (path, _) in list(self._cache.items()):
+            if path is not None and directory in (path, path.parent):
+                self.invalidate(key)
+
+    def _resolveQQPath(self) -> Path | None:
+        """
+        ## 查找 QQ 路径, Windows 下读取注册表
+        """
         from src.Core.Config import cfg
 
         try:
@@ -87,10 +188,9 @@ class PathFunc:
         except FileNotFoundError:
             return None
 
-    def getNapCatPath(self) -> Path:
+    def _resolveNapCatPath(self) -> Path:
         """
-        ## 获取 NapCat 路径
-        会验证路径是否为 default
+        ## 查找 NapCat 路径, 为 default 时写入类内部定义的路径
         """
         from src.Core.Config import cfg
 
@@ -101,10 +201,9 @@ class PathFunc:
             self.napcat_path = Path(cfg.get(item=cfg.NapCatPath))
         return self.napcat_path
 
-    def getStartScriptPath(self) -> Path:
+    def _resolveStartScriptPath(self) -> Path:
         """
-        ## 获取启动脚本路径
-        会验证路径是否为 default
+        ## 查找启动脚本路径, 为 default 时写入类内部定义的路径
         """
         from src.Core.Config import cfg
 
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+import weakref
+from abc import ABC
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PySide6.QtCore import QObject, QTimer, Qt, Signal, Slot, QEvent
+from creart import add_creator, exists_module
+from creart.creator import AbstractCreator, CreateTargetInfo
+from loguru import logger
+
+
+class ScheduledJob:
+    """
+    ## 调度器中的一个任务, 每个 (实例, 方法) 只有一个
+    """
+
+    def __init__(
+            self, owner: Any, func: Callable[..., Any], interval: int, singleShot: bool, pauseHidden: bool,
+            args: tuple, kwargs: dict
+    ) -> None:
+        """
+        ## 初始化任务
+            - owner 方法所属的实例, QObject 持有强引用直到 destroyed, 其他对象只持有弱引用
+            - func 未经修饰的原始方法
+            - interval 间隔(毫秒)
+            - singleShot 是否只执行一次
+            - pauseHidden owner 为 QWidget 且不可见(隐藏、所在页面未显示、窗口最小化或隐藏到托盘)时暂停执行
+        """
+        self.func = func
+        self.interval = max(1, interval)
+        self.singleShot = singleShot
+        # 不导入 QtWidgets, 无界面模式下也可以使用
+        self.pauseHidden = pauseHidden and isinstance(owner, QObject) and owner.isWidgetType()
+        self.args = args
+        self.kwargs = kwargs
+        self.nextDue = 0.0  # 下次执行的时间(毫秒, 单调时钟)
+        self.runCount = 0
+        self.totalTime = 0.0  # 累计执行耗时(毫秒)
+        self.isHidden = False  # 是否因为 owner 不可见而暂停, 暂停期间不会唤醒调度器
+        if isinstance(owner, QObject):
+            self._owner = owner
+            self._ownerRef = None
+        else:
+            self._owner = None
+            self._ownerRef = weakref.ref(owner)
+
+    @property
+    def owner(self) -> Any:
+        return self._owner if self._ownerRef is None else self._ownerRef()
+
+    @property
+    def name(self) -> str:
+        return self.func.__qualname__
+
+    def schedule(self, now: float) -> None:
+        """
+        ## 计算下次执行时间
+            - 对齐到 interval 的整数倍, 间隔互为倍数的任务(例如 1 秒和 3 秒)会落在同一个 tick
+        """
+        self.nextDue = (math.floor(now / self.interval) + 1) * self.interval
+
+    def isRunnable(self) -> bool:
+        """
+        ## 当前是否可以执行
+        """
+        if not self.pauseHidden:
+            return True
+        owner = self.owner
+        return owner.isVisible() and not owner.window().isMinimized()
+
+
+class Scheduler(QObject):
+    """
+    ## 全局任务调度器
+        - 替代每次调用都会新建 QTimer 的做法, 所有周期任务共用一个单次触发的 QTimer
+        - 每个 (实例, 方法) 只登记一次, 重复调用不会重复创建计时器
+        - 同一 tick 内到期的任务合并执行
+        - 不可见的 QWidget 的任务暂停, 不再唤醒调度器; 重新显示时如果错过了执行则立即补上一次
+        - 实例被销毁时自动取消其所有任务
+    """
+
+    # 每个 tick 结束时发送: 已登记的任务数量, 本次执行的任务数量, 本次执行的总耗时(毫秒)
+    ticked = Signal(int, int, float)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.jobs: Dict[Tuple[int, str], ScheduledJob] = {}
+        self.tolerance = 50  # 在这个时间(毫秒)内到期的任务合并到同一个 tick
+        self.slowTick = 100  # 单个 tick 超过这个耗时(毫秒)时输出警告
+        self.lastTickJobs = 0
+        self.lastTickTime = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.TimerType.CoarseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    @staticmethod
+    def now() -> float:
+        return time.monotonic() * 1000
+
+    def add(
+            self, owner: Any, func: Callable[..., Any], interval: int, singleShot: bool = False,
+            pauseHidden: bool = True, args: tuple = (), kwargs: Optional[dict] = None
+    ) -> bool:
+        """
+        ## 登记任务, 已登记的 (实例, 方法) 直接返回 False
+            - 参数含义见 ScheduledJob
+        """
+        key = (id(owner), func.__qualname__)
+        if key in self.jobs:
+            return False
+
+        job = ScheduledJob(owner, func, interval, singleShot, pauseHidden, args, kwargs or {})
+        job.schedule(self.now())
+        self.jobs[key] = job
+        if job.pauseHidden:
+            # 通过事件过滤器得知显示/隐藏, 重复安装同一个过滤器不会重复触发
+            owner.installEventFilter(self)
+            owner.window().installEventFilter(self)
+            job.isHidden = not job.isRunnable()
+        if isinstance(owner, QObject):
+            # 避免一个实例重复连接
+            if not any(other is not job and other.owner is owner for other in self.jobs.values()):
+                owner.destroyed.connect(lambda _=None, ownerId=id(owner): self.cancel(ownerId))
+        else:
+            weakref.finalize(owner, self.cancel, id(owner))
+        self._arm()
+        return True
+
+    def cancel(self, owner: Any, func: Optional[Callable[..., Any]] = None) -> None:
+        """
+        ## 取消任务
+            - owner 实例或实例的 id
+            - func 要取消的方法, 为 None 时取消该实例的所有任务
+        """
+        ownerId = owner if isinstance(owner, int) else id(owner)
+        for key in list(self.jobs):
+            if key[0] == ownerId and (func is None or key[1] == func.__qualname__):
+                del self.jobs[key]
+        self._arm()
+
+    def isScheduled(self, owner: Any, func: Callable[..., Any]) -> bool:
+        """
+        ## 指定的 (实例, 方法) 是否已登记
+        """
+        return (id(owner), func.__qualname__) in self.jobs
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        """
+        ## 监听任务所属控件的显示/隐藏以及窗口的最小化
+        """
+        eventType = event.type()
+        if eventType in (QEvent.Type.Show, QEvent.Type.Hide):
+            if eventType == QEvent.Type.Show:
+                # 控件可能在登记之后才被添加到窗口中, 显示时再安装一次
+                watched.window().installEventFilter(self)
+            self._updateVisibility(lambda job: job.owner is watched)
+        elif eventType == QEvent.Type.WindowStateChange:
+            self._updateVisibility(lambda job: job.owner.window() is watched)
+        return super().eventFilter(watched, event)
+
+    def _updateVisibility(self, predicate: Callable[[ScheduledJob], bool]) -> None:
+        """
+        ## 重新计算符合条件的任务是否暂停, 恢复时补上错过的执行
+        """
+        now = self.now()
+        changed = False
+        for job in self.jobs.values():
+            if not job.pauseHidden or job.owner is None or not predicate(job):
+                continue
+            isHidden = not job.isRunnable()
+            if isHidden == job.isHidden:
+                continue
+            job.isHidden = isHidden
+            changed = True
+            if not isHidden and job.nextDue <= now:
+                # 暂停期间错过了执行, 立即补上
+                job.nextDue = now
+        if changed:
+            self._arm()
+
+    def stats(self) -> Dict[str, Tuple[int, float]]:
+        """
+        ## 返回每个任务的执行次数和累计耗时(毫秒)
+        """
+        return {f"{job.name}@{key[0]:x}": (job.runCount, job.totalTime) for key, job in self.jobs.items()}
+
+    def _arm(self) -> None:
+        """
+        ## 把计时器设置到最近一个任务的到期时间
+        """
+        dueTimes = [job.nextDue for job in self.jobs.values() if not job.isHidden]
+        if not dueTimes:
+            # 没有任务或所有任务都已暂停, 不再唤醒
+            self._timer.stop()
+            return
+        self._timer.start(max(0, math.ceil(min(dueTimes) - self.now())))
+
+    @Slot()
+    def _tick(self) -> None:
+        """
+        ## 执行所有已到期(或即将在 tolerance 内到期)的任务
+        """
+        tickStart = self.now()
+        due = [
+            (key, job) for key, job in list(self.jobs.items())
+            if not job.isHidden and job.nextDue <= tickStart + self.tolerance
+        ]
+
+        ran = 0
+        for key, job in due:
+            if self.jobs.get(key) is not job:
+                # 在本次 tick 中被前面的任务取消了
+                continue
+            if job.owner is None:
+                del self.jobs[key]
+                continue
+
+            if not job.isRunnable():
+                # 没有收到隐藏事件的情况(例如窗口最小化时部分平台不会发送), 在这里补充暂停
+                job.isHidden = True
+                continue
+
+            if job.singleShot:
+                del self.jobs[key]
+            else:
+                job.schedule(tickStart)
+
+            start = self.now()
+            try:
+                job.func(job.owner, *job.args, **job.kwargs)
+            except Exception as e:
+                logger.exception(f"定时任务 {job.name} 执行失败: {e}")
+            job.runCount += 1
+            job.totalTime += self.now() - start
+            ran += 1
+
+        self.lastTickJobs = ran
+        self.lastTickTime = self.now() - tickStart
+        if self.lastTickTime > self.slowTick:
+            logger.warning(f"定时任务执行耗时 {self.lastTickTime:.1f} ms, 共 {ran} 个任务")
+        self.ticked.emit(len(self.jobs), ran, self.lastTickTime)
+        self._arm()
+
+
+class SchedulerClassCreator(AbstractCreator, ABC):
+    # 定义类方法targets，该方法返回一个元组，元组中包含了一个CreateTargetInfo对象，
+    # 该对象描述了创建目标的相关信息，包括应用程序名称和类名。
+    targets = (CreateTargetInfo("src.Core.Scheduler", "Scheduler"),)
+
+    # 静态方法available()，用于检查模块"Scheduler"是否存在，返回值为布尔型。
+    @staticmethod
+    def available() -> bool:
+        return exists_module("src.Core.Scheduler")
+
+    # 静态方法create()，用于创建Scheduler类的实例，返回值为Scheduler对象。
+    @staticmethod
+    def create(create_type: [Scheduler]) -> Scheduler:
+        return Scheduler()
+
+
+add_creator(SchedulerClassCreator)
@@ -1,37 +1,38 @@
 # -*- coding: utf-8 -*-
+import os
 import sys
 from functools import wraps
 from pathlib import Path
 from typing import Callable, Any
 
-from PySide6.QtCore import QTimer
+from creart import it
 from loguru import logger
 
 
-def timer(interval: int, single_shot: bool = False) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+def timer(
+        interval: int, single_shot: bool = False, pause_hidden: bool = True
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
     """
-    ## 将 QTimer 附加到它所修饰的类方法的实例的修饰器
-    ## 计时器以 “interval” 指定的定期间隔调用修饰函数
+    ## 将修饰的类方法登记到全局调度器 Scheduler
+    ## 调度器以 “interval” 指定的定期间隔调用原始方法
 
-        - interval （int）: 计时器应触发的间隔（以毫秒为单位）
-        - single_shot （bool）: 如果为 True，则计时器只超时一次, 默认值为 False
+        - interval （int）: 调用的间隔（以毫秒为单位）
+        - single_shot （bool）: 如果为 True，则只调用一次, 默认值为 False
+        - pause_hidden （bool）: 实例为 QWidget 且不可见时暂停调用, 默认值为 True
 
+    每个 (实例, 方法) 只会登记一次, 手动再次调用只会立即执行一次, 不会再创建新的计时器
+    实例被销毁时自动取消登记
     """
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
-            instance = args[0]
-            if not hasattr(instance, '_timers'):
-                instance._timers = []
+            from src.Core.Scheduler import Scheduler
 
-            timer_instance = QTimer(instance)
-            timer_instance.setInterval(interval)
-            timer_instance.setSingleShot(single_shot)
-            timer_instance.timeout.connect(lambda: func(*args, **kwargs))
-            timer_instance.start()
-
-            instance._timers.append(timer_instance)  # 将计时器保存到实例变量
+            it(Scheduler).add(
+                owner=args[0], func=func, interval=interval, singleShot=single_shot,
+                pauseHidden=pause_hidden, args=args[1:], kwargs=kwargs
+            )
             return func(*args, **kwargs)
 
         return wrapper
@@ -39,9 +40,61 @@ def timer(interval: int, single_shot: bool = False) -> Callable[[Callable[..., A
     return decorator
 
 
+def atomicWrite(path: Path, data: bytes) -> None:
+    """
+    ## 原子地写入文件
+        - 先写入同目录下的临时文件并落盘, 再用 os.replace 替换目标文件
+        - 写入过程中崩溃或断电不会留下只写了一半的文件
+    """
+    tmpPath = path.with_name(f".{path.name}.tmp")
+    with open(str(tmpPath), "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(str(tmpPath), str(path))
+
+
+class StartupRotation:
+    """
+    ## ALL.log 的轮转条件
+        - 每次启动后的第一条日志写入前轮转, 保证 ALL.log 只包含本次运行的输出
+        - 之后超过 maxBytes 时轮转
+    """
+
+    def __init__(self, maxBytes: int) -> None:
+        self.maxBytes = maxBytes
+        self.isFirst = True
+
+    def __call__(self, message, file) -> bool:
+        if self.isFirst:
+            self.isFirst = False
+            return file.tell() > 0
+        return file.tell() + len(message) > self.maxBytes
+
+
+class StreamToLogger:
+    """
+    ## 把 print 和未捕获异常的输出原样转发给 loguru, 与 log 共用同一个轮转的文件
+    """
+
+    encoding = "utf-8"
+
+    def write(self, text: str) -> int:
+        if text:
+            logger.opt(raw=True).info(text)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
 def stdout():
     """
     ## 调整程序输出
+        - log/ALL.log 按启动次数和大小轮转, 旧文件由 loguru 在后台线程中压缩, 只保留最近 10 个
     """
     # 获取路径
     logPath = Path.cwd() / "log"
@@ -51,17 +104,22 @@ def stdout():
     if not logPath.exists():
         logPath.mkdir(parents=True, exist_ok=True)
 
-    # 打开文件
-    all_file = open(str(allLogPath), "w", encoding="utf-8")
-
     # 调整 log
     # 自定义格式化器
     custom_format = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | {message}"
     # 移除默认的 logger
     logger.remove()
-    # 添加自定义的 logger
-    logger.add(all_file, format=custom_format)
+    # 添加自定义的 logger, enqueue 使写入和压缩都在 loguru 的后台线程中进行
+    logger.add(
+        str(allLogPath),
+        format=custom_format,
+        rotation=StartupRotation(10 * 1024 * 1024),
+        retention=10,
+        compression="gz",
+        encoding="utf-8",
+        enqueue=True
+    )
 
     # 重定向输出
-    sys.stdout = all_file
-    sys.stderr = all_file
+    sys.stdout = StreamToLogger()
+    sys.stderr = StreamToLogger()
@@ -1,15 +1,14 @@
 # -*- coding: utf-8 -*-
 from typing import TYPE_CHECKING, Optional
 
-from PySide6.QtCore import QUrl, QUrlQuery, Qt, Slot
+from PySide6.QtCore import Qt, Slot
 from PySide6.QtGui import QPixmap
-from PySide6.QtNetwork import QNetworkRequest, QNetworkReply
 from PySide6.QtWidgets import QVBoxLayout
 from creart import it
 from qfluentwidgets import CardWidget, ImageLabel, BodyLabel, setFont, ToolTipFilter
 
+from src.Core.Avatar import AvatarCache
 from src.Core.Config.ConfigModel import Config
-from src.Core.NetworkFunc import Urls, NetworkFunc
 
 if TYPE_CHECKING:
     from src.Ui.BotListPage.BotList import BotList
@@ -77,26 +76,17 @@ class BotCard(CardWidget):
         self.QQAvatarLabel.scaledToHeight(115)
         self.QQAvatarLabel.setBorderRadius(5, 5, 5, 5)
 
-        # 处理 QQ头像 的 Url
-        avatar_url: QUrl = Urls.QQ_AVATAR.value
-        query = QUrlQuery()
-        query.addQueryItem("spec", "640")
-        query.addQueryItem("dst_uin", self.config.bot.QQID)
-        avatar_url.setQuery(query)
+        # 头像由 AvatarCache 统一获取, 有缓存时直接显示
+        avatar = it(AvatarCache).avatar(self.config.bot.QQID, 115, self, self._setAvatar)
+        if avatar is not None:
+            self._setAvatar(avatar)
 
-        # 创建请求并链接槽函数
-        request = QNetworkRequest(avatar_url)
-        replay = it(NetworkFunc).manager.get(request)
-        replay.finished.connect(lambda: self._setAvatar(replay))
-
-    def _setAvatar(self, replay: QNetworkReply) -> None:
+    def _setAvatar(self, avatar: Optional[QPixmap], error: str = "") -> None:
         """
         ## 设置头像
         """
-        if replay.error() == QNetworkReply.NetworkError.NoError:
-            # 如果请求成功则设置反之显示错误提示
-            avatar = QPixmap()
-            avatar.loadFromData(replay.readAll())
+        if avatar is not None:
+            # 如果获取成功则设置反之显示错误提示
             self.QQAvatarLabel.setImage(avatar)
             self.QQAvatarLabel.scaledToHeight(115)
             self.QQAvatarLabel.setBorderRadius(5, 5, 5, 5)
@@ -104,7 +94,7 @@ class BotCard(CardWidget):
             from src.Ui.BotListPage import BotListWidget
             it(BotListWidget).showError(
                 title=self.tr("Failed to get the QQ avatar"),
-                content=replay.errorString()
+                content=error
             )
 
     @Slot()
@@ -1,14 +1,15 @@
 # -*- coding: utf-8 -*-
-import json
-from typing import List
+from typing import Dict, List
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Slot
 from PySide6.QtWidgets import QWidget
 from creart import it
 from qfluentwidgets import ScrollArea, FlowLayout
 
+from src.Core.BotState import BotStateRegistry
+from src.Core.BotSupervisor import BotSupervisor
+from src.Core.Config.BotConfigRepository import BotConfigRepository
 from src.Core.Config.ConfigModel import Config
-from src.Core.PathFunc import PathFunc
 from src.Ui.BotListPage.BotCard import BotCard
 
 
@@ -25,8 +26,12 @@ class BotList(ScrollArea):
         """
         super().__init__(parent=parent)
         # 创建属性
-        self.botList: List[Config] = []
-        self.botCardList: List[BotCard] = []
+        self.botCards: Dict[str, BotCard] = {}  # 以 QQID 为键
+        self.generation = 0  # 已同步的配置版本
+
+        # 配置文件被外部修改时自动同步
+        it(BotConfigRepository).changed.connect(self._syncList)
+        it(BotConfigRepository).loadFailed.connect(self._loadFailedSlot)
 
         # 调用方法
         self._createView()
@@ -51,78 +56,77 @@ class BotList(ScrollArea):
         self.view.setObjectName("BotListView")
         self.view.setLayout(self.cardLayout)
 
+    @property
+    def botCardList(self) -> List[BotCard]:
+        return list(self.botCards.values())
+
+    @property
+    def botList(self) -> List[Config]:
+        return it(BotConfigRepository).list()
+
     def updateList(self) -> None:
         """
         ## 更新机器人列表
+            - 配置没有变化时不会重新解析, 也不会弹出提示
         """
-        self._parseList()
-
-        if not self.botCardList:
-            # 如果是首次运行, 则直接添加到布局和 botCardList
-            for bot in self.botList:
-                card = BotCard(bot, self)
-                self.cardLayout.addWidget(card)
-                self.botCardList.append(card)
+        repository = it(BotConfigRepository)
+        if repository.load():
+            if repository.configs:
+                self.parent().parent().showSuccess(
+                    title=self.tr("Load the list of bots"),
+                    content=self.tr("The list of bots was successfully loaded"),
+                )
+            else:
+                # 创建信息条
+                self.parent().parent().showInfo(
+                    title=self.tr("There are no bot configuration items"),
+                    content=self.tr("You'll need to add it in the Add bot page"),
+                )
+        self._syncList()
+
+    @Slot()
+    def _syncList(self) -> None:
+        """
+        ## 按配置仓库同步卡片
+            - 新增和删除的机器人同步到 BotStateRegistry, 由它通知首页等订阅者
+            - 删除的机器人(包括在外部删除的配置文件)先停止进程, 再移除卡片、BotWidget 和状态
+        """
+        repository = it(BotConfigRepository)
+        if self.generation == repository.generation:
             return
+        self.generation = repository.generation
+        registry = it(BotStateRegistry)
+        configs = repository.configs
+
+        for QQID in [QQID for QQID in self.botCards if QQID not in configs]:
+            # 移除已被删除的 bot
+            # 状态在进程结束后由 BotSupervisor 从 BotStateRegistry 中移除
+            card = self.botCards.pop(QQID)
+            it(BotSupervisor).remove(QQID)
+            if card.botWidget is not None:
+                card.botWidget.release()
+            self.cardLayout.removeWidget(card)
+            card.deleteLater()
 
-        QQList = [card.config.bot.QQID for card in self.botCardList]
-        for bot_config in self.botList:
-            # 遍历并判断是否有新增的 bot
-            if bot_config.bot.QQID in QQList:
-                # 如果属于则直接跳过
+        for QQID, config in configs.items():
+            if QQID in self.botCards:
+                # 已有的 bot 只更新配置
+                self.botCards[QQID].config = config
+                registry.add(QQID, config)
                 continue
 
-            # 不属于则就属于新增, 创建 card 并 添加到布局
-            card = BotCard(bot_config)
+            # 新增的 bot 创建 card 并添加到布局
+            card = BotCard(config, self)
             self.cardLayout.addWidget(card)
-            self.botCardList.append(card)
-
-        for card in self.botCardList:
-            # 遍历并判断是否有减少的 bot
-            if card.config in self.botList:
-                # 属于则就是没有被删除, 跳过
-                continue
-
-            # 移除出布局并删除
-            self.botCardList.remove(card)
-            self.cardLayout.removeWidget(card)
-            card.deleteLater()
+            self.botCards[QQID] = card
+            registry.add(QQID, config)
 
         # 刷新一次布局
         self.cardLayout.update()
 
-    def _parseList(self) -> None:
+    @Slot(str)
+    def _loadFailedSlot(self, error: str) -> None:
         """
-        ## 解析机器人配置(如果有)
+        ## 配置文件解析失败
         """
-        try:
-            # 读取配置列表
-            with open(str(it(PathFunc).bot_config_path), "r", encoding="utf-8") as f:
-                bot_configs = json.load(f)
-            if bot_configs:
-                # 如果从文件加载的 bot_config 不为空则执行使用Config和列表表达式解析
-                self.botList: List[Config] = [Config(**config) for config in bot_configs]
-                self.parent().parent().showSuccess(
-                    title=self.tr("Load the list of bots"),
-                    content=self.tr("The list of bots was successfully loaded"),
-                )
-            else:
-                # 创建信息条
-                self.parent().parent().showInfo(
-                    title=self.tr("There are no bot configuration items"),
-                    content=self.tr("You'll need to add it in the Add bot page"),
-                )
-                self.botList = []
-
-        except FileNotFoundError:
-            # 如果文件不存在则创建一个
-            with open(str(it(PathFunc).bot_config_path), "w", encoding="utf-8") as f:
-                json.dump([], f, indent=4)
-            self.botList = []
-
-        except ValueError as e:
-            # 如果配置文件解析失败则提示错误信息并覆盖原有文件
-            self.parent().parent().showError(self.tr("Unable to load bot list"), str(e))
-            with open(str(it(PathFunc).bot_config_path), "w", encoding="utf-8") as f:
-                json.dump([], f, indent=4)
-            self.botList = []
+        self.parent().parent().showError(self.tr("Unable to load bot list"), error)
@@ -10,6 +10,8 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QStackedWidget
 from creart import add_creator, exists_module, it
 from creart.creator import AbstractCreator, CreateTargetInfo
 
+from src.Core.BotState import BotStateRegistry
+from src.Core.BotSupervisor import BotSupervisor
 from src.Ui.BotListPage.BotList import BotList
 from src.Ui.BotListPage.BotTopCard import BotTopCard
 from src.Ui.StyleSheet import StyleSheet
@@ -46,6 +48,8 @@ class BotListWidget(QWidget):
 
         # 调用方法
         self._setLayout()
+        it(BotSupervisor).restartScheduled.connect(self._restartScheduledSlot)
+        it(BotSupervisor).gaveUp.connect(self._gaveUpSlot)
 
         # 应用样式表
         StyleSheet.BOT_LIST_WIDGET.apply(self)
@@ -64,23 +68,35 @@ class BotListWidget(QWidget):
     def stopAllBot(self):
         """
         ## 停止所有 bot
+            - 同时向所有机器人发出停止请求后立即返回, 各进程并行退出
+            - 全部退出后 BotStateRegistry 发送 allStopped
         """
-        for bot in self.botList.botCardList:
-            if not bot.botWidget:
-                continue
-            if bot.botWidget.isRun:
-                bot.botWidget.stopButton.click()
+        it(BotSupervisor).stopAll()
 
-    def getBotIsRun(self):
+    def _restartScheduledSlot(self, QQID: str, delay: int, reason: str) -> None:
+        """
+        ## 机器人即将自动重启
+        """
+        self.showWarning(
+            title=self.tr("Bot {} will restart").format(QQID),
+            content=self.tr("{}, restarting in {} seconds").format(reason, delay // 1000)
+        )
+
+    def _gaveUpSlot(self, QQID: str, reason: str) -> None:
+        """
+        ## 机器人重启次数过多, 不再自动重启
+        """
+        self.showError(
+            title=self.tr("Bot {} keeps crashing").format(QQID),
+            content=self.tr("{}, automatic restart has been stopped").format(reason)
+        )
+
+    @staticmethod
+    def getBotIsRun() -> bool:
         """
         ## 获取是否有 bot 正在运行
         """
-        for bot in self.botList.botCardList:
-            if not bot.botWidget:
-                # 如果没有创建则表示没有运行
-                continue
-            if bot.botWidget.isRun:
-                return True
+        return bool(it(BotStateRegistry).runningBots())
 
     def showInfo(self, title: str, content: str) -> None:
         """
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+## Bot 日志界面, 顶部为搜索、过滤和翻页工具栏, 下方为日志查看器
+"""
+import time
+from typing import TYPE_CHECKING
+
+from PySide6.QtCore import Qt, Slot
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout
+from qfluentwidgets import TransparentToolButton, FluentIcon, CaptionLabel, ToolTipFilter, ComboBox, SearchLineEdit
+
+from src.Core.BotLog import LogLevel
+from src.Core.Config.ConfigModel import Config
+from src.Ui.common import LogEditor
+
+if TYPE_CHECKING:
+    from src.Ui.BotListPage.BotWidget import BotWidget
+
+
+class BotLogPage(QWidget):
+    """
+    ## 窗体 Bot List 中, 对应 QQ 的 BotLogPage
+    """
+
+    def __init__(self, config: Config, view: "BotWidget") -> None:
+        """
+        ## 初始化 BotLogPage
+        """
+        super().__init__()
+        self.config = config
+        self.view = view
+
+        # 创建控件
+        self.logEditor = LogEditor(self)
+        self.statusLabel = CaptionLabel(self)
+        self.statsLabel = CaptionLabel(self)  # 显示日志写入速度和刷新延迟
+        self.pageBackButton = TransparentToolButton(FluentIcon.UP, self)  # 向前翻页按钮
+        self.pageForwardButton = TransparentToolButton(FluentIcon.DOWN, self)  # 向后翻页按钮
+        self.liveButton = TransparentToolButton(FluentIcon.PLAY, self)  # 回到实时日志按钮
+        self.levelComboBox = ComboBox(self)  # 按等级过滤
+        self.timeComboBox = ComboBox(self)  # 按时间范围过滤
+        self.previousErrorButton = TransparentToolButton(FluentIcon.CARE_UP_SOLID, self)  # 上一条错误按钮
+        self.nextErrorButton = TransparentToolButton(FluentIcon.CARE_DOWN_SOLID, self)  # 下一条错误按钮
+        self.searchLineEdit = SearchLineEdit(self)  # 全文搜索输入框
+        self.searchLabel = CaptionLabel(self)  # 显示当前结果 / 结果数量
+        self.previousResultButton = TransparentToolButton(FluentIcon.LEFT_ARROW, self)  # 上一个搜索结果按钮
+        self.nextResultButton = TransparentToolButton(FluentIcon.RIGHT_ARROW, self)  # 下一个搜索结果按钮
+        self.searchLineEdit.setPlaceholderText(self.tr("Search logs"))
+        self.searchLineEdit.setFixedWidth(220)
+
+        # 过滤选项, userData 分别为最低等级和距离现在的秒数
+        self.levelComboBox.addItem(self.tr("All levels"), userData=LogLevel.NONE)
+        self.levelComboBox.addItem(self.tr("Debug and above"), userData=LogLevel.DEBUG)
+        self.levelComboBox.addItem(self.tr("Info and above"), userData=LogLevel.INFO)
+        self.levelComboBox.addItem(self.tr("Warn and above"), userData=LogLevel.WARN)
+        self.levelComboBox.addItem(self.tr("Error only"), userData=LogLevel.ERROR)
+        self.timeComboBox.addItem(self.tr("All time"), userData=None)
+        self.timeComboBox.addItem(self.tr("Last 5 minutes"), userData=5 * 60)
+        self.timeComboBox.addItem(self.tr("Last 30 minutes"), userData=30 * 60)
+        self.timeComboBox.addItem(self.tr("Last hour"), userData=60 * 60)
+        self.timeComboBox.addItem(self.tr("Last 24 hours"), userData=24 * 60 * 60)
+
+        # 连接信号
+        self.pageBackButton.clicked.connect(self.logEditor.pageBack)
+        self.pageForwardButton.clicked.connect(self.logEditor.pageForward)
+        self.liveButton.clicked.connect(self.logEditor.returnToLive)
+        self.logEditor.viewChanged.connect(self._viewChangedSlot)
+        self.levelComboBox.currentIndexChanged.connect(self._filterChangedSlot)
+        self.timeComboBox.currentIndexChanged.connect(self._filterChangedSlot)
+        self.previousErrorButton.clicked.connect(lambda: self.logEditor.showNextLevel(LogLevel.ERROR, True))
+        self.nextErrorButton.clicked.connect(lambda: self.logEditor.showNextLevel(LogLevel.ERROR))
+        self.searchLineEdit.searchSignal.connect(self._searchSlot)
+        self.searchLineEdit.returnPressed.connect(lambda: self._searchSlot(self.searchLineEdit.text()))
+        self.searchLineEdit.clearSignal.connect(lambda: self._searchSlot(""))
+        self.previousResultButton.clicked.connect(lambda: self.logEditor.showSearchResult(True))
+        self.nextResultButton.clicked.connect(lambda: self.logEditor.showSearchResult())
+        self.logEditor.searchChanged.connect(self._searchChangedSlot)
+
+        # 调用方法
+        self._addTooltips()
+        self._setLayout()
+        self._viewChangedSlot()
+        self._searchChangedSlot()
+
+        # 设置全局唯一名称
+        self.setObjectName(f"{self.config.bot.QQID}_BotWidgetPivot_BotLog")
+
+    def _addTooltips(self) -> None:
+        """
+        ## 为按钮添加悬停提示
+        """
+        self.pageBackButton.setToolTip(self.tr("Show earlier logs"))
+        self.pageBackButton.installEventFilter(ToolTipFilter(self.pageBackButton))
+
+        self.pageForwardButton.setToolTip(self.tr("Show later logs"))
+        self.pageForwardButton.installEventFilter(ToolTipFilter(self.pageForwardButton))
+
+        self.liveButton.setToolTip(self.tr("Back to live logs"))
+        self.liveButton.installEventFilter(ToolTipFilter(self.liveButton))
+
+        self.previousErrorButton.setToolTip(self.tr("Previous error"))
+        self.previousErrorButton.installEventFilter(ToolTipFilter(self.previousErrorButton))
+
+        self.nextErrorButton.setToolTip(self.tr("Next error"))
+        self.nextErrorButton.installEventFilter(ToolTipFilter(self.nextErrorButton))
+
+        self.previousResultButton.setToolTip(self.tr("Previous result"))
+        self.previousResultButton.installEventFilter(ToolTipFilter(self.previousResultButton))
+
+        self.nextResultButton.setToolTip(self.tr("Next result"))
+        self.nextResultButton.installEventFilter(ToolTipFilter(self.nextResultButton))
+
+    @Slot()
+    def _viewChangedSlot(self) -> None:
+        """
+        ## 根据日志查看器的模式刷新工具栏
+        """
+        if self.logEditor.isFiltered:
+            self.statusLabel.setText(self.tr("Filtered"))
+        elif self.logEditor.isLive:
+            self.statusLabel.setText(self.tr("Live"))
+        else:
+            first = self.logEditor.pageStart + 1
+            last = self.logEditor.pageStart + self.logEditor.blockCount()
+            self.statusLabel.setText(self.tr("History {} - {}").format(first, last))
+
+        # 过滤模式下的行不连续, 不支持翻页
+        self.pageBackButton.setEnabled(not self.logEditor.isFiltered)
+        self.pageForwardButton.setEnabled(not self.logEditor.isLive and not self.logEditor.isFiltered)
+        self.liveButton.setEnabled(not self.logEditor.isLive)
+
+    @Slot(str)
+    def _searchSlot(self, query: str) -> None:
+        """
+        ## 执行搜索并跳转到第一个结果
+        """
+        if self.logEditor.search(query.strip()):
+            self.logEditor.showSearchResult()
+
+    @Slot()
+    def _searchChangedSlot(self) -> None:
+        """
+        ## 刷新搜索结果计数
+        """
+        count = len(self.logEditor.searchResults)
+        if not self.logEditor.searchTokens:
+            self.searchLabel.setText("")
+        elif self.logEditor.searchPosition >= 0:
+            self.searchLabel.setText(self.tr("{} / {}").format(self.logEditor.searchPosition + 1, count))
+        else:
+            self.searchLabel.setText(self.tr("{} results").format(count))
+        self.previousResultButton.setEnabled(count > 0)
+        self.nextResultButton.setEnabled(count > 0)
+
+    @Slot()
+    def _filterChangedSlot(self) -> None:
+        """
+        ## 过滤条件变化, 时间范围从选择的这一刻往前计算
+        """
+        seconds = self.timeComboBox.currentData()
+        self.logEditor.setFilter(
+            self.levelComboBox.currentData(),
+            time.time() - seconds if seconds is not None else None,
+            None
+        )
+
+    @Slot(float, float)
+    def setIngestStats(self, linesPerSecond: float, flushLatency: float) -> None:
+        """
+        ## 显示日志写入统计
+            - linesPerSecond 每秒写入的行数
+            - flushLatency 平均刷新延迟(毫秒)
+        """
+        self.statsLabel.setText(self.tr("{:.0f} lines/s, flush {:.1f} ms").format(linesPerSecond, flushLatency))
+
+    def _setLayout(self) -> None:
+        """
+        ## 对内部进行布局
+        """
+        self.toolBarLayout = QHBoxLayout()
+        self.vBoxLayout = QVBoxLayout()
+
+        self.toolBarLayout.setSpacing(4)
+        self.toolBarLayout.setContentsMargins(0, 0, 0, 0)
+        self.toolBarLayout.addWidget(self.statusLabel)
+        self.toolBarLayout.addSpacing(12)
+        self.toolBarLayout.addWidget(self.statsLabel)
+        self.toolBarLayout.addStretch(1)
+        self.toolBarLayout.addWidget(self.searchLineEdit)
+        self.toolBarLayout.addWidget(self.searchLabel)
+        self.toolBarLayout.addWidget(self.previousResultButton)
+        self.toolBarLayout.addWidget(self.nextResultButton)
+        self.toolBarLayout.addSpacing(12)
+        self.toolBarLayout.addWidget(self.levelComboBox)
+        self.toolBarLayout.addWidget(self.timeComboBox)
+        self.toolBarLayout.addWidget(self.previousErrorButton)
+        self.toolBarLayout.addWidget(self.nextErrorButton)
+        self.toolBarLayout.addSpacing(12)
+        self.toolBarLayout.addWidget(self.pageBackButton)
+        self.toolBarLayout.addWidget(self.pageForwardButton)
+        self.toolBarLayout.addWidget(self.liveButton)
+        self.toolBarLayout.setAlignment(Qt.AlignmentFlag.AlignVCenter)
+
+        self.vBoxLayout.setSpacing(4)
+        self.vBoxLayout.setContentsMargins(0, 0, 0, 0)
+        self.vBoxLayout.addLayout(self.toolBarLayout)
+        self.vBoxLayout.addWidget(self.logEditor)
+
+        self.setLayout(self.vBoxLayout)
@@ -1,10 +1,6 @@
 # -*- coding: utf-8 -*-
-import json
-import re
-from pathlib import Path
-
-from PySide6.QtCore import Qt, QProcess, Slot
-from PySide6.QtGui import QTextCursor, QPixmap
+from PySide6.QtCore import Qt, Slot
+from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QStackedWidget
 from creart import it
 from qfluentwidgets import (
@@ -12,12 +8,17 @@ from qfluentwidgets import (
     SubtitleLabel, ImageLabel, ToolButton, BodyLabel
 )
 
+from src.Core.BotLog import LogIngestor, LogParser, LogWriter
+from src.Core.BotState import BotState, BotStateRegistry
+from src.Core.BotSupervisor import BotSupervisor
 from src.Core.Config import cfg
+from src.Core.Config.BotConfigRepository import BotConfigRepository
 from src.Core.Config.ConfigModel import Config
 from src.Core.PathFunc import PathFunc
+from src.Ui.BotListPage.BotWidget.BotLogPage import BotLogPage
 from src.Ui.BotListPage.BotWidget.BotSetupPage import BotSetupPage
 from src.Ui.StyleSheet import StyleSheet
-from src.Ui.common import CodeEditor, LogHighlighter
+from src.Ui.common import LogHighlighter
 
 
 class BotWidget(QWidget):
@@ -28,8 +29,10 @@ class BotWidget(QWidget):
     def __init__(self, config: Config) -> None:
         super().__init__()
         self.config = config
-        self.isRun = False  # 用于标记机器人是否在运行
-        self.isLogin = False  # 用于标记机器人是否登录
+        # 运行和登录状态保存在全局状态表中, 其他控件只需要订阅对应的机器人
+        self.status = it(BotStateRegistry).add(self.config.bot.QQID, self.config)
+        # 进程由 BotSupervisor 管理, 自动重启时也是同一个对象
+        self.process = it(BotSupervisor).process(self.config)
         # 创建所需控件
         self._createView()
         self._createPivot()
@@ -43,8 +46,40 @@ class BotWidget(QWidget):
         self._setLayout()
         self._addTooltips()
 
+        self.status.stateChanged.connect(self._stateChangedSlot)
+
         StyleSheet.BOT_WIDGET.apply(self)
 
+    @property
+    def isRun(self) -> bool:
+        """
+        ## 机器人是否在运行
+        """
+        return self.status.isRun
+
+    @property
+    def isLogin(self) -> bool:
+        """
+        ## 机器人是否已登录
+        """
+        return self.status.isLogin
+
+    def release(self) -> None:
+        """
+        ## 机器人已被删除, 关闭日志文件并从机器人列表的 view 中移除
+            - 进程由调用方先通过 BotSupervisor.remove 停止
+        """
+        from src.Ui.BotListPage.BotListWidget import BotListWidget
+
+        self.logIngestor.flushed.disconnect(self.botLogPage.logEditor.appendLines)
+        if (history := self.botLogPage.logEditor.history) is not None:
+            history.close()
+        view = it(BotListWidget).view
+        if view.currentWidget() is self:
+            self._returnListButtonSlot()
+        view.removeWidget(self)
+        self.deleteLater()
+
     def _createPivot(self) -> None:
         """
         ## 创建机器人 Widget 顶部导航栏
@@ -80,8 +115,26 @@ class BotWidget(QWidget):
 
         self.botSetupPage = BotSetupPage(self.config, self)
 
-        self.botLogPage = CodeEditor(self)
-        self.botLogPage.setObjectName(f"{self.config.bot.QQID}_BotWidgetPivot_BotLog")
+        self.botLogPage = BotLogPage(self.config, self)
+        self.highlighter = LogHighlighter(self.botLogPage.logEditor)
+        # 进程可能在控件创建前就已经启动(例如删除后重新添加的机器人), 二维码对话框需要随时可用
+        from src.Ui.BotListPage.BotListWidget import BotListWidget
+        self.qrcodeMsgBox = QRCodeMessageBox(it(BotListWidget))
+
+        # 进程输出在工作线程中解析, 解析结果先进入缓冲区, 每帧最多向日志查看器插入一次
+        self.logParser = LogParser(self.config.bot.QQID)
+        self.logParser.linesParsed.connect(self._linesParsedSlot)
+        self.logParser.qrcodeFound.connect(self._qrcodeFoundSlot)
+        self.logParser.loginSuccess.connect(self._loginSuccessSlot)
+        self.logParser.fastLoginError.connect(self._fastLoginErrorSlot)
+        self.destroyed.connect(self.logParser.deleteLater)
+        self.process.starting.connect(self._processStartingSlot)
+        self.process.output.connect(self._handle_stdout)
+        self.process.finished.connect(self._processFinishedSlot)
+        self.process.failedToStart.connect(self._processFailedToStartSlot)
+        self.logIngestor = LogIngestor(parent=self)
+        self.logIngestor.flushed.connect(self.botLogPage.logEditor.appendLines)
+        self.logIngestor.statsChanged.connect(self.botLogPage.setIngestStats)
 
         # 将页面添加到 view
         # self.view.addWidget(self.botInfoPage)
@@ -144,141 +197,146 @@ class BotWidget(QWidget):
         """
         ## 启动按钮槽函数
 
-        # 清除已有(如果有)的log
-        # 配置环境变量
-            - 使用 QProcess.systemEnvironment() 复制一份系统环境变量列表
-            - 使用 append 添加 NapCat 所需的 ELECTRON_RUN_AS_NODE=1
-        # 创建 QProcess
-            - 设置先前配置好的 环境变量
-            - 设置启动的程序(QQ)路径
-            - 将 NapCat 以参数新式启动
-        # 配置 QProcess
-            - 设置输出合并
-            - 连接日志输出管道
-            - 连接结束函数
-            - 设置日志高亮
-            - 创建登录二维码消息盒
-        # 启动 QProcess
-            - 进度条设置完成
-            - 切换到 botLogPage
-        # 切换按钮显示
+        # 启动进程
+            - 进程的创建、环境变量和参数见 BotProcess.start, 不等待进程启动完成
+            - 通过 BotSupervisor 启动, 意外退出后会自动重启
+            - 进程启动后 BotStateRegistry 中的状态变为运行中, 按钮通过 _stateChangedSlot 切换
+        # 切换到 botLogPage
         """
         from src.Ui.BotListPage import BotListWidget
-        self.botLogPage.clear()
-
-        self.env = QProcess.systemEnvironment()
-        self.env.append("ELECTRON_RUN_AS_NODE=1")
-
-        self.process = QProcess(self)
-        self.process.setEnvironment(self.env)
-        self.process.setProgram(str(Path(self.config.advanced.QQPath) / "QQ.exe"))
-        self.process.setArguments([str(Path(cfg.NapCatPath.value) / "napcat.mjs"), "-q", self.config.bot.QQID])
-        self.process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
-        self.process.readyReadStandardOutput.connect(self._handle_stdout)
-        self.process.readyReadStandardOutput.connect(self._showQRCode)
-        self.process.finished.connect(self._processFinishedSlot)
-        self.highlighter = LogHighlighter(self.botLogPage.document())
-        self.qrcodeMsgBox = QRCodeMessageBox(self.parent().parent())
-        self.process.start()
-        self.process.waitForStarted()
+        it(BotSupervisor).start(self.config.bot.QQID)
 
         it(BotListWidget).showInfo(
             title=self.tr("The run command has been executed"),
             content=self.tr("If there is no output for a long time, check the QQ path and NapCat path")
         )
-        self.isRun = True
         self.view.setCurrentWidget(self.botLogPage)
-        self.runButton.setVisible(False)
-        self.stopButton.setVisible(True)
-        self.rebootButton.setVisible(True)
 
     @Slot()
     def _stopButtonSlot(self):
         """
         ## 停止按钮槽函数
+            - 只发出停止请求, 进程结束后状态变为 STOPPED, 不会自动重启
         """
-        self.process.kill()
-        self.process.waitForFinished()
+        it(BotSupervisor).stop(self.config.bot.QQID)
 
-        self.isRun = False
-        self.isLogin = False
         self.view.setCurrentWidget(self.botLogPage)
         self.showQRCodeButton.hide()
 
     @Slot()
     def _rebootButtonSlot(self):
         """
-        ## 重启机器人, 直接调用函数吧
+        ## 重启机器人, 旧进程结束后再启动
         """
-        self._stopButtonSlot()
-        self._runButtonSlot()
+        it(BotSupervisor).restart(self.config.bot.QQID)
 
-    def _handle_stdout(self):
+    @Slot()
+    def _processStartingSlot(self) -> None:
         """
-        ## 日志管道并检测内部信息执行操作
+        ## 即将启动进程(包括自动重启)
+
+        # 第一次启动时开始日志会话
+        # 重置日志解析和写入统计
         """
-        # 获取所有输出
-        data = self.process.readAllStandardOutput().data().decode()
-        # 匹配并移除 ANSI 转义码
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        data = ansi_escape.sub('', data)
-        # 获取 CodeEditor 的 cursor 并移动插入输出内容
-        cursor = self.botLogPage.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertText(data)
-        self.botLogPage.setTextCursor(cursor)
+        isNewSession = self.botLogPage.logEditor.history is None
+        # 日志会话和索引跨越重启, 时间也要接着上一次运行
+        self.logParser.reset(clearTimestamp=isNewSession)
+        # 旧进程最后的输出可能还在缓冲区中(通常是退出原因), 先写入日志再重置统计
+        self.logIngestor.flush()
+        self.logIngestor.reset()
+        if isNewSession:
+            # 只在第一次启动时开始会话, 重启后日志接着写入, 不会丢失之前的输出
+            self.botLogPage.logEditor.startSession(LogWriter(
+                directory=it(PathFunc).log_path / self.config.bot.QQID,
+                name=self.config.bot.QQID,
+                maxBytes=cfg.get(cfg.BotLogRotateSize) * 1024 * 1024,
+                maxArchives=cfg.get(cfg.BotLogArchiveCount)
+            ))
 
-        # 执行一些操作
-        self._showQRCode(data)
+    @Slot(bytes)
+    def _handle_stdout(self, data: bytes):
+        """
+        ## 日志管道, 只接收原始字节, 解码和解析都交给 logParser 在工作线程中完成
+        """
+        self.logParser.feed(data)
 
-    def _showQRCode(self, data=""):
+    @Slot(list, list)
+    def _linesParsedSlot(self, lines: list, records: list) -> None:
         """
-        ## 显示二维码
+        ## 解析完成的日志行写入缓冲区, 由 logIngestor 合并后统一刷新到日志查看器
         """
-        if self.isLogin:
-            # 如果是已经登录成功的状态,则直接跳过
+        self.logIngestor.feedLines(lines, records)
+
+    @Slot()
+    def _fastLoginErrorSlot(self) -> None:
+        """
+        ## 快速登录错误, 由 BotSupervisor 自动重启
+        """
+        if not it(BotSupervisor).reportFastLoginError(self.config.bot.QQID):
+            # 已经登录成功或重启次数过多
             return
 
         from src.Ui.BotListPage import BotListWidget
-        if "[ERROR] () | 快速登录错误" in data:
-            # 引发此错误时自动重启
-            self._rebootButtonSlot()
-            it(BotListWidget).showInfo(
-                title=self.tr("Sign-in error"),
-                content=self.tr(
-                    "Quick login error, NapCat has been automatically restarted, "
-                    "the following is the error message\n"
-                    "Quick login error"
-                )
+        it(BotListWidget).showInfo(
+            title=self.tr("Sign-in error"),
+            content=self.tr(
+                "Quick login error, NapCat has been automatically restarted, "
+                "the following is the error message\n"
+                "Quick login error"
             )
-            return
+        )
 
-        if match := re.search(r"二维码已保存到\s(.+)", data):
-            # 如果已经显示了则关闭
-            self.qrcodeMsgBox.cancelButton.click()
-            # 提取匹配的路径
-            qrcodePath = match.group(1).strip()
-            self.qrcodeMsgBox.setQRCode(qrcodePath)
-            self.showQRCodeButton.show()
-            self.showQRCodeButton.click()
+    @Slot(str)
+    def _qrcodeFoundSlot(self, qrcodePath: str) -> None:
+        """
+        ## 显示二维码
+        """
+        if self.isLogin:
             return
 
-        if f"[INFO] ({self.config.bot.QQID}) | 登录成功! " in data:
-            # 如果登录成功
-            self.qrcodeMsgBox.cancelButton.click()
-            self.showQRCodeButton.hide()
-            self.isLogin = True
-            it(BotListWidget).showSuccess(
-                title=self.tr("Login successful!"),
-                content=self.tr(f"Account {self.config.bot.QQID} login successful!")
-            )
+        # 如果已经显示了则关闭
+        self.qrcodeMsgBox.cancelButton.click()
+        self.qrcodeMsgBox.setQRCode(qrcodePath)
+        self.showQRCodeButton.show()
+        self.showQRCodeButton.click()
 
     @Slot()
+    def _loginSuccessSlot(self) -> None:
+        """
+        ## 登录成功
+        """
+        if self.isLogin:
+            return
+
+        from src.Ui.BotListPage import BotListWidget
+        self.qrcodeMsgBox.cancelButton.click()
+        self.showQRCodeButton.hide()
+        it(BotStateRegistry).markLoggedIn(self.config.bot.QQID)
+        it(BotListWidget).showSuccess(
+            title=self.tr("Login successful!"),
+            content=self.tr(f"Account {self.config.bot.QQID} login successful!")
+        )
+
+    @Slot(int, int)
     def _processFinishedSlot(self, exit_code, exit_status):
-        cursor = self.botLogPage.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertText(f"进程结束，退出码为 {exit_code}，状态为 {exit_status}")
-        self.botLogPage.setTextCursor(cursor)
+        self.logParser.finish(f"进程结束，退出码为 {exit_code}，状态为 {exit_status}")
+
+    @Slot(str)
+    def _processFailedToStartSlot(self, error: str) -> None:
+        """
+        ## 进程启动失败
+        """
+        from src.Ui.BotListPage import BotListWidget
+        it(BotListWidget).showError(title=self.tr("Failed to start the bot"), content=error)
+
+    @Slot(int)
+    def _stateChangedSlot(self, state: int) -> None:
+        """
+        ## 运行状态变化(包括进程自行退出)时刷新按钮, 正在停止时禁用停止和重启
+        """
+        self.stopButton.setEnabled(state != BotState.STOPPING)
+        self.rebootButton.setEnabled(state != BotState.STOPPING)
+        self._pivotSlot(self.view.currentIndex())
 
     @Slot()
     def _updateButtonSlot(self) -> None:
@@ -288,28 +346,17 @@ class BotWidget(QWidget):
         from src.Ui.BotListPage import BotListWidget
         self.newConfig = Config(**self.botSetupPage.getValue())
 
-        # 读取配置列表
-        with open(str(it(PathFunc).bot_config_path), "r", encoding="utf-8") as f:
-            bot_configs = [Config(**config) for config in json.load(f)]
-
-        if bot_configs:
-            # 如果从文件加载的 bot_config 不为空则进行更新(为空怎么办呢,我能怎么办,崩了呗bushi
-            for index, config in enumerate(bot_configs):
-                # 遍历配置列表,找到一样则替换
-                if config.bot.QQID == self.newConfig.bot.QQID:
-                    bot_configs[index] = self.newConfig
-                    break
-            # 不可以直接使用 dict方法 转为 dict对象, 内部 WebsocketUrl 和 HttpUrl 不会自动转为 str
-            bot_configs = [json.loads(config.json()) for config in bot_configs]
-            with open(str(it(PathFunc).bot_config_path), "w", encoding="utf-8") as f:
-                json.dump(bot_configs, f, indent=4)
+        if it(BotConfigRepository).update(self.newConfig):
+            # 下次启动(包括自动重启)使用新的配置
+            self.config = self.newConfig
+            it(BotSupervisor).process(self.config)
             # 更新成功提示
             it(BotListWidget).showSuccess(
                 title=self.tr("Update success"),
                 content=self.tr("The updated configuration is successful")
             )
         else:
-            # 为空报错
+            # 配置仓库中没有这个机器人
             it(BotListWidget).showError(
                 title=self.tr("Update error"),
                 content=self.tr("Data loss within the profile")
@@ -501,12 +548,9 @@ class DeleteConfigMessageBox(MessageBoxBase):
         """
         from src.Ui.BotListPage import BotListWidget
 
-        it(BotListWidget).botList.botList.remove(parent.config)
-
-        bot_configs = [json.loads(config.json()) for config in it(BotListWidget).botList.botList]
-
-        with open(str(it(PathFunc).bot_config_path), "w", encoding="utf-8") as f:
-            json.dump(bot_configs, f, indent=4)
+        # 先停止并移除进程, 进程结束后 BotSupervisor 再移除状态, 不会被 stop 重新登记
+        it(BotSupervisor).remove(parent.config.bot.QQID)
+        it(BotConfigRepository).remove(parent.config.bot.QQID)
 
         parent.returnListButton.click()
         it(BotListWidget).botList.updateList()
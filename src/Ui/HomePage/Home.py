@@ -3,11 +3,13 @@
 """
 主页
 """
+import math
 from abc import ABC
-from typing import TYPE_CHECKING, Self, Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Self, Optional, Tuple
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QPixmap, QPainter
+from PySide6.QtCore import Qt, QSize, QTimer
+from PySide6.QtGui import QImage, QPixmap, QPainter
 from PySide6.QtWidgets import QStackedWidget
 from creart import add_creator, exists_module, it
 from creart.creator import AbstractCreator, CreateTargetInfo
@@ -15,6 +17,7 @@ from qfluentwidgets import isDarkTheme, InfoBar, InfoBarIcon, InfoBarPosition, P
 
 from src.Core.Config import StartOpenHomePageViewEnum as SEnum
 from src.Core.Config import cfg
+from src.Core.ImageLoader import ImageLoader
 from src.Ui.HomePage.ContentView import ContentViewWidget
 from src.Ui.HomePage.DisplayView import DisplayViewWidget
 from src.Ui.HomePage.DownloadView import DownloadViewWidget
@@ -27,6 +30,10 @@ if TYPE_CHECKING:
 
 class HomeWidget(QStackedWidget):
 
+    bgDebounce = 150  # 缩放背景前等待窗口停止变化的时间(毫秒)
+    bgBucket = 128  # 背景按这个步长(物理像素)向上取整缩放, 相近的尺寸共用一张图片
+    bgCacheSize = 4
+
     def __init__(self) -> None:
         super().__init__()
         self.displayView: Optional[DisplayViewWidget] = None
@@ -34,10 +41,16 @@ class HomeWidget(QStackedWidget):
         self.downloadView: Optional[DownloadViewWidget] = None
         self.updateView: Optional[UpdateViewWidget] = None
 
-        # 加载背景图片
-        self.bgPixmap = None
-        self._bgPixmapLight = QPixmap(":Global/image/Global/page_bg_light.png")
-        self._bgPixmapDark = QPixmap(":Global/image/Global/page_bg_dark.png")
+        # 背景图片在后台线程中缩放, 缩放结果按 (主题, 尺寸档位) 缓存
+        self.bgPixmap: Optional[QPixmap] = None
+        self._bgKey = None
+        self._bgCache: "OrderedDict[Tuple[str, int, int], QPixmap]" = OrderedDict()
+
+        # 拖动窗口时合并缩放请求, 停止变化后才重新缩放, 期间先拉伸已有的图片
+        self._bgTimer = QTimer(self)
+        self._bgTimer.setSingleShot(True)
+        self._bgTimer.setInterval(self.bgDebounce)
+        self._bgTimer.timeout.connect(self.updateBgImage)
 
     def initialize(self, parent: "MainWindow") -> Self:
         """
@@ -108,18 +121,47 @@ class HomeWidget(QStackedWidget):
     def updateBgImage(self) -> None:
         """
         用于更新图片大小
+            - 缓存中有当前尺寸档位的图片时直接使用, 否则在后台线程中缩放, 完成后再替换
         """
-        # 重新加载图片保证缩放后清晰
-        if not isDarkTheme():
-            self.bgPixmap = self._bgPixmapLight
+        if isDarkTheme():
+            path = ":Global/image/Global/page_bg_dark.png"
         else:
-            self.bgPixmap = self._bgPixmapDark
+            path = ":Global/image/Global/page_bg_light.png"
+
+        ratio = self.devicePixelRatioF()
+        width = math.ceil(self.width() * ratio / self.bgBucket) * self.bgBucket
+        height = math.ceil(self.height() * ratio / self.bgBucket) * self.bgBucket
+        key = (path, width, height)
+        if key == self._bgKey or width <= 0 or height <= 0:
+            return
+        self._bgKey = key
+
+        if (pixmap := self._bgCache.get(key)) is not None:
+            self._bgCache.move_to_end(key)
+            self._setBgPixmap(pixmap)
+            return
 
-        self.bgPixmap = self.bgPixmap.scaled(
-            self.size(),
-            aspectMode=Qt.AspectRatioMode.KeepAspectRatioByExpanding,  # 等比缩放
-            mode=Qt.TransformationMode.SmoothTransformation,  # 平滑效果
+        it(ImageLoader).load(
+            path, QSize(width, height), self, lambda image: self._bgImageLoaded(key, image),
+            Qt.AspectRatioMode.KeepAspectRatioByExpanding  # 等比缩放
         )
+
+    def _bgImageLoaded(self, key: Tuple[str, int, int], image: QImage) -> None:
+        """
+        ## 背景缩放完成
+        """
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._bgCache[key] = pixmap
+        if len(self._bgCache) > self.bgCacheSize:
+            self._bgCache.popitem(last=False)
+        if key == self._bgKey:
+            # 期间尺寸又发生了变化时只放入缓存
+            self._setBgPixmap(pixmap)
+
+    def _setBgPixmap(self, pixmap: QPixmap) -> None:
+        self.bgPixmap = pixmap
         self.update()
 
     def showInfo(self, title: str, content: str) -> None:
@@ -170,15 +212,20 @@ class HomeWidget(QStackedWidget):
         """
         重写绘制事件绘制背景图片
         """
-        painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.bgPixmap)
+        if self.bgPixmap is not None:
+            painter = QPainter(self)
+            painter.drawPixmap(self.rect(), self.bgPixmap)
         super().paintEvent(event)
 
     def resizeEvent(self, event) -> None:
         """
         重写缩放事件
         """
-        self.updateBgImage()
+        if self.bgPixmap is None:
+            # 还没有可以拉伸的图片时立即开始缩放
+            self.updateBgImage()
+        else:
+            self._bgTimer.start()
         super().resizeEvent(event)
 
 
@@ -1,15 +1,15 @@
 # -*- coding: utf-8 -*-
-import re
 from abc import ABC
 from pathlib import Path
 from typing import TYPE_CHECKING, Self, Optional
 
-from PySide6.QtCore import QThread
 from PySide6.QtWidgets import QWidget, QStackedWidget, QVBoxLayout
-from creart import add_creator, exists_module, it
+from creart import add_creator, exists_module
 from creart.creator import AbstractCreator, CreateTargetInfo
 
 from src.Core import timer
+from src.Core.BotLog import LogTail
+from src.Core.BotLog.LogParser import ANSI_ESCAPE
 from src.Ui.SetupPage.SetupScrollArea import SetupScrollArea
 from src.Ui.SetupPage.SetupTopCard import SetupTopCard
 from src.Ui.StyleSheet import StyleSheet
@@ -66,8 +66,9 @@ class SetupWidget(QWidget):
         self.logWidget = CodeEditor(self)
         self.logWidget.setObjectName("NCD-LogWidget")
         self.highlighter = NCDLogHighlighter(self.logWidget.document())
-        self.updateLogWorker = UpdateLogWorker(self)
-        self.updateLogWorker.start()
+        # 只读取 ALL.log 新增的内容并追加, 不再反复读取整个文件
+        self.logTail = LogTail(Path.cwd() / "log" / "ALL.log")
+        self.updateLogContent()
         self.view.addWidget(self.setupScrollArea)
         self.view.addWidget(self.logWidget)
 
@@ -94,35 +95,27 @@ class SetupWidget(QWidget):
         widget = self.view.widget(index)
         self.topCard.pivot.setCurrentItem(widget.objectName())
 
-
-class UpdateLogWorker(QThread):
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def run(self):
-        self.updateLogContent()
-
-    @timer(5)
-    def updateLogContent(self):
-        log_file_path = Path.cwd() / "log/ALL.log"
-
-        if not log_file_path.exists():
+    @timer(500)
+    def updateLogContent(self) -> None:
+        """
+        ## 把 ALL.log 新增的内容追加到日志页面
+            - 设置页面不可见时暂停, 重新显示时立即补上
+        """
+        content = self.logTail.read()
+        if self.logTail.rewound:
+            # ALL.log 被轮转, 从头开始显示
+            self.logWidget.clear()
+        if not content:
             return
 
-        with open(log_file_path, "r", encoding="utf-8") as file:
-            # 匹配并移除 ANSI 转义码
-            ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-            content = ansi_escape.sub('', file.read())
-            # 替换特定字符串
-            content = content.replace(
-                "\n📢 Tips: QFluentWidgets Pro is now released. Click "
-                "https://qfluentwidgets.com/pages/pro to learn more about it.\n\n",
-                ""
-            )
-            # 输出内容
-            it(SetupWidget).logWidget.setPlainText(content)
-
+        # 匹配并移除 ANSI 转义码, 替换特定字符串
+        content = ANSI_ESCAPE.sub("", content).replace(
+            "📢 Tips: QFluentWidgets Pro is now released. Click "
+            "https://qfluentwidgets.com/pages/pro to learn more about it.\n\n",
+            ""
+        )
+        # 输出内容, appendPlainText 会自动换行, 去掉末尾的换行符
+        self.logWidget.appendPlainText(content.rstrip("\n"))
 
 
 class SetupWidgetClassCreator(AbstractCreator, ABC):
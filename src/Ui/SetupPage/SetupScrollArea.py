@@ -14,6 +14,8 @@ from qfluentwidgets.components import (
     CustomColorSettingCard,
     ComboBoxSettingCard,
     PushSettingCard,
+    RangeSettingCard,
+    SwitchSettingCard,
 )
 
 from src.Core.Config import cfg
@@ -113,6 +115,47 @@ class SetupScrollArea(ScrollArea):
             parent=self.pathGroup
         )
 
+        # 创建组 - 机器人日志
+        self.botLogGroup = SettingCardGroup(title=self.tr("Bot log"), parent=self.view)
+        self.botLogMaxLinesCard = RangeSettingCard(
+            configItem=cfg.BotLogMaxLines,
+            icon=FluentIcon.DOCUMENT,
+            title=self.tr("Log line limit"),
+            content=self.tr("The maximum number of lines kept in the log page, earlier logs can be paged back"),
+            parent=self.botLogGroup
+        )
+        self.botLogRotateSizeCard = RangeSettingCard(
+            configItem=cfg.BotLogRotateSize,
+            icon=FluentIcon.SAVE,
+            title=self.tr("Log file size (MB)"),
+            content=self.tr("Log files under log/<QQ> are rotated and compressed when they exceed this size"),
+            parent=self.botLogGroup
+        )
+        self.botLogArchiveCountCard = RangeSettingCard(
+            configItem=cfg.BotLogArchiveCount,
+            icon=FluentIcon.HISTORY,
+            title=self.tr("Log archives kept"),
+            content=self.tr("The number of rotated log files kept for each bot"),
+            parent=self.botLogGroup
+        )
+
+        # 创建组 - 机器人进程
+        self.botProcessGroup = SettingCardGroup(title=self.tr("Bot process"), parent=self.view)
+        self.botAutoRestartCard = SwitchSettingCard(
+            icon=FluentIcon.SYNC,
+            title=self.tr("Auto restart"),
+            content=self.tr("Restart a bot that exits unexpectedly or stops answering on its HTTP/WS port"),
+            configItem=cfg.BotAutoRestart,
+            parent=self.botProcessGroup
+        )
+        self.botStopTimeoutCard = RangeSettingCard(
+            configItem=cfg.BotStopTimeout,
+            icon=FluentIcon.STOP_WATCH,
+            title=self.tr("Stop timeout (s)"),
+            content=self.tr("How long to wait for a bot to exit when stopping before it is killed, 0 kills at once"),
+            parent=self.botProcessGroup
+        )
+
     def _setLayout(self) -> None:
         """
         控件布局
@@ -128,10 +171,19 @@ class SetupScrollArea(ScrollArea):
         self.pathGroup.addSettingCard(self.NapCatPathCard)
         self.pathGroup.addSettingCard(self.StartScriptPath)
 
+        self.botLogGroup.addSettingCard(self.botLogMaxLinesCard)
+        self.botLogGroup.addSettingCard(self.botLogRotateSizeCard)
+        self.botLogGroup.addSettingCard(self.botLogArchiveCountCard)
+
+        self.botProcessGroup.addSettingCard(self.botAutoRestartCard)
+        self.botProcessGroup.addSettingCard(self.botStopTimeoutCard)
+
         # 添加到布局
         self.expand_layout.addWidget(self.startGroup)
         self.expand_layout.addWidget(self.personalGroup)
         self.expand_layout.addWidget(self.pathGroup)
+        self.expand_layout.addWidget(self.botLogGroup)
+        self.expand_layout.addWidget(self.botProcessGroup)
         self.expand_layout.setContentsMargins(0, 0, 0, 0)
         self.view.setLayout(self.expand_layout)
 
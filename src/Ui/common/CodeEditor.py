@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from typing import TYPE_CHECKING
 
 from PySide6.QtCore import QRegularExpression, Slot
 from PySide6.QtCore import Qt, QRect, QRectF, QSize
@@ -7,11 +8,17 @@ from PySide6.QtGui import QPainter
 from PySide6.QtWidgets import QWidget
 from qfluentwidgets import PlainTextEdit
 
+from src.Core.BotLog import LogLevel
+
+if TYPE_CHECKING:
+    from src.Ui.common.LogEditor import LogEditor
+
 
 class CodeEditor(PlainTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.line_number_area = LineNumberArea(self)
+        self.lineNumberOffset = 0  # 第一行显示的行号偏移, 用于只显示部分内容的情况
 
         # 连接信号和槽函数
         self.blockCountChanged.connect(self.update_line_number_area_width)
@@ -30,12 +37,18 @@ class CodeEditor(PlainTextEdit):
         font.setPointSize(10)
         self.setFont(font)
 
+    def lineNumber(self, blockNumber: int) -> int:
+        """
+        返回第 blockNumber 块对应的行号(从 0 开始)
+        """
+        return self.lineNumberOffset + blockNumber
+
     def lineNumberAreaWidth(self) -> int:
         """
         计算行号区域的宽度
         """
         # 默认显示5位数空间
-        digits, max_num = 4, max(1, self.blockCount())
+        digits, max_num = 4, max(1, self.lineNumber(self.blockCount() - 1) + 1)
         while max_num >= 10000:
             # 当行数达到五位数时调整显示空间
             max_num *= 0.1
@@ -58,7 +71,7 @@ class CodeEditor(PlainTextEdit):
 
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
-                number = str(block_number + 1)
+                number = str(self.lineNumber(block_number) + 1)
                 painter.drawText(
                     QRectF(content_left, top, self.line_number_area.width() - 12, self.fontMetrics().height()),
                     Qt.AlignmentFlag.AlignRight, number
@@ -110,58 +123,46 @@ class LineNumberArea(QWidget):
 
 
 class LogHighlighter(QSyntaxHighlighter):
-    def __init__(self, parent=None) -> None:
-        super().__init__(parent)
+    """
+    ## NapCat 日志高亮器
+        - 不再对每个块运行正则, 直接从编辑器的 LogIndex 中读取该行的等级
+        - NapCat 日志的时间戳和等级标签位置固定, 只需要按等级设置格式
+    """
+
+    TIMESTAMP_LENGTH = 19  # "yyyy-MM-dd HH:mm:ss"
+    LEVEL_START = TIMESTAMP_LENGTH + 2  # 时间戳后的 " [" 之后
+
+    def __init__(self, editor: "LogEditor") -> None:
+        super().__init__(editor.document())
+        self.editor = editor
+
+        # 时间戳的文本格式
+        self.timestampFormat = QTextCharFormat()
+        self.timestampFormat.setForeground(QColor(Qt.GlobalColor.lightGray))
 
         # 初始化不同日志级别的文本格式
         self.formats = {
-            'DEBUG': QTextCharFormat(),
-            'INFO': QTextCharFormat(),
-            'WARN': QTextCharFormat(),
-            'ERROR': QTextCharFormat(),
+            LogLevel.DEBUG: QTextCharFormat(),
+            LogLevel.INFO: QTextCharFormat(),
+            LogLevel.WARN: QTextCharFormat(),
+            LogLevel.ERROR: QTextCharFormat(),
         }
 
         # 设置每个日志级别的前景色
-        self.formats['DEBUG'].setForeground(QColor(Qt.GlobalColor.darkRed))
-        self.formats['INFO'].setForeground(QColor(Qt.GlobalColor.green))
-        self.formats['WARN'].setForeground(QColor(Qt.GlobalColor.darkYellow))
-        self.formats['ERROR'].setForeground(QColor(Qt.GlobalColor.red))
-
-        # 定义日志级别的顺序
-        self.log_levels = ['DEBUG', 'INFO', 'WARN', 'ERROR']
-
-        # 正则表达式模式，用于匹配像 [DEBUG]、[INFO] 等日志级别标签
-        self.pattern = QRegularExpression(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \[(DEBUG|INFO|WARN|ERROR)\]')
+        self.formats[LogLevel.DEBUG].setForeground(QColor(Qt.GlobalColor.darkRed))
+        self.formats[LogLevel.INFO].setForeground(QColor(Qt.GlobalColor.green))
+        self.formats[LogLevel.WARN].setForeground(QColor(Qt.GlobalColor.darkYellow))
+        self.formats[LogLevel.ERROR].setForeground(QColor(Qt.GlobalColor.red))
 
     def highlightBlock(self, text) -> None:
-        # 创建一个格式化对象，用于应用整行的前景色
-        test_format = QTextCharFormat()
-
-        # 检查当前文本块是否匹配日志级别的模式
-        match = self.pattern.match(text)
-
-        # 如果没有匹配到，直接返回
-        if not match or not match.hasMatch():
+        # 根据块号查询索引中的日志等级, 无法识别的行不做处理
+        lineNumber = self.editor.lineNumber(self.currentBlock().blockNumber())
+        level = self.editor.logIndex.level(lineNumber)
+        if level == LogLevel.NONE:
             return
 
-        # 获取时间戳的起始位置和长度
-        timestamp_start = match.capturedStart(1)
-        timestamp_length = match.capturedLength(1)
-
-        # 获取日志级别的起始位置和长度
-        loglevel_start = match.capturedStart(2)
-        loglevel_length = match.capturedLength(2)
-
-        # 应用时间戳的格式
-        test_format.setForeground(QColor(Qt.GlobalColor.lightGray))
-        self.setFormat(timestamp_start, timestamp_length, test_format)
-
-        # 检查捕获的日志级别是否在预定义列表中
-        log_level = match.captured(2)
-        if log_level in self.log_levels:
-            # 设置对应日志级别的格式
-            test_format.setForeground(self.formats[log_level].foreground().color())
-            self.setFormat(loglevel_start, loglevel_length, test_format)
+        self.setFormat(0, self.TIMESTAMP_LENGTH, self.timestampFormat)
+        self.setFormat(self.LEVEL_START, len(level.name), self.formats[level])
 
 
 class NCDLogHighlighter(QSyntaxHighlighter):
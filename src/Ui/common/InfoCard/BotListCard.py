@@ -1,9 +1,8 @@
 # -*- coding: utf-8 -*-
-from typing import Optional, List
+from typing import Dict, Optional
 
-from PySide6.QtCore import Qt, QTimer, QUrl, QUrlQuery, Slot
+from PySide6.QtCore import Qt, QTimer, Slot
 from PySide6.QtGui import QPixmap
-from PySide6.QtNetwork import QNetworkRequest, QNetworkReply
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame
 from creart import it
 from qfluentwidgets import (
@@ -11,10 +10,9 @@ from qfluentwidgets import (
 )
 from qfluentwidgets.common.animation import BackgroundAnimationWidget
 
-from src.Core import timer
+from src.Core.Avatar import AvatarCache
+from src.Core.BotState import BotState, BotStateRegistry
 from src.Core.Config.ConfigModel import Config
-from src.Core.NetworkFunc import Urls, NetworkFunc
-from src.Ui.BotListPage import BotListWidget
 from src.Ui.StyleSheet import StyleSheet
 
 
@@ -39,9 +37,15 @@ class BotListCard(HeaderCardWidget):
         self.botList.hide()
         self.toAddBot.clicked.connect(self._toAddBotSlot)
 
+        # 机器人的增删由状态表通知, 不再定时刷新列表
+        it(BotStateRegistry).botAdded.connect(self._botAddedSlot)
+        it(BotStateRegistry).botRemoved.connect(self._botRemovedSlot)
+
         # 调用方法
         self._setLayout()
-        self.monitorBots()
+        for QQID in it(BotStateRegistry).bots:
+            self.botList.addBot(QQID)
+        self._updateHint()
 
     @staticmethod
     @Slot()
@@ -52,22 +56,30 @@ class BotListCard(HeaderCardWidget):
         from src.Ui.MainWindow.Window import MainWindow
         it(MainWindow).add_widget_button.click()
 
-    @timer(2000)
-    def monitorBots(self) -> None:
+    @Slot(str)
+    def _botAddedSlot(self, QQID: str) -> None:
         """
-        ## 监控机器人列表
+        ## 新增机器人
         """
-        if not it(BotListWidget).botList.botCardList:
-            # 如果为空则代表没有机器人, 显示提示
-            self.botList.hide()
-            self.noBotLabel.show()
-            self.toAddBot.show()
-        else:
-            # 不为空则刷新一次列表检查是否有变化
-            self.botList.show()
-            self.noBotLabel.hide()
-            self.toAddBot.hide()
-            self.botList.updateList()
+        self.botList.addBot(QQID)
+        self._updateHint()
+
+    @Slot(str)
+    def _botRemovedSlot(self, QQID: str) -> None:
+        """
+        ## 删除机器人
+        """
+        self.botList.removeBot(QQID)
+        self._updateHint()
+
+    def _updateHint(self) -> None:
+        """
+        ## 没有机器人时显示提示
+        """
+        hasBot = bool(self.botList.botCards)
+        self.botList.setVisible(hasBot)
+        self.noBotLabel.setHidden(hasBot)
+        self.toAddBot.setHidden(hasBot)
 
     def _setLayout(self) -> None:
         """
@@ -96,7 +108,7 @@ class BotList(ScrollArea):
         """
         super().__init__(parent=parent)
         # 创建属性
-        self.botCardList: List[BotCard] = []
+        self.botCards: Dict[str, BotCard] = {}  # 以 QQID 为键
 
         # 调用方法
         self._createView()
@@ -124,42 +136,25 @@ class BotList(ScrollArea):
         self.setWidgetResizable(True)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
 
-    def updateList(self) -> None:
+    def addBot(self, QQID: str) -> None:
         """
-        ## 刷新机器人列表
+        ## 添加机器人对应的 card
         """
-        if not self.botCardList:
-            # 如果是首次运行,直接添加到 botCardList
-            for bot_config in it(BotListWidget).botList.botList:
-                card = BotCard(bot_config, self)
-                self.cardLayout.addWidget(card, 0, Qt.AlignmentFlag.AlignTop)
-                self.botCardList.append(card)
-
-        QQList = [card.config.bot.QQID for card in self.botCardList]
-        for bot_config in it(BotListWidget).botList.botList:
-            # 遍历并判断是否有新增的 bot
-            if bot_config.bot.QQID in QQList:
-                # 如果属于则直接跳过
-                continue
-
-            # 不属于则就属于新增, 创建 card 并 添加到布局
-            card = BotCard(bot_config)
-            self.cardLayout.addWidget(card, 0, Qt.AlignmentFlag.AlignTop)
-            self.botCardList.append(card)
-
-        for card in self.botCardList:
-            # 遍历并判断是否有减少的 bot
-            if card.config in it(BotListWidget).botList.botList:
-                # 属于则就是没有被删除, 跳过
-                continue
-
-            # 移除出布局并删除
-            self.botCardList.remove(card)
-            self.cardLayout.removeWidget(card)
-            card.deleteLater()
-
-        # 刷新一次布局
-        self.cardLayout.update()
+        status = it(BotStateRegistry).get(QQID)
+        if QQID in self.botCards or status.config is None:
+            return
+        card = BotCard(status.config, self.view)
+        self.cardLayout.addWidget(card, 0, Qt.AlignmentFlag.AlignTop)
+        self.botCards[QQID] = card
+
+    def removeBot(self, QQID: str) -> None:
+        """
+        ## 移除机器人对应的 card
+        """
+        if (card := self.botCards.pop(QQID, None)) is None:
+            return
+        self.cardLayout.removeWidget(card)
+        card.deleteLater()
 
 
 class BotCard(BackgroundAnimationWidget, QFrame):
@@ -190,26 +185,20 @@ class BotCard(BackgroundAnimationWidget, QFrame):
         # 调用方法
         self._QQAvatar()
         self._setLayout()
-        self.monitorBots()
 
-    @timer(2000)
-    def monitorBots(self) -> None:
+        # 只订阅自己对应的机器人的状态
+        self.status = it(BotStateRegistry).get(self.config.bot.QQID)
+        self.status.stateChanged.connect(self._stateChangedSlot)
+        self._stateChangedSlot(self.status.state)
+
+    @Slot(int)
+    def _stateChangedSlot(self, state: int) -> None:
         """
-        ## 监控机器人列表
+        ## 根据运行状态切换按钮
         """
-        from src.Ui.BotListPage.BotListWidget import BotListWidget
-        for card in it(BotListWidget).botList.botCardList:
-            if self.config.bot.QQID != card.config.bot.QQID:
-                continue
-            else:
-                if card.botWidget is None:
-                    return
-                if card.botWidget.isRun:
-                    self.runButton.hide()
-                    self.stopButton.show()
-                else:
-                    self.runButton.show()
-                    self.stopButton.hide()
+        self.runButton.setHidden(self.status.isRun)
+        self.stopButton.setVisible(self.status.isRun)
+        self.stopButton.setEnabled(state != BotState.STOPPING)
 
     @Slot()
     def _runButtonSlot(self) -> None:
@@ -218,14 +207,11 @@ class BotCard(BackgroundAnimationWidget, QFrame):
         """
         from src.Ui.MainWindow import MainWindow
         from src.Ui.BotListPage.BotListWidget import BotListWidget
-        for card in it(BotListWidget).botList.botCardList:
-            if self.config.bot.QQID == card.config.bot.QQID:
-                it(MainWindow).bot_list_widget_button.click()
-                card.clicked.emit()
-                card.botWidget.runButton.click()
-                break
-        self.runButton.hide()
-        self.stopButton.show()
+        if (card := it(BotListWidget).botList.botCards.get(self.config.bot.QQID)) is None:
+            return
+        it(MainWindow).bot_list_widget_button.click()
+        card.clicked.emit()
+        card.botWidget.runButton.click()
 
     @Slot()
     def _stopButtonSlot(self) -> None:
@@ -233,11 +219,9 @@ class BotCard(BackgroundAnimationWidget, QFrame):
         ## 停止按钮
         """
         from src.Ui.BotListPage.BotListWidget import BotListWidget
-        for card in it(BotListWidget).botList.botCardList:
-            if self.config.bot.QQID == card.config.bot.QQID:
-                card.botWidget.stopButton.click()
-            self.runButton.show()
-            self.stopButton.hide()
+        card = it(BotListWidget).botList.botCards.get(self.config.bot.QQID)
+        if card is not None and card.botWidget is not None:
+            card.botWidget.stopButton.click()
 
     def _QQAvatar(self) -> None:
         """
@@ -246,26 +230,17 @@ class BotCard(BackgroundAnimationWidget, QFrame):
         self.QQAvatarLabel.scaledToHeight(28)
         self.QQAvatarLabel.setBorderRadius(5, 5, 5, 5)
 
-        # 处理 QQ头像 的 Url
-        avatar_url: QUrl = Urls.QQ_AVATAR.value
-        query = QUrlQuery()
-        query.addQueryItem("spec", "640")
-        query.addQueryItem("dst_uin", self.config.bot.QQID)
-        avatar_url.setQuery(query)
-
-        # 创建请求并链接槽函数
-        request = QNetworkRequest(avatar_url)
-        replay = it(NetworkFunc).manager.get(request)
-        replay.finished.connect(lambda: self._setAvatar(replay))
+        # 头像由 AvatarCache 统一获取, 与机器人列表页共用同一份缓存和请求
+        avatar = it(AvatarCache).avatar(self.config.bot.QQID, 28, self, self._setAvatar)
+        if avatar is not None:
+            self._setAvatar(avatar)
 
-    def _setAvatar(self, replay: QNetworkReply) -> None:
+    def _setAvatar(self, avatar: Optional[QPixmap], error: str = "") -> None:
         """
         ## 设置头像
         """
-        if replay.error() == QNetworkReply.NetworkError.NoError:
-            # 如果请求成功则设置反之显示错误提示
-            avatar = QPixmap()
-            avatar.loadFromData(replay.readAll())
+        if avatar is not None:
+            # 如果获取成功则设置反之显示错误提示
             self.QQAvatarLabel.setImage(avatar)
             self.QQAvatarLabel.scaledToHeight(28)
             self.QQAvatarLabel.setBorderRadius(5, 5, 5, 5)
@@ -273,7 +248,7 @@ class BotCard(BackgroundAnimationWidget, QFrame):
             from src.Ui.HomePage import HomeWidget
             it(HomeWidget).showError(
                 title=self.tr("Failed to get the QQ avatar"),
-                content=replay.errorString()
+                content=error
             )
 
     def _setLayout(self) -> None:
@@ -74,11 +74,13 @@ class NapCatVersionCard(VersionCardBase):
     def __init__(self, parent=None) -> None:
         super().__init__(NCIcon.LOGO, "NapCat Version", "Unknown Version", parent)
         self._timeout = False  # 计时器启动标记
+        self._isChecked = False  # 延时结束并完成第一次检查的标记
         self.updateSate = False  # 是否有更新标记
         self.isInstall = False  # 检查是否有安装 NapCat 的标记, False 表示没有安装
-        # 启动时触发一次检查更新
+        # 启动时触发一次检查更新, 之后在版本发生变化时更新
         self.getLocalVersion()
         self._onTimer()
+        it(GetVersion).versionChanged.connect(self._versionChangedSlot)
 
     @timer(10000, True)
     def _onTimer(self):
@@ -88,9 +90,18 @@ class NapCatVersionCard(VersionCardBase):
         if not self._timeout:
             self._timeout = True
             return
+        self._isChecked = True
         self.checkUpdates()
 
-    @timer(3000)
+    def _versionChangedSlot(self) -> None:
+        """
+        ## 本地或远程版本发生变化
+        """
+        self.getLocalVersion()
+        if self._isChecked:
+            # 延时结束前不检查更新, 避免网络请求还没有完成就显示错误
+            self.checkUpdates()
+
     def checkUpdates(self) -> None:
         """
         ## 检查更新逻辑
@@ -115,7 +126,6 @@ class NapCatVersionCard(VersionCardBase):
             self.updateSate = True
             return
 
-    @timer(3000)
     def getLocalVersion(self) -> None:
         """
         ## 获取本地版本
@@ -162,8 +172,14 @@ class QQVersionCard(VersionCardBase):
     def __init__(self, parent=None) -> None:
         super().__init__(NCIcon.QQ, "QQ Version", "Unknown Version", parent)
         self.contentsLabel.setText(self.getLocalVersion())
+        it(GetVersion).versionChanged.connect(self._versionChangedSlot)
+
+    def _versionChangedSlot(self) -> None:
+        """
+        ## 本地版本发生变化
+        """
+        self.contentsLabel.setText(self.getLocalVersion())
 
-    @timer(3000)
     def getLocalVersion(self) -> str:
         """
         ## 获取本地版本
@@ -174,6 +190,9 @@ class QQVersionCard(VersionCardBase):
             # 如果没有获取到文件就会返回None, 也就代表QQ没有安装
             self.setToolTip(self.tr("No QQ path found, please install it"))
             self.errorBadge.show()
+        else:
+            self.setToolTip("")
+            self.errorBadge.hide()
 
         return version if version else "Unknown version"
 
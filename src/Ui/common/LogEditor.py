@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left, bisect_right
+from typing import List, Optional
+
+from PySide6.QtCore import Signal, Slot
+from PySide6.QtGui import QTextCursor, QColor, QTextFormat
+from PySide6.QtWidgets import QTextEdit
+
+from src.Core.BotLog import (
+    LogRingBuffer, LogHistory, LogWriter, LogIndex, LogLevel, LogRecord, LogSearchIndex, tokenize
+)
+from src.Core.Config import cfg
+from src.Ui.common.CodeEditor import CodeEditor
+
+
+class LogEditor(CodeEditor):
+    """
+    ## 带行数上限的日志查看器
+        - 文档中最多保留 maxLines 行, 超出后按块批量淘汰最旧的行
+        - 最近的日志保存在环形缓冲区中, 完整的历史保存在磁盘上, 可以按页回看
+        - 每行的结构化记录保存在 LogIndex 中, 按等级/时间过滤和跳转都只查询索引
+        - 全文搜索查询 LogSearchIndex, 结果只对可见的行使用 extraSelections 高亮, 不会重新排版文档
+    """
+
+    viewChanged = Signal()  # 实时/历史模式或页码发生变化时发送
+    searchChanged = Signal()  # 搜索结果或当前结果发生变化时发送
+    lineNumberMap: Optional[List[int]] = None  # 父类初始化时就会计算行号, 这里先给出默认值
+
+    def __init__(self, parent=None, maxLines: Optional[int] = None) -> None:
+        super().__init__(parent)
+        # 创建属性
+        self.maxLines: int = maxLines if maxLines else cfg.get(cfg.BotLogMaxLines)
+        self.pageSize = 1000  # 历史模式下每页的行数
+        self.ringBuffer = LogRingBuffer(self.maxLines)
+        self.history: Optional[LogHistory] = None
+        self.isLive = True  # 是否处于实时模式
+        self.pageStart = 0  # 历史模式下当前页的起始行号
+        self._shownLines = 0  # 文档中当前显示的行数
+        self.logIndex = LogIndex()
+
+        # 过滤条件, 过滤时文档中的行不再连续, 用 lineNumberMap 记录每个块对应的绝对行号
+        self.filterLevel = LogLevel.NONE
+        self.filterStartTime: Optional[float] = None
+        self.filterEndTime: Optional[float] = None
+
+        # 全文搜索
+        self.searchIndex = LogSearchIndex()
+        self.searchTokens: frozenset = frozenset()
+        self.searchResults: List[int] = []  # 匹配的绝对行号, 升序
+        self.searchPosition = -1  # 当前结果在 searchResults 中的位置
+        self.matchColor = QColor(255, 196, 0, 110)
+        self.currentResultColor = QColor(0, 120, 215, 60)
+
+        # 关闭撤销栈, 否则被淘汰的文本会一直留在撤销记录中
+        self.document().setUndoRedoEnabled(False)
+        cfg.BotLogMaxLines.valueChanged.connect(self.setMaxLines)
+        self.verticalScrollBar().valueChanged.connect(self._updateSearchSelections)
+
+    @property
+    def evictChunk(self) -> int:
+        """
+        ## 一次淘汰的最少行数, 避免每追加一行就修改一次文档开头
+        """
+        return max(self.maxLines // 10, 100)
+
+    @property
+    def isFiltered(self) -> bool:
+        """
+        ## 是否设置了过滤条件
+        """
+        return (
+                self.filterLevel != LogLevel.NONE
+                or self.filterStartTime is not None
+                or self.filterEndTime is not None
+        )
+
+    def lineNumber(self, blockNumber: int) -> int:
+        """
+        ## 返回文档中第 blockNumber 块对应的绝对行号
+        """
+        if self.lineNumberMap is None:
+            return super().lineNumber(blockNumber)
+        if blockNumber < len(self.lineNumberMap):
+            return self.lineNumberMap[blockNumber]
+        return self.lineNumberMap[-1] + 1 if self.lineNumberMap else 0
+
+    def currentLineNumber(self) -> int:
+        """
+        ## 返回光标所在行的绝对行号
+        """
+        return self.lineNumber(self.textCursor().blockNumber())
+
+    def startSession(self, writer: LogWriter) -> None:
+        """
+        ## 开始新的日志会话
+            - writer 日志文件写入器, 完整的历史写入该写入器管理的文件
+        """
+        if self.history:
+            self.history.close()
+        self.history = LogHistory(writer)
+        self.ringBuffer.clear()
+        self.logIndex.clear()
+        self.searchIndex.clear()
+        self.searchResults = []
+        self.searchPosition = -1
+        self.searchChanged.emit()
+        self._showLines([], 0)
+        self.isLive = True
+        self.viewChanged.emit()
+
+    def appendLines(self, lines: List[str], records: List[LogRecord]) -> None:
+        """
+        ## 追加多行日志
+            - records 与 lines 一一对应的结构化记录
+        """
+        if not lines:
+            return
+
+        firstLineNumber = self.ringBuffer.totalLines
+        # 索引必须先于文档更新, 高亮器会在插入文本时读取索引
+        self.logIndex.append(records)
+        self.searchIndex.append(record.tokens for record in records)
+        self.ringBuffer.append(lines)
+        if self.history:
+            self.history.append(lines)
+        self._trimIndexes()
+
+        if self.searchTokens:
+            # 新到达的行直接与查询比较, 不需要重新查询索引
+            matched = [
+                firstLineNumber + index for index, record in enumerate(records)
+                if LogSearchIndex.matches(record.tokens, self.searchTokens)
+            ]
+            if matched:
+                self.searchResults.extend(matched)
+                self.searchChanged.emit()
+
+        if not self.isLive:
+            # 历史模式下只记录, 不改动当前显示的页面
+            return
+
+        if self.lineNumberMap is not None:
+            # 过滤模式下只插入符合条件的行
+            matched = [
+                index for index, record in enumerate(records) if self._matchFilter(record)
+            ]
+            if not matched:
+                return
+            lines = [lines[index] for index in matched]
+            self.lineNumberMap.extend(firstLineNumber + index for index in matched)
+
+        # 记录插入前是否停留在底部, 只有在底部时才自动滚动
+        scrollBar = self.verticalScrollBar()
+        atBottom = scrollBar.value() >= scrollBar.maximum() - 4
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        text = "\n".join(lines)
+        cursor.insertText(f"\n{text}" if self._shownLines else text)
+        self._shownLines += len(lines)
+        self._evict()
+
+        if atBottom:
+            scrollBar.setValue(scrollBar.maximum())
+        if self.searchTokens:
+            self._updateSearchSelections()
+
+    def _evict(self) -> None:
+        """
+        ## 批量淘汰超出上限的旧行
+        """
+        overflow = self._shownLines - self.maxLines
+        if overflow < self.evictChunk:
+            return
+
+        # 直接定位到第 overflow 块, 逐块移动光标在大文档中非常慢
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(self.document().findBlockByNumber(overflow).position(), QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self._shownLines -= overflow
+        if self.lineNumberMap is not None:
+            del self.lineNumberMap[:overflow]
+        self._setLineNumberOffset(self.lineNumberOffset + overflow)
+
+    def _trimIndexes(self) -> None:
+        """
+        ## 丢弃已经无法显示的行的索引
+            - 有历史文件时为已被删除的历史文件中的行, 没有时为环形缓冲区之外的行
+            - 环形缓冲区中的行始终保留; 按块批量丢弃, 避免每次追加都移动数组
+        """
+        firstLineNumber = self.ringBuffer.firstLineNumber
+        if self.history is not None:
+            firstLineNumber = min(firstLineNumber, self.history.firstLineNumber)
+        if firstLineNumber - self.logIndex.firstLineNumber < self.evictChunk:
+            return
+
+        self.logIndex.trim(firstLineNumber)
+        self.searchIndex.trim(firstLineNumber)
+        if self.searchResults and self.searchResults[0] < firstLineNumber:
+            count = bisect_left(self.searchResults, firstLineNumber)
+            del self.searchResults[:count]
+            self.searchPosition = self.searchPosition - count if self.searchPosition >= count else -1
+            self.searchChanged.emit()
+
+    def pageBack(self) -> None:
+        """
+        ## 向前翻一页历史日志
+        """
+        if self.history is None or self.lineNumberOffset <= self.history.firstLineNumber or self.isFiltered:
+            return
+        self._showPage(max(self.history.firstLineNumber, self.lineNumberOffset - self.pageSize))
+
+    def pageForward(self) -> None:
+        """
+        ## 向后翻一页历史日志, 翻到环形缓冲区范围内时回到实时模式
+        """
+        if self.isLive or self.isFiltered:
+            return
+        start = self.pageStart + self.pageSize
+        if start >= self.ringBuffer.firstLineNumber:
+            self.returnToLive()
+            return
+        self._showPage(start)
+
+    def showLine(self, lineNumber: int) -> None:
+        """
+        ## 显示指定的绝对行号, 必要时切换到包含该行的历史页
+        """
+        if self.lineNumberMap is not None:
+            index = bisect_left(self.lineNumberMap, lineNumber)
+            if index < len(self.lineNumberMap) and self.lineNumberMap[index] == lineNumber:
+                self._moveToBlock(index)
+                return
+            # 该行不在过滤结果中, 清除过滤条件后再显示
+            self.setFilter(LogLevel.NONE, None, None)
+
+        if not self.lineNumberOffset <= lineNumber < self.lineNumberOffset + self._shownLines:
+            if lineNumber >= self.ringBuffer.firstLineNumber or self.history is None:
+                # 没有日志文件时已离开环形缓冲区的行无法读取, 改为显示缓冲区中的第一行
+                lineNumber = max(lineNumber, self.ringBuffer.firstLineNumber)
+                self.returnToLive()
+            else:
+                lineNumber = max(lineNumber, self.history.firstLineNumber)
+                self._showPage(max(self.history.firstLineNumber, lineNumber - self.pageSize // 2))
+
+        self._moveToBlock(lineNumber - self.lineNumberOffset)
+
+    def search(self, query: str) -> int:
+        """
+        ## 全文搜索, 返回结果数量
+            - 查询中的全部词元都出现的行才算匹配, 不区分大小写
+        """
+        self.searchTokens = tokenize(query)
+        self.searchResults = self.searchIndex.search(query) if self.searchTokens else []
+        self.searchPosition = -1
+        self._updateSearchSelections()
+        self.searchChanged.emit()
+        return len(self.searchResults)
+
+    def showSearchResult(self, backward: bool = False) -> bool:
+        """
+        ## 跳转到光标之后(或之前)的下一个搜索结果, 到达末尾后从头开始
+            - 返回是否有结果
+        """
+        if not self.searchResults:
+            return False
+
+        current = self.currentLineNumber()
+        if 0 <= self.searchPosition < len(self.searchResults) and self.searchResults[self.searchPosition] == current:
+            # 光标仍停留在当前结果上, 直接移动到相邻的结果
+            position = self.searchPosition + (-1 if backward else 1)
+        elif backward:
+            position = bisect_left(self.searchResults, current) - 1
+        else:
+            position = bisect_right(self.searchResults, current)
+
+        self.searchPosition = position % len(self.searchResults)
+        self.showLine(self.searchResults[self.searchPosition])
+        self._updateSearchSelections()
+        self.searchChanged.emit()
+        return True
+
+    def showNextLevel(self, level: LogLevel, backward: bool = False) -> bool:
+        """
+        ## 跳转到光标之后(或之前)的下一条指定等级的日志
+            - 返回是否找到
+        """
+        current = self.currentLineNumber()
+        if backward:
+            lineNumber = self.logIndex.previousLine(level, current)
+        else:
+            lineNumber = self.logIndex.nextLine(level, current)
+        if lineNumber is None:
+            return False
+        self.showLine(lineNumber)
+        return True
+
+    def setFilter(self, level: LogLevel, startTime: Optional[float], endTime: Optional[float]) -> None:
+        """
+        ## 设置过滤条件并回到实时模式
+            - level 最低显示等级, LogLevel.NONE 为不过滤
+            - startTime / endTime 时间范围, None 为不限制
+        """
+        self.filterLevel = level
+        self.filterStartTime = startTime
+        self.filterEndTime = endTime
+        self.returnToLive()
+
+    def _matchFilter(self, record: LogRecord) -> bool:
+        """
+        ## 判断一条记录是否符合过滤条件
+        """
+        if record.level < self.filterLevel:
+            return False
+        if self.filterStartTime is not None and record.timestamp < self.filterStartTime:
+            return False
+        if self.filterEndTime is not None and record.timestamp >= self.filterEndTime:
+            return False
+        return True
+
+    def _blockNumber(self, lineNumber: int) -> Optional[int]:
+        """
+        ## 返回绝对行号在文档中对应的块号, 不在文档中返回 None
+        """
+        if self.lineNumberMap is not None:
+            index = bisect_left(self.lineNumberMap, lineNumber)
+            found = index < len(self.lineNumberMap) and self.lineNumberMap[index] == lineNumber
+            return index if found else None
+        blockNumber = lineNumber - self.lineNumberOffset
+        return blockNumber if 0 <= blockNumber < self._shownLines else None
+
+    @Slot()
+    def _updateSearchSelections(self) -> None:
+        """
+        ## 只为视口中可见的搜索结果设置 extraSelections
+        """
+        if not self.searchTokens or not self.searchResults:
+            if self.extraSelections():
+                self.setExtraSelections([])
+            return
+
+        # 计算视口中可见的行号范围
+        firstBlock = self.firstVisibleBlock().blockNumber()
+        visibleCount = self.viewport().height() // max(1, self.fontMetrics().height()) + 2
+        lastBlock = min(firstBlock + visibleCount, self.blockCount() - 1)
+        first, last = self.lineNumber(firstBlock), self.lineNumber(lastBlock)
+
+        current = self.searchResults[self.searchPosition] if self.searchPosition >= 0 else None
+        selections = []
+        for lineNumber in self.searchResults[bisect_left(self.searchResults, first):bisect_right(self.searchResults, last)]:
+            if (blockNumber := self._blockNumber(lineNumber)) is None:
+                continue
+            block = self.document().findBlockByNumber(blockNumber)
+
+            if lineNumber == current:
+                # 当前结果整行高亮
+                selection = QTextEdit.ExtraSelection()
+                selection.format.setBackground(self.currentResultColor)
+                selection.format.setProperty(QTextFormat.Property.FullWidthSelection, True)
+                selection.cursor = QTextCursor(block)
+                selections.append(selection)
+
+            # 高亮行内匹配的词元
+            text = block.text().lower()
+            for token in self.searchTokens:
+                start = text.find(token)
+                while start != -1:
+                    selection = QTextEdit.ExtraSelection()
+                    selection.format.setBackground(self.matchColor)
+                    selection.cursor = QTextCursor(block)
+                    selection.cursor.setPosition(block.position() + start)
+                    selection.cursor.setPosition(block.position() + start + len(token), QTextCursor.MoveMode.KeepAnchor)
+                    selections.append(selection)
+                    start = text.find(token, start + len(token))
+        self.setExtraSelections(selections)
+
+    def _moveToBlock(self, blockNumber: int) -> None:
+        """
+        ## 把光标移动到指定块并居中显示
+        """
+        block = self.document().findBlockByNumber(blockNumber)
+        if block.isValid():
+            self.setTextCursor(QTextCursor(block))
+            self.centerCursor()
+
+    @Slot()
+    def returnToLive(self) -> None:
+        """
+        ## 回到实时模式, 显示环形缓冲区中的内容
+        """
+        self.isLive = True
+        if self.isFiltered:
+            # 只从索引中查询, 不扫描文档; 最多显示最近的 maxLines 条结果
+            lineNumbers = self.logIndex.filter(self.filterLevel, self.filterStartTime, self.filterEndTime)
+            if self.history is not None:
+                # 跳过已被删除的历史文件中的行, 保证读取到的行与行号一一对应
+                lineNumbers = lineNumbers[bisect_left(lineNumbers, self.history.firstLineNumber):]
+            lineNumbers = list(lineNumbers[-self.maxLines:])
+            lines = self.history.readLinesAt(lineNumbers) if self.history else []
+            self._showLines(lines, 0, lineNumbers[:len(lines)])
+        else:
+            self._showLines(self.ringBuffer.lines(), self.ringBuffer.firstLineNumber)
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        self.viewChanged.emit()
+
+    @Slot(int)
+    def setMaxLines(self, maxLines: int) -> None:
+        """
+        ## 调整行数上限
+        """
+        self.maxLines = maxLines
+        self.ringBuffer.setMaxLines(maxLines)
+        if self.isLive:
+            self._evict()
+
+    def _showPage(self, start: int) -> None:
+        """
+        ## 切换到历史模式并显示从 start 开始的一页
+        """
+        self.isLive = False
+        self.pageStart = start
+        self._showLines(self.history.readLines(start, self.pageSize), start)
+        self.viewChanged.emit()
+
+    def _showLines(self, lines: List[str], firstLineNumber: int, lineNumberMap: Optional[List[int]] = None) -> None:
+        """
+        ## 用给定的行替换文档内容
+            - lineNumberMap 每行对应的绝对行号, 为 None 表示从 firstLineNumber 开始连续
+        """
+        # 先设置行号, 高亮器在 setPlainText 时就会按行号查询索引
+        self.lineNumberMap = lineNumberMap
+        self.lineNumberOffset = firstLineNumber
+        self.setPlainText("\n".join(lines))
+        self._shownLines = len(lines)
+        self._setLineNumberOffset(firstLineNumber)
+        self._updateSearchSelections()
+
+    def _setLineNumberOffset(self, offset: int) -> None:
+        """
+        ## 设置行号偏移并刷新行号区域
+        """
+        self.lineNumberOffset = offset
+        self.update_line_number_area_width(0)
+        self.line_number_area.update()
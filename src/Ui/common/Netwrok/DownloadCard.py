@@ -1,7 +1,4 @@
 # -*- coding: utf-8 -*-
-import shutil
-import zipfile
-
 from loguru import logger
 from pathlib import Path
 from creart import it
@@ -18,6 +15,7 @@ from qfluentwidgets import (
 from src.Core import timer
 from src.Core.NetworkFunc import Urls, Downloader
 from src.Core.GetVersion import GetVersion
+from src.Core.Installer import ZipInstaller
 from src.Core.PathFunc import PathFunc
 from src.Core.Config import cfg
 from src.Ui.common.Netwrok.DownloadButton import ProgressBarButton
@@ -136,6 +134,7 @@ class NapCatDownloadCard(DownloadCardBase):
         """
         super().__init__(parent=parent)
         self._timeout = False  # 计时器启动标记
+        self._isChecked = False  # 延时结束并完成第一次更新的标记
         self.zipFilePath: Optional[Path] = None
         self.isInstall = False
         self.ncInstallPath = it(PathFunc).getNapCatPath()
@@ -176,6 +175,7 @@ class NapCatDownloadCard(DownloadCardBase):
         self.checkInstall()
         self._setLayout()
         self._onTimer()
+        it(GetVersion).versionChanged.connect(self._versionChangedSlot)
 
     @timer(10000, True)
     def _onTimer(self):
@@ -185,16 +185,25 @@ class NapCatDownloadCard(DownloadCardBase):
         if not self._timeout:
             self._timeout = True
             return
+        self._isChecked = True
         self.updateVersion()
 
-    @timer(65000)
+    @Slot()
+    def _versionChangedSlot(self) -> None:
+        """
+        ## 本地或远程版本发生变化
+        """
+        self.checkInstall()
+        if self._isChecked:
+            self.updateVersion()
+
     def updateVersion(self):
         """
         ## 更新显示版本和下载器所下载的版本url
         """
-        self.versionWidget.setValue(it(GetVersion).napcatRemoteVersion)
+        if (version := it(GetVersion).napcatRemoteVersion) is not None:
+            self.versionWidget.setValue(version)
 
-    @timer(3000)
     def checkInstall(self) -> None:
         """
         ## 检查是否安装
@@ -235,7 +244,8 @@ class NapCatDownloadCard(DownloadCardBase):
             self.installButton.setTestVisible(True)
             self.isRun = False
         else:
-            # 反之则开始下载等操作
+            # 反之则开始下载等操作, 有公布的 SHA-256 时校验, 避免解压损坏的文件
+            self.downloader.expectedSha256 = it(GetVersion).napcatAssetDigests.get(self.downloader.url.fileName())
             self.downloader.start()
             self.zipFilePath = it(PathFunc).tmp_path / self.downloader.url.fileName()
             self.installButton.setProgressBarState(False)
@@ -250,8 +260,10 @@ class NapCatDownloadCard(DownloadCardBase):
         """
         if value:
             self.isRun = False
-            self.installButton.setProgressBarState(True)
+            self.installButton.setProgressBarState(False)
+            self.installButton.setValue(0)
             self.installWorker = NapCatInstallWorker(self.ncInstallPath, self.zipFilePath)
+            self.installWorker.progress.connect(self.installButton.setValue)
             self.installWorker.finished.connect(self._installationFinished)
             self.installWorker.start()
 
@@ -265,6 +277,8 @@ class NapCatDownloadCard(DownloadCardBase):
             self.installButton.setProgressBarState(False)
             self.installButton.hide()
             self.openInstallPathButton.show()
+            # 立即读取新安装的版本, 不需要等待文件监听
+            it(GetVersion).checkLocalVersions()
 
     @Slot()
     def _shareButtonSlot(self) -> None:
@@ -286,71 +300,36 @@ class NapCatDownloadCard(DownloadCardBase):
 
 
 class NapCatInstallWorker(QThread):
+    """
+    ## 在后台线程中把 NapCat 的压缩包直接解压到安装目录, 保留 config
+        - 更新时只写入发生变化的文件, 见 ZipInstaller
+    """
     finished = Signal(bool)
+    progress = Signal(int)  # 安装进度(百分比)
 
     def __init__(self, ncInstallPath, zipFilePath, parent=None):
         super().__init__(parent)
         self.ncInstallPath = ncInstallPath
         self.zipFilePath = zipFilePath
+        self._progress = -1
 
     def run(self) -> None:
         try:
-            self._rmOldFile()
-            self._unzipFile()
+            ZipInstaller(self.zipFilePath, self.ncInstallPath, progress=self._progressCallback).install()
+            # 删除下载文件
+            self.zipFilePath.unlink()
             self.finished.emit(True)
         except Exception as e:
             logger.error(e)
             self.finished.emit(False)
 
-    def _rmOldFile(self) -> None:
-        """
-        ## 移除老文件(如果有)
-        """
-        if not self.ncInstallPath.exists():
-            # 检查路径是否存在, 不存在则创建
-            self.ncInstallPath.mkdir(parents=True, exist_ok=True)
-
-        # 遍历目录中的所有项
-        for item in self.ncInstallPath.iterdir():
-            # 如果是config目录，则跳过
-            if item.is_dir() and item.name == 'config':
-                continue
-            # 如果是文件或其他目录，则删除
-            shutil.rmtree(item) if item.is_dir() else item.unlink()
-
-    def _unzipFile(self) -> None:
+    def _progressCallback(self, done: int, total: int) -> None:
         """
-        ## 解压到临时目录并移动到安装目录
+        ## 每个文件解压完成后调用, 只在百分比变化时发送信号
         """
-        # 解压缩文件到临时目录
-        with zipfile.ZipFile(str(self.zipFilePath), 'r') as zip_ref:
-            zip_ref.extractall(str(it(PathFunc).tmp_path))
-
-        # 记录没有被移动的文件和文件夹
-        skipped_items = []
-
-        # 获取临时目录中所有文件和文件夹
-        for item in (self.zipFilePath.parent / self.zipFilePath.stem).iterdir():
-            target_path = self.ncInstallPath / item.name
-
-            if target_path.exists():
-                # 跳过同名文件或文件夹
-                skipped_items.append(item)
-                continue
-
-            # 移动文件或文件夹
-            shutil.move(str(item), str(self.ncInstallPath))
-
-        # 删除未移动的文件和文件夹
-        for item in skipped_items:
-            if item.is_dir():
-                shutil.rmtree(item)
-            else:
-                item.unlink()
-
-        # 删除下载文件和解压出来的文件夹
-        shutil.rmtree(self.zipFilePath.parent / self.zipFilePath.stem)
-        self.zipFilePath.unlink()
+        if (progress := int(done / total * 100)) != self._progress:
+            self._progress = progress
+            self.progress.emit(progress)
 
 
 class QQDownloadCard(DownloadCardBase):
@@ -364,12 +343,14 @@ class QQDownloadCard(DownloadCardBase):
         """
         super().__init__(parent=parent)
         self._timeout = False  # 计时器启动标记
+        self._isChecked = False  # 延时结束并完成第一次更新的标记
         self.installExePath: Optional[Path] = None
         self.isInstall = False
         self.installMode = False
 
         # 创建控件
-        self.downloader = Downloader(path=it(PathFunc).tmp_path)
+        # QQ 安装包较大, 使用多个连接分段下载
+        self.downloader = Downloader(path=it(PathFunc).tmp_path, segments=4)
         self.versionWidget = InfoWidget(self.tr("Version"), self.tr("Unknown"), self)
         self.platformWidget = InfoWidget(self.tr("Platform"), cfg.get(cfg.PlatformType), self)
         self.systemWidget = InfoWidget(self.tr("System"), cfg.get(cfg.SystemType), self)
@@ -388,6 +369,9 @@ class QQDownloadCard(DownloadCardBase):
             "so you will need to install it."
         ))
         self.shareButton.clicked.connect(self._shareButtonSlot)
+        self.openInstallPathButton.clicked.connect(
+            lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(str(it(PathFunc).getQQPath())))
+        )
 
         # 设置布局
         self.infoLayout.addWidget(self.versionWidget)
@@ -401,6 +385,7 @@ class QQDownloadCard(DownloadCardBase):
         self.checkInstall()
         self._setLayout()
         self._onTimer()
+        it(GetVersion).versionChanged.connect(self._versionChangedSlot)
 
     @timer(10000, True)
     def _onTimer(self):
@@ -410,9 +395,18 @@ class QQDownloadCard(DownloadCardBase):
         if not self._timeout:
             self._timeout = True
             return
+        self._isChecked = True
         self.updateVersion()
 
-    @timer(65000)
+    @Slot()
+    def _versionChangedSlot(self) -> None:
+        """
+        ## 本地或远程版本发生变化
+        """
+        self.checkInstall()
+        if self._isChecked:
+            self.updateVersion()
+
     def updateVersion(self):
         """
         ## 更新显示版本和下载器所下载的版本url
@@ -424,16 +418,12 @@ class QQDownloadCard(DownloadCardBase):
             # 解析失败跳过本次解析
             return
 
-    @timer(3000)
     def checkInstall(self) -> None:
         """
         ## 检查是否安装
         """
         if not it(GetVersion).QQLocalVersion is None:
             # 如果获取得到版本则表示已安装
-            self.openInstallPathButton.clicked.connect(
-                lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(str(it(PathFunc).getQQPath())))
-            )
             self.installButton.hide()
             self.openInstallPathButton.show()
             self.isInstall = True
@@ -502,13 +492,14 @@ class QQDownloadCard(DownloadCardBase):
         """
         self.installButton.setEnabled(True)
         self.installButton.setProgressBarState(False)
-        if exit_status == QProcess.ExitStatus.NormalExit and not (QQPath := it(PathFunc).getQQPath()) is None:
+        # 安装后注册表中的路径发生变化, 重新查找
+        it(PathFunc).invalidate("QQPath")
+        if exit_status == QProcess.ExitStatus.NormalExit and it(PathFunc).getQQPath() is not None:
             # 如果进程正常退出, 则检查一次路径是否存在QQ, 存在则发送成功, 否则失败
             self.installButton.hide()
             self.openInstallPathButton.show()
-            self.openInstallPathButton.clicked.connect(
-                lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(str(QQPath)))
-            )
+            # 立即读取新安装的版本, 不需要等待文件监听
+            it(GetVersion).checkLocalVersions()
         else:
             logger.error(f"QQ installation failed, exit code: {exit_code}, exit status: {exit_status}")
             self.installButton.setTestVisible(True)
@@ -15,6 +15,7 @@ from qfluentwidgets import (
 )
 
 from src.Core import timer
+from src.Core.BotState import BotStateRegistry
 from src.Core.NetworkFunc import Urls, Downloader
 from src.Core.GetVersion import GetVersion
 from src.Core.PathFunc import PathFunc
@@ -135,6 +136,7 @@ class NapCatUpdateCard(UpdateCardBase):
         """
         super().__init__(parent=parent)
         self._timeout = False
+        self._isChecked = False  # 延时结束并完成第一次检查的标记
         self.isInstall = False
         self.isRun = False
 
@@ -169,6 +171,7 @@ class NapCatUpdateCard(UpdateCardBase):
         # 调用方法
         self._onTimer()
         self._setLayout()
+        it(GetVersion).versionChanged.connect(self._versionChangedSlot)
 
     @Slot()
     def _updateButtonSlot(self):
@@ -189,7 +192,11 @@ class NapCatUpdateCard(UpdateCardBase):
             )
             if not box.exec():
                 return
+            # 所有机器人退出后再次进入这里开始更新, 等待期间不阻塞界面
+            self.updateButton.setEnabled(False)
+            it(BotStateRegistry).allStopped.connect(self._allBotsStoppedSlot, Qt.ConnectionType.SingleShotConnection)
             it(BotListWidget).stopAllBot()
+            return
 
         # 检查是否正在下载
         if self.isRun:
@@ -200,13 +207,22 @@ class NapCatUpdateCard(UpdateCardBase):
             self.updateButton.setTestVisible(True)
             self.isRun = False
         else:
-            # 反之则开始下载等操作
+            # 反之则开始下载等操作, 有公布的 SHA-256 时校验, 避免解压损坏的文件
+            self.downloader.expectedSha256 = it(GetVersion).napcatAssetDigests.get(self.downloader.url.fileName())
             self.downloader.start()
             self.zipFilePath = it(PathFunc).tmp_path / self.downloader.url.fileName()
             self.updateButton.setProgressBarState(False)
             self.updateButton.setTestVisible(False)
             self.isRun = True
 
+    @Slot()
+    def _allBotsStoppedSlot(self) -> None:
+        """
+        ## 所有机器人都已退出, 继续更新
+        """
+        self.updateButton.setEnabled(True)
+        self._updateButtonSlot()
+
     @Slot(bool)
     def _install(self, value):
         """
@@ -215,8 +231,10 @@ class NapCatUpdateCard(UpdateCardBase):
         """
         if value:
             self.isRun = False
-            self.updateButton.setProgressBarState(True)
+            self.updateButton.setProgressBarState(False)
+            self.updateButton.setValue(0)
             self.installWorker = NapCatInstallWorker(self.ncInstallPath, self.zipFilePath)
+            self.installWorker.progress.connect(self.updateButton.setValue)
             self.installWorker.finished.connect(self._installationFinished)
             self.installWorker.start()
 
@@ -231,6 +249,8 @@ class NapCatUpdateCard(UpdateCardBase):
             self.updateButton.hide()
             self.updateLogButton.hide()
             self.latestVersionLabel.show()
+            # 立即读取新安装的版本, 不需要等待文件监听
+            it(GetVersion).checkLocalVersions()
 
     @Slot()
     def _updateLogButtonSlot(self):
@@ -247,9 +267,17 @@ class NapCatUpdateCard(UpdateCardBase):
         if not self._timeout:
             self._timeout = True
             return
+        self._isChecked = True
         self.checkForUpdates()
 
-    @timer(10_000)
+    @Slot()
+    def _versionChangedSlot(self) -> None:
+        """
+        ## 本地或远程版本发生变化时重新检查, 不再定时轮询
+        """
+        if self._isChecked:
+            self.checkForUpdates()
+
     def checkForUpdates(self):
         """
         ## 检查是否有更新
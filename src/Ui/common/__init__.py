@@ -1,2 +1,3 @@
 # -*- coding: utf-8 -*-
 from src.Ui.common.CodeEditor import CodeEditor, LogHighlighter
+from src.Ui.common.LogEditor import LogEditor